@@ -1,50 +1,3951 @@
 import os
 import sys
 import threading
-import webbrowser
 import string
-import ctypes
 import base64
 import mimetypes
 import time
-import platform
+import stat
 import io
-from flask import Flask, render_template, request, jsonify, send_file
+import json
+import re
+import fnmatch
+import sqlite3
+import hashlib
+import uuid
+import mmap
+import struct
+import heapq
+import functools
+import tempfile
+import bisect
+import posixpath
+import zipfile
+import shutil
+import subprocess
+import queue
+import tarfile
+import gzip
+import bz2
+import lzma
+import zlib
+import logging
+import contextlib
+import importlib
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
+from flask import Flask, Response, render_template, request, jsonify, send_file, g
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.wsgi import FileWrapper
+from urllib.parse import quote
 from datetime import datetime
+from xml.etree.ElementTree import XMLParser, iterparse, ParseError
 
-try:
-    import docx
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-    print("python-docx not available, Word files will not be previewed")
-
-try:
-    import pptx
-    from pptx import Presentation
-    PPTX_AVAILABLE = True
-except ImportError:
-    PPTX_AVAILABLE = False
-    print("python-pptx not available, PowerPoint files will not be previewed")
+LIST_PAGE_SIZE = 500
+LIST_MAX_PAGE_SIZE = 5000
+# Paged listings keep their sorted scandir snapshot this long after the
+# last page was fetched, for at most this many directories at a time
+LIST_SNAPSHOT_SECONDS = 600
+LIST_SNAPSHOTS = 16
+# Threads that describe the entries of one page when the listing inspects
+# contents; each file then costs a read of its first 4 KB on top of the stat
+LIST_DESCRIBE_WORKERS = 8
+
+# Everything the tool persists (indexes, caches) lives here, never on the
+# evidence being examined.
+DATA_DIR = os.environ.get('INVESTIGATOR_DATA_DIR', os.path.join(os.path.expanduser('~'), '.investigator'))
+INDEX_DB_PATH = os.path.join(DATA_DIR, 'index.db')
+
+log = logging.getLogger("investigator")
+
+# INVESTIGATOR_METRICS=0 turns instrumentation off entirely: timed functions
+# are left undecorated and requests are not counted
+METRICS_ENABLED = os.environ.get('INVESTIGATOR_METRICS', '1') != '0'
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THREAD_IO_PATH = '/proc/thread-self/io'
+PROFILER_INTERVAL = 0.005
+PROFILER_MAX_STACKS = 10000
+PROFILER_MAX_DEPTH = 64
+# Leaf frames of threads that are parked, not working; left out of profiles
+PROFILER_IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"),
+                        ("socket.py", "accept"), ("connection.py", "wait")}
+
+def read_thread_io():
+    # (bytes read, read syscalls) of the calling thread, from the Linux
+    # per-thread I/O accounting file
+    with open(THREAD_IO_PATH, 'rb') as f:
+        fields = dict(line.split(b':') for line in f.read().splitlines())
+    return int(fields[b'rchar']), int(fields[b'syscr'])
+
+def measure_thread_io_overhead():
+    # What one read_thread_io() call itself adds to the counters, so it can
+    # be subtracted; None where per-thread I/O accounting is unavailable
+    try:
+        first = read_thread_io()
+        second = read_thread_io()
+    except (OSError, KeyError, ValueError):
+        return None
+    return second[0] - first[0], second[1] - first[1]
+
+THREAD_IO_OVERHEAD = measure_thread_io_overhead()
+
+def io_snapshot():
+    # Per-thread I/O counters cost two reads of a /proc file per operation,
+    # so they are only collected while the profiler is on
+    if THREAD_IO_OVERHEAD and profiler.thread is not None:
+        return read_thread_io()
+    return None
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+class Metrics:
+    # Process-wide counters and latency histograms, rendered in the
+    # Prometheus text format by /api/metrics. Labels are small fixed sets
+    # (operation, route, method, status), so the number of series is bounded.
+    # An observation is a dict update under a lock: cheap enough to leave on.
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                # One slot per bucket, one for +Inf, then sum and count
+                series = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def record_operation(self, operation, seconds, io_before=None, failed=False):
+        labels = (("operation", operation),)
+        self.observe("investigator_operation_seconds", labels, seconds)
+        if failed:
+            self.inc("investigator_operation_exceptions_total", labels)
+        if io_before is not None:
+            read_bytes, read_calls = read_thread_io()
+            self.inc("investigator_operation_read_bytes_total", labels,
+                     max(read_bytes - io_before[0] - THREAD_IO_OVERHEAD[0], 0))
+            self.inc("investigator_operation_read_syscalls_total", labels,
+                     max(read_calls - io_before[1] - THREAD_IO_OVERHEAD[1], 0))
+
+    def timer(self, operation):
+        if not METRICS_ENABLED:
+            return NO_TIMER
+        return self._timer(operation)
+
+    @contextlib.contextmanager
+    def _timer(self, operation):
+        io_before = io_snapshot()
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.record_operation(operation, time.perf_counter() - start, io_before, failed)
+
+    def render(self, gauges=()):
+        # gauges: (name, value) pairs sampled at scrape time
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(series)) for key, series in self.histograms.items())
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), series in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {series[-2]:.6f}")
+            lines.append(f"{name}_count{format_labels(labels)} {series[-1]}")
+        for name, value in gauges:
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+NO_TIMER = contextlib.suppress()
+
+def timed(operation):
+    # Records the duration of every call under operation, and while the
+    # profiler is on (Linux only) the bytes and read syscalls the calling
+    # thread made during it. With metrics off the function is returned as is.
+    def decorate(function):
+        if not METRICS_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            io_before = io_snapshot()
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                metrics.record_operation(operation, time.perf_counter() - start, io_before, failed)
+        return wrapper
+    return decorate
+
+class SamplingProfiler:
+    # Opt-in statistical profiler. While on, a daemon thread snapshots the
+    # stacks of all other threads every interval and counts them in the
+    # collapsed "file:function;file:function" form that flamegraph.pl and
+    # speedscope read. Nothing runs while it is off.
+    def __init__(self, max_stacks=PROFILER_MAX_STACKS):
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = None
+        self.stacks = {}
+        self.samples = 0
+        self.dropped = 0
+        self.interval = PROFILER_INTERVAL
+        self.started = None
+
+    def start(self, interval=PROFILER_INTERVAL):
+        with self.lock:
+            if self.thread is not None:
+                return False
+            self.interval = interval
+            self.stacks = {}
+            self.samples = 0
+            self.dropped = 0
+            self.started = time.time()
+            self.stop_event = threading.Event()
+            self.thread = threading.Thread(target=self._run, args=(self.stop_event,), daemon=True)
+            self.thread.start()
+        return True
+
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                self.stop_event.set()
+        if thread is not None:
+            thread.join()
+        return thread is not None
+
+    def _run(self, stop_event):
+        own = threading.get_ident()
+        while not stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in PROFILER_IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                with self.lock:
+                    self.samples += 1
+                    if key in self.stacks or len(self.stacks) < self.max_stacks:
+                        self.stacks[key] = self.stacks.get(key, 0) + 1
+                    else:
+                        self.dropped += 1
+
+    def status(self):
+        with self.lock:
+            return {"running": self.thread is not None, "interval": self.interval, "started": self.started,
+                    "samples": self.samples, "stacks": len(self.stacks), "dropped": self.dropped}
+
+    def collapsed(self, limit=None):
+        with self.lock:
+            stacks = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks[:limit])
+
+profiler = SamplingProfiler()
+
+class TargetMatcher:
+    # target.txt is compiled once into lookup structures so that matching a
+    # filename costs roughly its length instead of one pass over every pattern:
+    #   name         -> exact set (and substring automaton if longer than 3 chars)
+    #   prefix*      -> trie
+    #   *suffix      -> trie over reversed strings
+    #   *substring*  -> Aho-Corasick automaton
+    #   anything else with wildcards falls back to compiled fnmatch regexes
+    END = ''
+
+    def __init__(self, patterns=()):
+        self.exact = set()
+        self.prefix_trie = {}
+        self.suffix_trie = {}
+        self.globs = []
+        self.pattern_count = 0
+
+        substrings = []
+        for pattern in patterns:
+            pattern = pattern.strip().lower()
+            if not pattern:
+                continue
+            if not pattern.strip('*'):
+                # A bare "*" would flag every file as a target
+                log.warning("Ignoring target pattern %r: it matches every file", pattern)
+                continue
+            self.pattern_count += 1
+
+            if '*' not in pattern and '?' not in pattern:
+                self.exact.add(pattern)
+                if len(pattern) > 3:
+                    substrings.append(pattern)
+                continue
+
+            stars = pattern.count('*')
+            core = pattern.strip('*')
+            if '?' in pattern or '[' in pattern:
+                self._add_glob(pattern)
+            elif stars == 1 and pattern.startswith('*'):
+                self._insert(self.suffix_trie, core[::-1], pattern)
+            elif stars == 1 and pattern.endswith('*'):
+                self._insert(self.prefix_trie, core, pattern)
+            elif stars == 2 and pattern.startswith('*') and pattern.endswith('*'):
+                substrings.append(core)
+            else:
+                self._add_glob(pattern)
+
+        # Variations of the password list are treated as the same target
+        if "password.txt" in self.exact or "passwords.txt" in self.exact:
+            self.exact.update(("password.txt", "passwords.txt"))
+
+        self._build_automaton(substrings)
+
+    def __len__(self):
+        return self.pattern_count
+
+    def _add_glob(self, pattern):
+        self.globs.append((re.compile(fnmatch.translate(pattern)), pattern))
+
+    def _insert(self, trie, key, pattern):
+        node = trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[self.END] = pattern
+
+    def _walk(self, trie, text):
+        node = trie
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                return None
+            if self.END in node:
+                return node[self.END]
+        return None
+
+    def _build_automaton(self, substrings):
+        # Node 0 is the root. Each node keeps its goto transitions, failure
+        # link and the first pattern that ends at it (directly or via failure).
+        self.ac_goto = [{}]
+        self.ac_fail = [0]
+        self.ac_out = [None]
+
+        for pattern in substrings:
+            node = 0
+            for ch in pattern:
+                nxt = self.ac_goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.ac_goto)
+                    self.ac_goto[node][ch] = nxt
+                    self.ac_goto.append({})
+                    self.ac_fail.append(0)
+                    self.ac_out.append(None)
+                node = nxt
+            if self.ac_out[node] is None:
+                self.ac_out[node] = pattern
+
+        queue = deque(self.ac_goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.ac_goto[node].items():
+                queue.append(child)
+                fail = self.ac_fail[node]
+                while fail and ch not in self.ac_goto[fail]:
+                    fail = self.ac_fail[fail]
+                target = self.ac_goto[fail].get(ch, 0)
+                self.ac_fail[child] = target if target != child else 0
+                if self.ac_out[child] is None:
+                    self.ac_out[child] = self.ac_out[self.ac_fail[child]]
+
+    def _search_substring(self, text):
+        if len(self.ac_goto) == 1:
+            return None
+        goto, fail, out = self.ac_goto, self.ac_fail, self.ac_out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+    def match(self, filename):
+        if not filename:
+            return None
+        name = filename.lower()
+
+        if name in self.exact:
+            return ("exact", name)
+
+        pattern = self._walk(self.prefix_trie, name)
+        if pattern:
+            return ("prefix", pattern)
+
+        pattern = self._walk(self.suffix_trie, reversed(name))
+        if pattern:
+            return ("suffix", pattern)
+
+        pattern = self._search_substring(name)
+        if pattern:
+            return ("substring", pattern)
+
+        for regex, pattern in self.globs:
+            if regex.match(name):
+                return ("glob", pattern)
+
+        return None
+
+def parse_size(value):
+    # Accepts plain byte counts or strings such as "10MB" / "1.5 GB"
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kmgtp]?)i?b?\s*', str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgtp".index(unit or " "))
+
+def parse_timestamp(value):
+    # Accepts epoch seconds or "YYYY-MM-DD[ HH:MM[:SS]]"
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value}")
+
+def glob_to_like(pattern):
+    escaped = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped.replace('*', '%').replace('?', '_')
+
+class FileIndex:
+    # Metadata-only index of an evidence tree, kept in SQLite under DATA_DIR.
+    # A crawl fans scandir calls out over a thread pool; the crawling thread is
+    # the only writer and commits in batches.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            root TEXT NOT NULL,
+            parent TEXT NOT NULL,
+            name TEXT NOT NULL,
+            name_lower TEXT NOT NULL,
+            ext TEXT NOT NULL,
+            type TEXT NOT NULL,
+            size INTEGER,
+            mtime REAL,
+            inode INTEGER,
+            mimetype TEXT,
+            is_target INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_files_root ON files(root);
+        CREATE INDEX IF NOT EXISTS idx_files_parent ON files(parent);
+        CREATE INDEX IF NOT EXISTS idx_files_name ON files(name_lower);
+        CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext, size);
+        CREATE INDEX IF NOT EXISTS idx_files_size ON files(size);
+        CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+        CREATE INDEX IF NOT EXISTS idx_files_target ON files(is_target) WHERE is_target = 1;
+    """
+    COLUMNS = ("path", "root", "parent", "name", "name_lower", "ext", "type",
+               "size", "mtime", "inode", "mimetype", "is_target")
+    BATCH_SIZE = 5000
+    MAX_RESULTS = 10000
+
+    def __init__(self, db_path, workers=None):
+        self.db_path = db_path
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.status = {"running": False, "root": None}
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    def start(self, root, matcher, incremental=False):
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            return False, f"[ERROR] Not a directory: {root}"
+        if os.path.abspath(self.db_path).startswith(os.path.join(root, '')):
+            return False, f"[ERROR] Index location {self.db_path} is inside the evidence tree"
+
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return False, f"[ERROR] Indexing already running for {self.status['root']}"
+            self.status = {
+                "running": True,
+                "root": root,
+                "files": 0,
+                "directories": 0,
+                "errors": 0,
+                "mode": "incremental" if incremental else "full",
+                "skipped_directories": 0,
+                "rescanned_directories": 0,
+                "started": time.time(),
+                "finished": None,
+                "error": None,
+            }
+            self.thread = threading.Thread(target=self._run, args=(root, matcher, incremental), daemon=True)
+            self.thread.start()
+        mode = "incremental refresh" if incremental else "indexing"
+        return True, f"[SUCCESS] Started {mode}: {root}"
+
+    def get_status(self):
+        with self.lock:
+            status = dict(self.status)
+        if status.get("started"):
+            status["elapsed"] = round((status["finished"] or time.time()) - status["started"], 3)
+        return status
+
+    def _update_status(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.status[key] = self.status.get(key, 0) + value
+
+    @staticmethod
+    def make_row(root, path, name, item_type, st, matcher):
+        ext = os.path.splitext(name)[1].lower() if item_type == "file" else ""
+        mime_type = mimetypes.guess_type(name)[0] if item_type == "file" else None
+        is_target = item_type == "file" and matcher is not None and matcher.match(name) is not None
+        return (path, root, os.path.dirname(path), name, name.lower(), ext, item_type,
+                st.st_size if st and item_type == "file" else None,
+                st.st_mtime if st else None,
+                st.st_ino if st else None,
+                mime_type, int(is_target))
+
+    @classmethod
+    def scan_directory(cls, root, directory, matcher):
+        # Runs on a worker thread; only reads the evidence
+        rows = []
+        subdirs = []
+        errors = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        errors += 1
+                        continue
+                    item_type = "directory" if is_dir else "file"
+                    rows.append(cls.make_row(root, entry.path, entry.name, item_type, st, matcher))
+                    if is_dir:
+                        subdirs.append(entry.path)
+        except OSError:
+            errors += 1
+        return rows, subdirs, errors
+
+    def _run(self, root, matcher, incremental=False):
+        conn = None
+        try:
+            conn = self.connect()
+            if incremental and self._has_root(conn, root):
+                self._refresh(conn, root, matcher)
+            else:
+                with self.lock:
+                    self.status["mode"] = "full"
+                self._crawl(conn, root, matcher)
+        except Exception as e:
+            log.error("Error indexing %s: %s", root, e)
+            with self.lock:
+                self.status["error"] = str(e)
+        finally:
+            if conn is not None:
+                conn.close()
+            with self.lock:
+                self.status["running"] = False
+                self.status["finished"] = time.time()
+
+    def _has_root(self, conn, root):
+        return conn.execute("SELECT 1 FROM files WHERE path = ? AND root = ?", (root, root)).fetchone() is not None
+
+    def _crawl(self, conn, root, matcher):
+        conn.execute("DELETE FROM files WHERE root = ?", (root,))
+        root_row = self.make_row(root, root, os.path.basename(root) or root, "directory", os.stat(root), matcher)
+        pending_rows = [root_row]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.scan_directory, root, root, matcher)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rows, subdirs, errors = future.result()
+                    pending_rows.extend(rows)
+                    for subdir in subdirs:
+                        futures.add(pool.submit(self.scan_directory, root, subdir, matcher))
+                    self._update_status(files=len(rows) - len(subdirs), directories=1, errors=errors)
+                if len(pending_rows) >= self.BATCH_SIZE:
+                    self._insert(conn, pending_rows)
+                    pending_rows = []
+
+        self._insert(conn, pending_rows)
+
+    @classmethod
+    def check_directory(cls, root, directory, known_dirs, children, matcher):
+        # Runs on a worker thread. A directory whose (mtime, inode) still
+        # matches the index has the same entries as last time, so only its
+        # known subdirectories need checking; anything else is re-listed.
+        try:
+            st = os.stat(directory, follow_symlinks=False)
+        except OSError:
+            return "missing", None, [], [], 1
+
+        if known_dirs.get(directory) == (st.st_mtime, st.st_ino):
+            return "skipped", None, [], children.get(directory, []), 0
+
+        dir_row = cls.make_row(root, directory, os.path.basename(directory) or directory, "directory", st, matcher)
+        rows, subdirs, errors = cls.scan_directory(root, directory, matcher)
+        return "rescanned", dir_row, rows, subdirs, errors
+
+    def _refresh(self, conn, root, matcher):
+        known_dirs = {}
+        children = {}
+        for path, parent, mtime, inode in conn.execute(
+                "SELECT path, parent, mtime, inode FROM files WHERE root = ? AND type = 'directory'", (root,)):
+            known_dirs[path] = (mtime, inode)
+            if path != root:
+                children.setdefault(parent, []).append(path)
+
+        pending_rows = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.check_directory, root, root, known_dirs, children, matcher): root}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory = futures.pop(future)
+                    state, dir_row, rows, subdirs, errors = future.result()
+                    if state == "skipped":
+                        self._update_status(directories=1, skipped_directories=1)
+                    elif state == "rescanned":
+                        self._remove_vanished(conn, directory, {row[0] for row in rows})
+                        pending_rows.append(dir_row)
+                        pending_rows.extend(rows)
+                        self._update_status(files=len(rows) - len(subdirs), directories=1,
+                                            rescanned_directories=1, errors=errors)
+                    else:
+                        self._update_status(errors=errors)
+                    for subdir in subdirs:
+                        futures[pool.submit(self.check_directory, root, subdir, known_dirs, children, matcher)] = subdir
+                if len(pending_rows) >= self.BATCH_SIZE:
+                    self._insert(conn, pending_rows)
+                    pending_rows = []
+
+        self._insert(conn, pending_rows)
+
+    def _remove_vanished(self, conn, directory, current_paths):
+        stale = [(path, item_type) for path, item_type in conn.execute(
+            "SELECT path, type FROM files WHERE parent = ? AND path != ?", (directory, directory))
+            if path not in current_paths]
+        for path, item_type in stale:
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            if item_type == "directory":
+                conn.execute("DELETE FROM files WHERE path LIKE ? ESCAPE '\\'",
+                             (glob_to_like(os.path.join(path, '')) + '%',))
+        if stale:
+            conn.commit()
+
+    def _insert(self, conn, rows):
+        if not rows:
+            return
+        placeholders = ", ".join("?" * len(self.COLUMNS))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO files ({', '.join(self.COLUMNS)}) VALUES ({placeholders})", rows)
+        conn.commit()
+
+    def search(self, query):
+        clauses = []
+        params = []
+
+        name = (query.get("name") or "").strip().lower()
+        if name:
+            if re.fullmatch(r'\*\.[^*?\[\]]+', name):
+                # "*.ext" is answered from the extension index
+                clauses.append("ext = ?")
+                params.append(name[1:])
+            elif '*' in name or '?' in name:
+                clauses.append("name_lower LIKE ? ESCAPE '\\'")
+                params.append(glob_to_like(name))
+            else:
+                clauses.append("name_lower = ?")
+                params.append(name)
+
+        ext = (query.get("ext") or "").strip().lower()
+        if ext:
+            clauses.append("ext = ?")
+            params.append(ext if ext.startswith('.') else '.' + ext)
+
+        item_type = query.get("type")
+        if item_type:
+            clauses.append("type = ?")
+            params.append(item_type)
+
+        min_size = parse_size(query.get("min_size"))
+        if min_size is not None:
+            clauses.append("size >= ?")
+            params.append(min_size)
+
+        max_size = parse_size(query.get("max_size"))
+        if max_size is not None:
+            clauses.append("size <= ?")
+            params.append(max_size)
+
+        modified_after = parse_timestamp(query.get("modified_after"))
+        if query.get("modified_within_days") not in (None, ""):
+            modified_after = time.time() - float(query["modified_within_days"]) * 86400
+        if modified_after is not None:
+            clauses.append("mtime >= ?")
+            params.append(modified_after)
+
+        modified_before = parse_timestamp(query.get("modified_before"))
+        if modified_before is not None:
+            clauses.append("mtime < ?")
+            params.append(modified_before)
+
+        if query.get("is_target"):
+            clauses.append("is_target = 1")
+
+        under = query.get("path")
+        if under:
+            under = os.path.abspath(under)
+            clauses.append("(path = ? OR path LIKE ? ESCAPE '\\')")
+            params.extend([under, glob_to_like(os.path.join(under, '')) + '%'])
+
+        limit = max(min(int(query.get("limit") or 1000), self.MAX_RESULTS), 1)
+        offset = max(int(query.get("offset") or 0), 0)
+
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY path LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        if not os.path.exists(self.db_path):
+            return []
+        conn = self.connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            results = []
+            for row in conn.execute(sql, params):
+                item = dict(row)
+                item["is_target"] = bool(item["is_target"])
+                del item["name_lower"]
+                results.append(item)
+            return results
+        finally:
+            conn.close()
+
+HASH_ALGORITHMS = ("md5", "sha1", "sha256")
+HASH_CHUNK_SIZE = 1024 * 1024
+# Files up to this size are hashed inline for the metadata view; bigger ones
+# go through /api/hash so a click never blocks on a multi-GB read.
+METADATA_HASH_LIMIT = 256 * 1024 * 1024
+METADATA_SECTIONS = ("basic", "timestamps", "permissions", "system", "exif", "hashes")
+# Hashing reads the whole file, so it only happens when asked for by name
+METADATA_DEFAULT_SECTIONS = ("basic", "timestamps", "permissions", "system", "exif")
+METADATA_BATCH_LIMIT = 1000
+METADATA_WORKERS = 8
+
+@functools.lru_cache(maxsize=None)
+def platform_info():
+    # platform.version() and friends are constant for the process but not
+    # free (some shell out or read files), so they are looked up once
+    import platform
+    return {
+        "platform": platform.system(),
+        "platform_version": platform.version(),
+        "python_version": platform.python_version(),
+    }
+
+O_NOATIME = getattr(os, 'O_NOATIME', 0)
+
+def open_evidence(filepath, buffering=-1):
+    # Binary read-only open that leaves the file's access time alone where
+    # the platform allows it. Linux only honours O_NOATIME for the file's
+    # owner (or with CAP_FOWNER); anywhere else this is a plain open.
+    if O_NOATIME:
+        try:
+            fd = os.open(filepath, os.O_RDONLY | O_NOATIME)
+        except PermissionError:
+            pass
+        else:
+            return os.fdopen(fd, 'rb', buffering=buffering)
+    return open(filepath, 'rb', buffering=buffering)
+
+def stat_key(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def hash_file_keyed(filepath, algorithms=HASH_ALGORITHMS, chunk_size=HASH_CHUNK_SIZE):
+    # Reads the file once into a reused buffer and feeds every digest from
+    # the same chunk. Returns (result, key): key is the stat_key of the open
+    # file taken before reading, or None when the file changed while it was
+    # read (or read a different length than it claimed), since the digests
+    # then match neither version and must not be cached under either.
+    digests = [hashlib.new(name) for name in algorithms]
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = 0
+    with open_evidence(filepath, buffering=0) as f:
+        before = os.fstat(f.fileno())
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            chunk = view[:count]
+            for digest in digests:
+                digest.update(chunk)
+            size += count
+        after = os.fstat(f.fileno())
+    result = {
+        "path": filepath,
+        "size": size,
+        "hashes": {name: digest.hexdigest() for name, digest in zip(algorithms, digests)},
+    }
+    if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+        result["changed_during_read"] = True
+        return result, None
+    return result, stat_key(before) if size == before.st_size else None
+
+def hash_file(filepath, algorithms=HASH_ALGORITHMS, chunk_size=HASH_CHUNK_SIZE):
+    return hash_file_keyed(filepath, algorithms, chunk_size)[0]
+
+def hash_files(paths, algorithms=HASH_ALGORITHMS):
+    # Process pool entry point: hashes a batch of files, one buffer per
+    # batch, and returns (result, key) pairs as hash_file_keyed does
+    results = []
+    for path in paths:
+        try:
+            results.append(hash_file_keyed(path, algorithms))
+        except OSError as e:
+            results.append(({"path": path, "error": str(e)}, None))
+    return results
+
+def process_pool(workers):
+    # multiprocessing and the process-pool machinery are imported here rather
+    # than at startup, since many sessions never hash or search in bulk.
+    # spawn avoids forking a multi-threaded server process
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+class PoolService:
+    # Owns a process pool that is started on first use
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = process_pool(self.workers)
+            return self.pool
+
+class PoolJobEngine(PoolService):
+    # Background jobs that spread batches of files over the pool. A job is
+    # a dict whose "results" list only grows; the newest MAX_JOBS are kept
+    # and finished ones are evicted oldest first. Changes to a job are
+    # announced on `updated` (a condition on self.lock), so readers can
+    # wait for new results instead of polling.
+    BATCH_FILES = 64
+    BATCH_BYTES = 64 * 1024 * 1024
+    MAX_JOBS = 20
+    KIND = "pool"
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.jobs = OrderedDict()
+        self.updated = threading.Condition(self.lock)
+
+    def add_job(self, job, run, *args):
+        # Registers job under a new id and calls run(job, *args) on its own
+        # thread; returns the id
+        job_id = uuid.uuid4().hex
+        job.update(id=job_id, started=time.time(), finished=None, running=True, results=[])
+        with self.lock:
+            self.jobs[job_id] = job
+            while len(self.jobs) > self.MAX_JOBS:
+                oldest = next(iter(self.jobs))
+                if self.jobs[oldest]["running"]:
+                    break
+                self.jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job, run, args), daemon=True).start()
+        return job_id
+
+    def _run(self, job, run, args):
+        try:
+            run(job, *args)
+        except Exception as e:
+            log.error("Error in %s job %s: %s", self.KIND, job['id'], e)
+            with self.lock:
+                job["error"] = str(e)
+        finally:
+            with self.lock:
+                job["running"] = False
+                job["finished"] = time.time()
+                self.updated.notify_all()
+
+    def batches(self, files):
+        # Groups (path, size) pairs so the pool is not dominated by per-task
+        # overhead on small files
+        batch, batch_bytes = [], 0
+        for path, size in files:
+            batch.append(path)
+            batch_bytes += size
+            if len(batch) >= self.BATCH_FILES or batch_bytes >= self.BATCH_BYTES:
+                yield batch
+                batch, batch_bytes = [], 0
+        if batch:
+            yield batch
+
+    def get_job(self, job_id, offset=0):
+        # A copy of the job's status with the results from offset on, or None
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = {key: value for key, value in job.items() if key != "results"}
+            status["results"] = job["results"][offset:]
+            status["results_total"] = len(job["results"])
+        elapsed = (status["finished"] or time.time()) - status["started"]
+        status["elapsed"] = round(elapsed, 3)
+        self.add_rates(status, elapsed)
+        return status
+
+    def add_rates(self, status, elapsed):
+        pass
+
+    def wait_for_results(self, job_id, offset, timeout):
+        # Returns once the job has results past offset, has finished or is
+        # gone, or after timeout seconds
+        def ready():
+            job = self.jobs.get(job_id)
+            return job is None or not job["running"] or len(job["results"]) > offset
+        with self.updated:
+            self.updated.wait_for(ready, timeout)
+
+class HashEngine(PoolJobEngine):
+    # Spreads hashing jobs over a process pool
+    KIND = "hash"
+    CACHE_SIZE = 10000
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self.cache = OrderedDict()
+
+    @staticmethod
+    def normalize_algorithms(algorithms):
+        algorithms = tuple(name.lower() for name in (algorithms or HASH_ALGORITHMS))
+        unknown = [name for name in algorithms if name not in hashlib.algorithms_available]
+        if unknown:
+            raise ValueError(f"Unsupported hash algorithm: {', '.join(unknown)}")
+        return algorithms
+
+    def get_cached(self, filepath, st, algorithms):
+        key = (filepath, stat_key(st), algorithms)
+        with self.lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+            return result
+
+    def store(self, result, file_key, algorithms):
+        # file_key is the stat_key the file had when it was read, never a
+        # fresh stat: a file modified since must miss the cache
+        if file_key is None or "hashes" not in result:
+            return
+        with self.lock:
+            self.cache[(result["path"], file_key, algorithms)] = result
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+
+    def hash_now(self, filepath, algorithms=HASH_ALGORITHMS):
+        algorithms = self.normalize_algorithms(algorithms)
+        st = os.stat(filepath)
+        result = self.get_cached(filepath, st, algorithms)
+        if result is None:
+            result, file_key = hash_file_keyed(filepath, algorithms)
+            self.store(result, file_key, algorithms)
+        return result
+
+    def start_job(self, files, algorithms=HASH_ALGORITHMS):
+        # files is a list of (path, size)
+        algorithms = self.normalize_algorithms(algorithms)
+        job = {
+            "algorithms": list(algorithms),
+            "files_total": len(files),
+            "bytes_total": sum(size for _, size in files),
+            "files_done": 0,
+            "bytes_done": 0,
+            "errors": 0,
+        }
+        return self.add_job(job, self._run_job, files, algorithms)
+
+    def _record(self, job, result, file_key, algorithms):
+        with self.lock:
+            job["results"].append(result)
+            job["files_done"] += 1
+            if "error" in result:
+                job["errors"] += 1
+            else:
+                job["bytes_done"] += result["size"]
+            self.updated.notify_all()
+        self.store(result, file_key, algorithms)
+
+    def _run_job(self, job, files, algorithms):
+        pending = []
+        for path, size in files:
+            try:
+                cached = self.get_cached(path, os.stat(path), algorithms)
+            except OSError:
+                cached = None
+            if cached is not None:
+                self._record(job, cached, None, algorithms)
+            else:
+                pending.append((path, size))
+
+        if pending:
+            pool = self.get_pool()
+            futures = [pool.submit(hash_files, batch, algorithms) for batch in self.batches(pending)]
+            for future in as_completed(futures):
+                for result, file_key in future.result():
+                    self._record(job, result, file_key, algorithms)
+
+    def add_rates(self, status, elapsed):
+        status["mb_per_second"] = round(status["bytes_done"] / 1048576 / elapsed, 2) if elapsed > 0 else None
+
+HASHSET_DIR = os.path.join(DATA_DIR, 'hashsets')
+KNOWN_STATUSES = ("known_bad", "known_good")
+DIGEST_SIZES = {"md5": 16, "sha1": 20, "sha256": 32}
+
+class KnownHashSet:
+    # A known-file list stored as a sorted array of fixed-width binary
+    # digests and memory-mapped read-only, so 100M+ hashes cost disk space
+    # rather than RAM. The file starts with a magic/count header and a
+    # 65537-entry table of offsets keyed by the first two digest bytes, which
+    # narrows every lookup to a binary search within one bucket.
+    MAGIC = b'IVHSET01'
+    FANOUT = 65536
+    HEADER_SIZE = 16 + (FANOUT + 1) * 8
+    FILENAME = re.compile(r'^(?P<name>.+)\.(?P<status>known_bad|known_good)\.(?P<algorithm>md5|sha1|sha256)\.hs$')
+    RUN_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, path):
+        match = self.FILENAME.match(os.path.basename(path))
+        if not match:
+            raise ValueError(f"Not a hash set file: {path}")
+        self.path = path
+        self.name = match.group("name")
+        self.status = match.group("status")
+        self.algorithm = match.group("algorithm")
+        self.width = DIGEST_SIZES[self.algorithm]
+
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:8] != self.MAGIC:
+            self.close()
+            raise ValueError(f"Bad hash set header: {path}")
+        self.count = struct.unpack('<Q', self.mm[8:16])[0]
+        self.fanout = array('Q')
+        self.fanout.frombytes(self.mm[16:self.HEADER_SIZE])
+        if sys.byteorder != 'little':
+            self.fanout.byteswap()
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, digest):
+        if len(digest) != self.width:
+            return False
+        bucket = (digest[0] << 8) | digest[1]
+        lo, hi = self.fanout[bucket], self.fanout[bucket + 1]
+        mm, width, base = self.mm, self.width, self.HEADER_SIZE
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * width
+            probe = mm[offset:offset + width]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def describe(self):
+        return {"name": self.name, "status": self.status, "algorithm": self.algorithm, "count": self.count}
+
+    @classmethod
+    def iter_digests(cls, source, algorithm):
+        # Takes the first hex token of the right length on each line, which
+        # covers plain hash lists as well as NSRL-style CSV exports.
+        hex_length = DIGEST_SIZES[algorithm] * 2
+        token = re.compile(rf'(?<![0-9a-fA-F])[0-9a-fA-F]{{{hex_length}}}(?![0-9a-fA-F])')
+        with open(source, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = token.search(line)
+                if match:
+                    yield bytes.fromhex(match.group(0))
+
+    @classmethod
+    def build(cls, source, out_path, algorithm):
+        # External sort: sorted runs of RUN_SIZE digests go to temporary files
+        # next to the output, then a k-way merge writes the deduplicated array.
+        width = DIGEST_SIZES[algorithm]
+        out_dir = os.path.dirname(out_path)
+        os.makedirs(out_dir, exist_ok=True)
+        run_paths = []
+
+        def flush(run):
+            run.sort()
+            fd, run_path = tempfile.mkstemp(dir=out_dir, suffix='.run')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b''.join(run))
+            run_paths.append(run_path)
+
+        def read_run(run_path):
+            with open(run_path, 'rb') as f:
+                while True:
+                    block = f.read(width * 65536)
+                    if not block:
+                        return
+                    for i in range(0, len(block), width):
+                        yield block[i:i + width]
+
+        try:
+            run = []
+            for digest in cls.iter_digests(source, algorithm):
+                run.append(digest)
+                if len(run) >= cls.RUN_SIZE:
+                    flush(run)
+                    run = []
+            if run or not run_paths:
+                flush(run)
+
+            counts = array('Q', bytes(cls.FANOUT * 8))
+            count = 0
+            tmp_path = out_path + '.tmp'
+            with open(tmp_path, 'wb') as out:
+                out.seek(cls.HEADER_SIZE)
+                previous = None
+                pending = []
+                for digest in heapq.merge(*(read_run(path) for path in run_paths)):
+                    if digest == previous:
+                        continue
+                    previous = digest
+                    pending.append(digest)
+                    counts[(digest[0] << 8) | digest[1]] += 1
+                    count += 1
+                    if len(pending) >= 65536:
+                        out.write(b''.join(pending))
+                        pending = []
+                out.write(b''.join(pending))
+
+                fanout = array('Q', [0])
+                for bucket_count in counts:
+                    fanout.append(fanout[-1] + bucket_count)
+                if sys.byteorder != 'little':
+                    fanout.byteswap()
+                out.seek(0)
+                out.write(cls.MAGIC + struct.pack('<Q', count) + fanout.tobytes())
+            os.replace(tmp_path, out_path)
+            return count
+        finally:
+            for run_path in run_paths:
+                try:
+                    os.remove(run_path)
+                except OSError:
+                    pass
+
+class KnownHashLibrary:
+    # All imported known-good / known-bad sets. Known-bad wins if a digest is
+    # in both.
+    def __init__(self, directory=HASHSET_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.sets = []
+        self.load()
+
+    def load(self):
+        sets = []
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                if not KnownHashSet.FILENAME.match(filename):
+                    continue
+                try:
+                    sets.append(KnownHashSet(os.path.join(self.directory, filename)))
+                except (OSError, ValueError) as e:
+                    log.error("Error loading hash set %s: %s", filename, e)
+        sets.sort(key=lambda hash_set: KNOWN_STATUSES.index(hash_set.status))
+        with self.lock:
+            old_sets, self.sets = self.sets, sets
+        for hash_set in old_sets:
+            hash_set.close()
+        return sets
+
+    def __bool__(self):
+        return bool(self.sets)
+
+    def describe(self):
+        return [hash_set.describe() for hash_set in self.sets]
+
+    def import_list(self, source, name, status, algorithm):
+        if status not in KNOWN_STATUSES:
+            raise ValueError(f"Status must be one of: {', '.join(KNOWN_STATUSES)}")
+        if algorithm not in DIGEST_SIZES:
+            raise ValueError(f"Algorithm must be one of: {', '.join(DIGEST_SIZES)}")
+        if not re.fullmatch(r'[\w-]+', name or ''):
+            raise ValueError("Name may only contain letters, digits, '_' and '-'")
+        out_path = os.path.join(self.directory, f"{name}.{status}.{algorithm}.hs")
+        # A mapped file cannot be replaced on Windows, so drop the old copy first
+        with self.lock:
+            replaced = [hash_set for hash_set in self.sets if hash_set.path == out_path]
+            self.sets = [hash_set for hash_set in self.sets if hash_set.path != out_path]
+        for hash_set in replaced:
+            hash_set.close()
+        count = KnownHashSet.build(source, out_path, algorithm)
+        self.load()
+        return count
+
+    def lookup(self, hashes):
+        # hashes maps algorithm name to hex digest
+        if not hashes:
+            return None
+        for hash_set in self.sets:
+            hex_digest = hashes.get(hash_set.algorithm)
+            if hex_digest and bytes.fromhex(hex_digest) in hash_set:
+                return {"status": hash_set.status, "set": hash_set.name}
+        return None
+
+class FileSniffer:
+    # Identifies files from their leading bytes instead of their names.
+    # Signatures are grouped by offset and then by first byte, so a lookup
+    # only compares the handful of magics that could possibly match. Results
+    # are cached per (device, inode, size, mtime) so unchanged files are
+    # never read twice.
+    SNIFF_SIZE = 4096
+    CACHE_SIZE = 200000
+    EMPTY = "inode/x-empty"
+
+    SIGNATURES = (
+        (0, b'\xff\xd8\xff', "image/jpeg"),
+        (0, b'\x89PNG\r\n\x1a\n', "image/png"),
+        (0, b'GIF87a', "image/gif"),
+        (0, b'GIF89a', "image/gif"),
+        (0, b'BM', "image/bmp"),
+        (0, b'II*\x00', "image/tiff"),
+        (0, b'MM\x00*', "image/tiff"),
+        (0, b'\x00\x00\x01\x00', "image/vnd.microsoft.icon"),
+        (0, b'8BPS', "image/vnd.adobe.photoshop"),
+        (0, b'%PDF-', "application/pdf"),
+        (0, b'%!PS', "application/postscript"),
+        (0, b'{\\rtf', "application/rtf"),
+        (0, b'PK\x03\x04', "application/zip"),
+        (0, b'PK\x05\x06', "application/zip"),
+        (0, b'Rar!\x1a\x07', "application/vnd.rar"),
+        (0, b'7z\xbc\xaf\x27\x1c', "application/x-7z-compressed"),
+        (0, b'\x1f\x8b', "application/gzip"),
+        (0, b'BZh', "application/x-bzip2"),
+        (0, b'\xfd7zXZ\x00', "application/x-xz"),
+        (257, b'ustar', "application/x-tar"),
+        (0, b'MZ', "application/x-msdos-program"),
+        (0, b'\x7fELF', "application/x-executable"),
+        (0, b'\xca\xfe\xba\xbe', "application/java-vm"),
+        (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', "application/x-ole-storage"),
+        (0, b'SQLite format 3\x00', "application/vnd.sqlite3"),
+        (0, b'regf', "application/x-ms-registry"),
+        (0, b'ElfFile\x00', "application/x-ms-evtx"),
+        (0, b'L\x00\x00\x00\x01\x14\x02\x00', "application/x-ms-shortcut"),
+        (0, b'EVF\x09\x0d\x0a\xff\x00', "application/x-ewf"),
+        (0, b'vhdxfile', "application/x-vhdx"),
+        (0, b'conectix', "application/x-vhd"),
+        (0, b'KDMV', "application/x-vmdk"),
+        (0, b'ID3', "audio/mpeg"),
+        (0, b'\xff\xfb', "audio/mpeg"),
+        (0, b'\xff\xf3', "audio/mpeg"),
+        (0, b'OggS', "audio/ogg"),
+        (0, b'fLaC', "audio/flac"),
+        (0, b'\x1aE\xdf\xa3', "video/x-matroska"),
+        (0, b'0&\xb2u\x8ef\xcf\x11', "video/x-ms-asf"),
+        (4, b'ftyp', "video/mp4"),
+        (0, b'RIFF', "application/x-riff"),
+    )
+    RIFF_TYPES = {b'WEBP': "image/webp", b'WAVE': "audio/x-wav", b'AVI ': "video/x-msvideo"}
+    FTYP_BRANDS = {b'qt  ': "video/quicktime", b'M4A ': "audio/mp4", b'heic': "image/heic",
+                   b'heix': "image/heic", b'mif1': "image/heif"}
+    ZIP_MEMBERS = (
+        (b'word/', "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        (b'ppt/', "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+        (b'xl/', "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    )
+    ZIP_CONTAINERS = ("application/vnd.openxmlformats-officedocument.", "application/vnd.oasis.opendocument.")
+    ENCODING_TYPES = {"gzip": "application/gzip", "bzip2": "application/x-bzip2", "xz": "application/x-xz"}
+
+    TEXT_TYPES = ('application/json', 'application/xml', 'application/javascript',
+                  'application/x-javascript', 'image/svg+xml', 'application/x-sh')
+    # Names for the same container so that e.g. a .doc that is OLE2 or a .jar
+    # that is a zip is not reported as a mismatch
+    ALIASES = {
+        "application/msword": "application/x-ole-storage",
+        "application/vnd.ms-excel": "application/x-ole-storage",
+        "application/vnd.ms-powerpoint": "application/x-ole-storage",
+        "application/vnd.ms-outlook": "application/x-ole-storage",
+        "application/java-archive": "application/zip",
+        "application/epub+zip": "application/zip",
+        "application/x-zip-compressed": "application/zip",
+        "application/vnd.android.package-archive": "application/zip",
+        "application/x-msdownload": "application/x-msdos-program",
+        "application/x-dosexec": "application/x-msdos-program",
+        "application/x-sharedlib": "application/x-executable",
+        "audio/wav": "audio/x-wav",
+        "audio/wave": "audio/x-wav",
+        "image/x-icon": "image/vnd.microsoft.icon",
+        "video/x-ms-wmv": "video/x-ms-asf",
+        "audio/x-ms-wma": "video/x-ms-asf",
+        "video/webm": "video/x-matroska",
+        "image/heif": "image/heic",
+    }
+
+    def __init__(self):
+        self.table = {}
+        for offset, magic, mime_type in self.SIGNATURES:
+            self.table.setdefault(offset, {}).setdefault(magic[0], []).append((magic, mime_type))
+        for by_byte in self.table.values():
+            for candidates in by_byte.values():
+                candidates.sort(key=lambda candidate: -len(candidate[0]))
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def identify(self, head):
+        if not head:
+            return self.EMPTY
+        for offset, by_byte in self.table.items():
+            if len(head) <= offset:
+                continue
+            for magic, mime_type in by_byte.get(head[offset], ()):
+                if head.startswith(magic, offset):
+                    return self.refine(head, mime_type)
+        return self.identify_text(head)
+
+    def refine(self, head, mime_type):
+        if mime_type == "application/x-riff":
+            return self.RIFF_TYPES.get(head[8:12], "application/octet-stream")
+        if mime_type == "video/mp4":
+            return self.FTYP_BRANDS.get(head[8:12], "video/mp4")
+        if mime_type == "application/zip":
+            # OOXML packages name their parts early in the local headers
+            for marker, ooxml_type in self.ZIP_MEMBERS:
+                if marker in head:
+                    return ooxml_type
+        return mime_type
+
+    def identify_text(self, head):
+        if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+            return "text/plain"
+        if b'\x00' in head:
+            return "application/octet-stream"
+        try:
+            head.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off by the read size is still text
+            if e.start < len(head) - 3:
+                printable = sum(1 for byte in head if byte >= 32 or byte in (9, 10, 13))
+                if printable / len(head) < 0.95:
+                    return "application/octet-stream"
+
+        lead = head.lstrip()[:256].lower()
+        if lead.startswith(b'<?xml'):
+            return "image/svg+xml" if b'<svg' in head.lower() else "application/xml"
+        if lead.startswith((b'<!doctype html', b'<html')):
+            return "text/html"
+        return "text/plain"
+
+    def sniff(self, filepath, st=None):
+        if st is None:
+            st = os.stat(filepath)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            mime_type = self.cache.get(key)
+            if mime_type is not None:
+                self.cache.move_to_end(key)
+                return mime_type
+
+        with open_evidence(filepath) as f:
+            mime_type = self.identify(f.read(self.SNIFF_SIZE))
+
+        with self.lock:
+            self.cache[key] = mime_type
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return mime_type
+
+    @classmethod
+    def is_text_type(cls, mime_type):
+        return bool(mime_type) and (mime_type.startswith('text/') or mime_type in cls.TEXT_TYPES)
+
+    @classmethod
+    def guess_from_name(cls, filepath):
+        mime_type, encoding = mimetypes.guess_type(filepath)
+        if encoding in cls.ENCODING_TYPES:
+            return cls.ENCODING_TYPES[encoding]
+        return mime_type
+
+    @classmethod
+    def is_mismatch(cls, guessed, sniffed):
+        # True when the name claims one kind of file and the content is another
+        if not guessed or not sniffed or guessed == "application/octet-stream" or sniffed == cls.EMPTY:
+            return False
+        if cls.is_text_type(guessed) or cls.is_text_type(sniffed):
+            if sniffed == "application/octet-stream":
+                return cls.is_text_type(guessed)
+            return cls.is_text_type(guessed) != cls.is_text_type(sniffed)
+        if sniffed == "application/octet-stream":
+            return False
+        guessed = cls.ALIASES.get(guessed, guessed)
+        sniffed = cls.ALIASES.get(sniffed, sniffed)
+        if guessed == "application/zip" or sniffed == "application/zip":
+            # OOXML/ODF packages that could not be refined from the first block
+            other = sniffed if guessed == "application/zip" else guessed
+            if other.startswith(cls.ZIP_CONTAINERS):
+                return False
+        return guessed != sniffed
+
+TEXT_PREVIEW_BYTES = 1024 * 1024
+TEXT_PAGE_LINES = 1000
+TEXT_MAX_PAGE_LINES = 10000
+TEXT_MAX_PAGE_BYTES = 4 * 1024 * 1024
+
+class LineIndex:
+    # Sparse line index for one text file. For every BLOCK bytes it records
+    # how many newlines come before that block, so finding line N is a bisect
+    # plus a scan of a single block. The index is only extended as far as a
+    # request needs, and counting uses bytes.count so it runs at read speed.
+    BLOCK = 64 * 1024
+    SCAN_SIZE = 16 * BLOCK
+
+    def __init__(self, filepath, size):
+        self.filepath = filepath
+        self.size = size
+        self.newlines_before = array('Q', [0])
+        self.scanned = 0
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        return self.scanned >= self.size
+
+    def total_lines(self):
+        if not self.complete:
+            return None
+        newlines = self.newlines_before[-1]
+        # A final line without a trailing newline still counts
+        with open_evidence(self.filepath) as f:
+            if self.size:
+                f.seek(self.size - 1)
+                if f.read(1) != b'\n':
+                    newlines += 1
+        return newlines
+
+    def _extend(self, f, line):
+        # Scan until the index covers the start of the requested line
+        while not self.complete and self.newlines_before[-1] < line:
+            f.seek(self.scanned)
+            chunk = f.read(min(self.SCAN_SIZE, self.size - self.scanned))
+            if not chunk:
+                self.size = self.scanned
+                break
+            for start in range(0, len(chunk), self.BLOCK):
+                end = min(start + self.BLOCK, len(chunk))
+                self.newlines_before.append(self.newlines_before[-1] + chunk.count(b'\n', start, end))
+            self.scanned += len(chunk)
+
+    def locate(self, f, line):
+        # Byte offset where line (0-based) starts, or None past the end
+        if line <= 0:
+            return 0
+        with self.lock:
+            self._extend(f, line)
+            if self.newlines_before[-1] < line:
+                return None
+            # The line-th newline is in the last block that starts before it
+            block = bisect.bisect_left(self.newlines_before, line) - 1
+            remaining = line - self.newlines_before[block]
+        offset = block * self.BLOCK
+        f.seek(offset)
+        data = f.read(self.BLOCK)
+        position = -1
+        for _ in range(remaining):
+            position = data.find(b'\n', position + 1)
+        return offset + position + 1
+
+class TextPager:
+    # Serves line and byte windows of arbitrarily large text files, keeping
+    # one LineIndex per recently viewed file.
+    MAX_FILES = 64
+
+    def __init__(self):
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_index(self, filepath, st):
+        key = (filepath, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            index = self.indexes.get(key)
+            if index is None:
+                index = LineIndex(filepath, st.st_size)
+                self.indexes[key] = index
+                while len(self.indexes) > self.MAX_FILES:
+                    self.indexes.popitem(last=False)
+            else:
+                self.indexes.move_to_end(key)
+            return index
+
+    def read_lines(self, filepath, line=0, count=TEXT_PAGE_LINES):
+        st = os.stat(filepath)
+        index = self.get_index(filepath, st)
+        line = max(int(line), 0)
+        count = max(min(int(count), TEXT_MAX_PAGE_LINES), 1)
+
+        with open_evidence(filepath) as f:
+            offset = index.locate(f, line)
+            if offset is None:
+                data = b''
+                offset = st.st_size
+            else:
+                f.seek(offset)
+                data = b''
+                while data.count(b'\n') < count and len(data) < TEXT_MAX_PAGE_BYTES:
+                    chunk = f.read(LineIndex.BLOCK)
+                    if not chunk:
+                        break
+                    data += chunk
+
+        # Cut after the count-th newline, or at the byte cap
+        end = -1
+        for _ in range(count):
+            end = data.find(b'\n', end + 1)
+            if end == -1:
+                break
+        if end != -1:
+            data = data[:end + 1]
+        elif len(data) > TEXT_MAX_PAGE_BYTES:
+            data = data[:TEXT_MAX_PAGE_BYTES]
+
+        lines_read = data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+        end_offset = offset + len(data)
+        return {
+            "content": data.decode('utf-8', errors='replace'),
+            "start_line": line,
+            "next_line": line + lines_read,
+            "start_offset": offset,
+            "end_offset": end_offset,
+            "size": st.st_size,
+            "eof": end_offset >= st.st_size,
+            "total_lines": index.total_lines(),
+        }
+
+    def read_bytes(self, filepath, offset=0, length=TEXT_PREVIEW_BYTES):
+        size = os.path.getsize(filepath)
+        offset = min(max(int(offset), 0), size)
+        length = max(min(int(length), TEXT_MAX_PAGE_BYTES), 1)
+        with open_evidence(filepath) as f:
+            f.seek(offset)
+            data = f.read(length)
+        return {
+            "content": data.decode('utf-8', errors='replace'),
+            "start_offset": offset,
+            "end_offset": offset + len(data),
+            "size": size,
+            "eof": offset + len(data) >= size,
+        }
+
+# Office Open XML namespaces
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+P_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+S_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+OFFICE_TEXT_MAX_CHARS = 16 * 1024 * 1024
+
+def iter_xml_part(part):
+    # iterparse that detaches every finished element from its parent, so
+    # memory stays flat however large the part is. An element's children
+    # are gone by the time its own "end" event is handled.
+    stack = []
+    for event, elem in iterparse(part, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            yield event, elem
+        else:
+            stack.pop()
+            yield event, elem
+            if stack:
+                del stack[-1][:]
+
+def ooxml_ordered_parts(package, main_part, item_tag):
+    # [(item element attributes, part name)] in the order the main part
+    # lists them, resolved through its relationships part
+    folder, name = posixpath.split(main_part)
+    targets = {}
+    with package.open(posixpath.join(folder, '_rels', name + '.rels')) as part:
+        for event, elem in iter_xml_part(part):
+            if event == 'start' and elem.tag == REL_NS + 'Relationship':
+                target = elem.get('Target', '')
+                if target.startswith('/'):
+                    targets[elem.get('Id')] = target[1:]
+                else:
+                    targets[elem.get('Id')] = posixpath.normpath(posixpath.join(folder, target))
+    items = []
+    with package.open(main_part) as part:
+        for event, elem in iter_xml_part(part):
+            if event == 'start' and elem.tag == item_tag and elem.get(R_ID) in targets:
+                items.append((dict(elem.attrib), targets[elem.get(R_ID)]))
+    return items
+
+def extract_docx_text(filepath):
+    # Body paragraphs first, then one "cell | cell" line per table row
+    paragraphs = []
+    rows = []
+    tables = []
+    run = []
+    with zipfile.ZipFile(filepath) as package, package.open('word/document.xml') as part:
+        for event, elem in iter_xml_part(part):
+            tag = elem.tag
+            if event == 'start':
+                if tag == W_NS + 'tbl':
+                    tables.append({"rows": [], "row": [], "cell": []})
+                continue
+            if tag == W_NS + 't':
+                run.append(elem.text or '')
+            elif tag == W_NS + 'tab':
+                run.append('\t')
+            elif tag in (W_NS + 'br', W_NS + 'cr'):
+                run.append('\n')
+            elif tag == W_NS + 'p':
+                text = ''.join(run)
+                run = []
+                if tables:
+                    tables[-1]["cell"].append(text)
+                elif text:
+                    paragraphs.append(text)
+            elif tag == W_NS + 'tc' and tables:
+                table = tables[-1]
+                text = '\n'.join(line for line in table["cell"] if line)
+                table["cell"] = []
+                if text:
+                    table["row"].append(text)
+            elif tag == W_NS + 'tr' and tables:
+                table = tables[-1]
+                if table["row"]:
+                    table["rows"].append(" | ".join(table["row"]))
+                table["row"] = []
+            elif tag == W_NS + 'tbl' and tables:
+                table = tables.pop()
+                if tables:
+                    tables[-1]["cell"].extend(table["rows"])
+                else:
+                    rows.extend(table["rows"])
+    return "\n\n".join(paragraphs + rows)
+
+def extract_pptx_text(filepath):
+    full_text = ["=== PRESENTATION OVERVIEW ===\n"]
+    with zipfile.ZipFile(filepath) as package:
+        slides = ooxml_ordered_parts(package, 'ppt/presentation.xml', P_NS + 'sldId')
+        for number, (_, slide_part) in enumerate(slides, 1):
+            title = None
+            texts = []
+            shape = None
+            paragraph = []
+            with package.open(slide_part) as part:
+                for event, elem in iter_xml_part(part):
+                    tag = elem.tag
+                    if event == 'start':
+                        if tag == P_NS + 'sp':
+                            shape = {"title": False, "paragraphs": []}
+                        elif tag == P_NS + 'ph' and shape is not None:
+                            shape["title"] = elem.get('type') in ('title', 'ctrTitle')
+                        continue
+                    if shape is None:
+                        continue
+                    if tag == A_NS + 't':
+                        paragraph.append(elem.text or '')
+                    elif tag == A_NS + 'br':
+                        paragraph.append('\n')
+                    elif tag == A_NS + 'p':
+                        shape["paragraphs"].append(''.join(paragraph))
+                        paragraph = []
+                    elif tag == P_NS + 'sp':
+                        text = '\n'.join(shape["paragraphs"])
+                        if shape["title"] and title is None:
+                            title = text
+                        elif text:
+                            texts.append(text)
+                        shape = None
+            slide_text = [f"\n=== SLIDE {number} ==="]
+            if title is not None:
+                slide_text.append(f"Title: {title}")
+            full_text.append("\n".join(slide_text + texts))
+    return "\n\n".join(full_text)
+
+def feed_xml_part(part, target):
+    # Pushes a part through expat into a parser target without building any
+    # tree; used for spreadsheet parts, which can hold millions of cells
+    parser = XMLParser(target=target)
+    while True:
+        chunk = part.read(64 * 1024)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    return parser.close()
+
+class SharedStringsReader:
+    # Parser target collecting xl/sharedStrings.xml, skipping phonetic runs
+    def __init__(self):
+        self.strings = []
+        self.texts = []
+        self.capture = False
+        self.phonetic = 0
+
+    def start(self, tag, attrib):
+        if tag == S_NS + 't' and not self.phonetic:
+            self.capture = True
+        elif tag == S_NS + 'rPh':
+            self.phonetic += 1
+
+    def data(self, text):
+        if self.capture:
+            self.texts.append(text)
+
+    def end(self, tag):
+        if tag == S_NS + 't':
+            self.capture = False
+        elif tag == S_NS + 'rPh':
+            self.phonetic -= 1
+        elif tag == S_NS + 'si':
+            self.strings.append(''.join(self.texts))
+            self.texts = []
+
+    def close(self):
+        return self.strings
+
+class WorksheetReader:
+    # Parser target turning one worksheet into "a | b | c" lines. Stops
+    # collecting once the shared character budget is spent.
+    def __init__(self, shared, budget):
+        self.shared = shared
+        self.budget = budget
+        self.lines = []
+        self.row = []
+        self.texts = []
+        self.capture = False
+        self.cell_type = None
+        self.value = None
+
+    def start(self, tag, attrib):
+        if tag == S_NS + 'c':
+            self.cell_type = attrib.get('t')
+            self.value = None
+            self.texts = []
+        elif tag == S_NS + 'v' or tag == S_NS + 't':
+            self.capture = True
+
+    def data(self, text):
+        if self.capture:
+            self.texts.append(text)
+
+    def end(self, tag):
+        if tag == S_NS + 'v' or tag == S_NS + 't':
+            self.capture = False
+        elif tag == S_NS + 'c':
+            value = ''.join(self.texts)
+            if self.cell_type == 's' and value:
+                index = int(value)
+                value = self.shared[index] if index < len(self.shared) else ''
+            elif self.cell_type == 'b' and value:
+                value = 'TRUE' if value == '1' else 'FALSE'
+            if value:
+                self.row.append(value)
+        elif tag == S_NS + 'row':
+            if self.row and self.budget > 0:
+                line = " | ".join(self.row)
+                self.lines.append(line)
+                self.budget -= len(line) + 1
+            self.row = []
+
+    def close(self):
+        return self.lines
+
+def extract_xlsx_text(filepath):
+    # One "=== SHEET name ===" block per worksheet, capped at
+    # OFFICE_TEXT_MAX_CHARS in total
+    with zipfile.ZipFile(filepath) as package:
+        shared = []
+        if 'xl/sharedStrings.xml' in package.namelist():
+            with package.open('xl/sharedStrings.xml') as part:
+                shared = feed_xml_part(part, SharedStringsReader())
+
+        sheets = []
+        budget = OFFICE_TEXT_MAX_CHARS
+        for attributes, sheet_part in ooxml_ordered_parts(package, 'xl/workbook.xml', S_NS + 'sheet'):
+            if budget <= 0:
+                sheets.append("[... truncated ...]")
+                break
+            reader = WorksheetReader(shared, budget)
+            with package.open(sheet_part) as part:
+                lines = feed_xml_part(part, reader)
+            budget = reader.budget
+            sheets.append("\n".join([f"=== SHEET {attributes.get('name', sheet_part)} ==="] + lines))
+    return "\n\n".join(sheets)
+
+class ExtractorRegistry:
+    # Text extractors by file extension. An entry is either the extractor or
+    # a "module:function" string naming it; the module is imported the first
+    # time a file of that type is read, so a backend nobody needs costs
+    # nothing at startup and a missing one only disables its own format.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def register(self, extension, extractor):
+        with self.lock:
+            self.entries[extension.lower()] = extractor
+
+    def get(self, extension):
+        extractor = self.entries.get(extension)
+        if not isinstance(extractor, str):
+            return extractor
+        with self.lock:
+            extractor = self.entries.get(extension)
+            if isinstance(extractor, str):
+                module_name, _, function_name = extractor.partition(':')
+                try:
+                    extractor = getattr(importlib.import_module(module_name), function_name)
+                except (ImportError, AttributeError) as e:
+                    log.warning("Text extractor %s for %s is unavailable: %s", extractor, extension, e)
+                    extractor = None
+                self.entries[extension] = extractor
+        return extractor
+
+    def for_path(self, path):
+        return self.get(os.path.splitext(path.lower())[1])
+
+TEXT_EXTRACTORS = ExtractorRegistry()
+TEXT_EXTRACTORS.register('.docx', extract_docx_text)
+TEXT_EXTRACTORS.register('.pptx', extract_pptx_text)
+TEXT_EXTRACTORS.register('.xlsx', extract_xlsx_text)
+# What the built-in extractors raise for unreadable or malformed documents
+EXTRACTION_ERRORS = (OSError, KeyError, ValueError, zipfile.BadZipFile, ParseError)
+# The built-in extractors read Office Open XML, which is always a zip
+ZIP_EXTRACTORS = (extract_docx_text, extract_pptx_text, extract_xlsx_text)
+ZIP_MAGIC = b'PK\x03\x04'
+# Extra formats without code changes, e.g. ".pdf=mypackage.pdf:extract_text";
+# set in the environment, so process-pool workers register them too
+for entry in filter(None, os.environ.get('INVESTIGATOR_EXTRACTORS', '').split(';')):
+    extension, _, target = entry.partition('=')
+    TEXT_EXTRACTORS.register(extension.strip(), target.strip())
+
+OFFICE_TEXT_CACHE_BYTES = 64 * 1024 * 1024
+OFFICE_TEXT_DIR = os.path.join(DATA_DIR, 'office_text')
+OFFICE_TEXT_DISK_CACHE = os.environ.get('INVESTIGATOR_OFFICE_TEXT_DISK_CACHE', '1') != '0'
+OFFICE_PREFETCH_WORKERS = 2
+OFFICE_PREFETCH_MAX_PENDING = 256
+
+class OfficeTextCache:
+    # Extracted Office document text, keyed by (path, device, inode, size,
+    # mtime) so an edited or replaced file is never served stale. Memory use
+    # is bounded by a byte budget with LRU eviction; entries are also written
+    # under DATA_DIR so they survive restarts (never next to the evidence).
+    def __init__(self, budget=OFFICE_TEXT_CACHE_BYTES, directory=OFFICE_TEXT_DIR, use_disk=OFFICE_TEXT_DISK_CACHE):
+        self.budget = budget
+        self.directory = directory if use_disk else None
+        self.entries = OrderedDict()
+        self.used = 0
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.pool = None
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, filepath, st):
+        return (os.path.abspath(filepath), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8', errors='surrogateescape')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.txt')
+
+    def lookup(self, key):
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return text
+        if self.directory:
+            try:
+                with open(self.disk_path(key), 'r', encoding='utf-8') as f:
+                    text = f.read()
+                self.store(key, text, persist=False)
+                with self.lock:
+                    self.hits += 1
+                return text
+            except OSError:
+                pass
+        return None
+
+    def store(self, key, text, persist=True):
+        size = len(text) * 2
+        with self.lock:
+            if size <= self.budget and key not in self.entries:
+                self.entries[key] = text
+                self.used += size
+                while self.used > self.budget:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.used -= len(evicted) * 2
+        if persist and self.directory:
+            path = self.disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(temp, path)
+            except OSError as e:
+                log.warning("Cannot write Office text cache: %s", e)
+
+    def get(self, filepath, extractor, st=None):
+        st = st or os.stat(filepath)
+        key = self.make_key(filepath, st)
+        text = self.lookup(key)
+        if text is None:
+            with self.lock:
+                self.misses += 1
+            text = extractor(filepath)
+            self.store(key, text)
+        return text
+
+    def prefetch(self, filepath, extractor, st):
+        key = self.make_key(filepath, st)
+        with self.lock:
+            if key in self.entries or key in self.pending or len(self.pending) >= OFFICE_PREFETCH_MAX_PENDING:
+                return
+            self.pending.add(key)
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=OFFICE_PREFETCH_WORKERS)
+        self.pool.submit(self._prefetch, filepath, extractor, st, key)
+
+    def _prefetch(self, filepath, extractor, st, key):
+        try:
+            if self.lookup(key) is None:
+                text = extractor(filepath)
+                self.store(key, text)
+        except Exception as e:
+            log.warning("Office prefetch failed for %s: %s", filepath, e)
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.used, "budget": self.budget,
+                    "hits": self.hits, "misses": self.misses, "pending": len(self.pending)}
+
+HEX_ROW_BYTES = 16
+HEX_PAGE_BYTES = 4096
+HEX_MAX_PAGE_BYTES = 64 * 1024
+HEX_MAX_MATCHES = 100
+HEX_ASCII = bytes(byte if 32 <= byte < 127 else ord('.') for byte in range(256))
+
+def open_mapped(filepath):
+    # Read-only mapping of the whole file; pages are only faulted in for the
+    # windows actually touched. Returns (file, mmap or None for empty files).
+    f = open_evidence(filepath)
+    try:
+        if os.fstat(f.fileno()).st_size == 0:
+            return f, None
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+
+def format_hex_rows(data, base_offset):
+    rows = []
+    for start in range(0, len(data), HEX_ROW_BYTES):
+        row = data[start:start + HEX_ROW_BYTES]
+        rows.append({
+            "offset": base_offset + start,
+            "hex": row.hex(' '),
+            "ascii": row.translate(HEX_ASCII).decode('ascii'),
+        })
+    return rows
+
+def parse_byte_pattern(pattern, pattern_type="hex"):
+    if not pattern:
+        raise ValueError("Empty search pattern")
+    if pattern_type == "hex":
+        cleaned = re.sub(r'[\s:]|0x', '', pattern, flags=re.IGNORECASE)
+        try:
+            return bytes.fromhex(cleaned)
+        except ValueError:
+            raise ValueError(f"Invalid hex pattern: {pattern}")
+    if pattern_type == "text":
+        return pattern.encode('utf-8')
+    if pattern_type == "utf16":
+        return pattern.encode('utf-16-le')
+    raise ValueError(f"Unknown pattern type: {pattern_type}")
+
+GREP_CHUNK_SIZE = 4 * 1024 * 1024
+# Longest match guaranteed to be found across a chunk boundary
+GREP_OVERLAP = 4096
+GREP_CONTEXT = 40
+GREP_MAX_HITS_PER_FILE = 100
+# Upper bound on one wait for new results; the job wakes streams sooner
+GREP_STREAM_WAIT_SECONDS = 5
+GREP_PRESETS = {
+    "email": rb'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}',
+    "bitcoin": rb'\b(?:bc1[ac-hj-np-z02-9]{11,71}|[13][a-km-zA-HJ-NP-Z1-9]{25,34})\b',
+    "ipv4": rb'\b(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b',
+    "url": rb'https?://[^\s"\'<>]{4,}',
+}
+# A literal every match of the preset contains; chunks without it are skipped
+GREP_PRESET_LITERALS = {"email": b'@', "url": b'://', "ipv4": b'.'}
+GREP_ALNUM_MASK = bytes(1 if chr(i).isalnum() and i < 128 else 0 for i in range(256))
+
+def anchor_windows(buffer, literal, before, after):
+    # Regions around each occurrence of a literal, merged when they overlap
+    windows = []
+    position = buffer.find(literal)
+    while position != -1:
+        low, high = max(position - before, 0), position + after
+        if windows and low <= windows[-1][1]:
+            windows[-1][1] = high
+        else:
+            windows.append([low, high])
+        position = buffer.find(literal, high - after + 1)
+    return windows
+
+def alnum_run_windows(buffer, min_length):
+    # Runs of at least min_length ASCII letters/digits, found with
+    # translate + find instead of a per-position character-class scan
+    mask = buffer.translate(GREP_ALNUM_MASK)
+    needle = b'\x01' * min_length
+    windows = []
+    position = mask.find(needle)
+    while position != -1:
+        end = mask.find(b'\x00', position + min_length)
+        if end == -1:
+            end = len(mask)
+        windows.append([position, end])
+        position = mask.find(needle, end)
+    return windows
+
+# Presets whose regex is only run inside candidate windows
+GREP_PRESET_WINDOWS = {
+    "email": lambda buffer: anchor_windows(buffer, b'@', 64, 256),
+    "bitcoin": lambda buffer: alnum_run_windows(buffer, 26),
+}
+
+class SearchPatterns:
+    # Compiled form of a content search. Keywords are matched with
+    # bytes.find (on a lower-cased copy of the chunk when case-insensitive),
+    # which is far faster than folding everything into one regex
+    # alternation: that defeats the regex engine's literal-prefix scan.
+    # Regexes and presets each get their own pass, skipped entirely when a
+    # literal they require is absent from the chunk.
+    def __init__(self, patterns):
+        self.keywords = []
+        self.regexes = []
+        for spec in patterns:
+            if isinstance(spec, str):
+                spec = {"pattern": spec}
+            text = spec.get("pattern") or ""
+            kind = spec.get("type", "keyword")
+            if kind == "keyword":
+                if not text:
+                    raise ValueError("Empty keyword")
+                ignore_case = spec.get("ignore_case", True)
+                encodings = ['utf-8', 'utf-16-le'] if spec.get("utf16") else ['utf-8']
+                for encoding in encodings:
+                    needle = text.encode(encoding)
+                    self.keywords.append((text, needle.lower() if ignore_case else needle, ignore_case))
+            elif kind == "preset":
+                if text not in GREP_PRESETS:
+                    raise ValueError(f"Unknown preset: {text}")
+                self.regexes.append((text, re.compile(GREP_PRESETS[text]), GREP_PRESET_LITERALS.get(text),
+                                     GREP_PRESET_WINDOWS.get(text)))
+            elif kind == "regex":
+                flags = re.IGNORECASE if spec.get("ignore_case") else 0
+                self.regexes.append((text, re.compile(text.encode('utf-8'), flags), None, None))
+            else:
+                raise ValueError(f"Unknown pattern type: {kind}")
+        if not self.keywords and not self.regexes:
+            raise ValueError("No search patterns given")
+
+    def scan(self, buffer, base, accept_from, accept_before, hits, max_hits):
+        # Appends hits that start in [accept_from, accept_before), in offset order
+        begin = max(accept_from - base, 0)
+        stop = accept_before - base
+        room = max_hits - len(hits)
+        found = []
+        lowered = None
+        for label, needle, ignore_case in self.keywords:
+            haystack = buffer
+            if ignore_case:
+                if lowered is None:
+                    lowered = buffer.lower()
+                haystack = lowered
+            position = haystack.find(needle, begin)
+            count = 0
+            while position != -1 and position < stop and count < room:
+                found.append((position, position + len(needle), label))
+                count += 1
+                position = haystack.find(needle, position + 1)
+        for label, regex, literal, locate in self.regexes:
+            if literal is not None and literal not in buffer:
+                continue
+            windows = locate(buffer) if locate else [[begin, len(buffer)]]
+            count = 0
+            last = -1
+            for low, high in windows:
+                if low >= stop or count >= room:
+                    break
+                for match in regex.finditer(buffer, max(low, begin), high):
+                    if match.start() >= stop or count >= room:
+                        break
+                    if match.start() > last:
+                        found.append((match.start(), match.end(), label))
+                        last = match.start()
+                        count += 1
+
+        found.sort()
+        for start, end, label in found[:room]:
+            context_start = max(start - GREP_CONTEXT, 0)
+            hits.append({
+                "offset": base + start,
+                "pattern": label,
+                "match": buffer[start:end].decode('utf-8', errors='replace'),
+                "context": buffer[context_start:end + GREP_CONTEXT].decode('utf-8', errors='replace'),
+            })
+
+def grep_file(path, patterns, max_hits=GREP_MAX_HITS_PER_FILE):
+    # Streams one file in fixed-size chunks; consecutive chunks share
+    # GREP_OVERLAP bytes and each hit is only reported from the chunk where
+    # it starts outside the shared tail, so nothing is counted twice.
+    if not isinstance(patterns, SearchPatterns):
+        patterns = SearchPatterns(patterns)
+    hits = []
+    lower = path.lower()
+    extractor = TEXT_EXTRACTORS.get(os.path.splitext(lower)[1])
+    extraction_error = None
+    if extractor in ZIP_EXTRACTORS:
+        # A renamed or damaged file with an Office extension is not a zip;
+        # it gets the raw byte scan below instead
+        with open_evidence(path) as f:
+            if f.read(len(ZIP_MAGIC)) != ZIP_MAGIC:
+                extractor = None
+                extraction_error = "Not an Office Open XML (zip) file"
+    if extractor:
+        try:
+            data = extractor(path).encode('utf-8')
+        except Exception as e:
+            extraction_error = str(e)
+        else:
+            patterns.scan(data, 0, 0, len(data) + 1, hits, max_hits)
+            return {"path": path, "scanned": os.path.getsize(path), "extracted": True, "hits": hits}
+
+    scanned = 0
+    with open_evidence(path) as f:
+        carry = b''
+        while len(hits) < max_hits:
+            chunk = f.read(GREP_CHUNK_SIZE)
+            buffer = carry + chunk
+            base = scanned - len(carry)
+            scanned += len(chunk)
+            at_end = len(chunk) < GREP_CHUNK_SIZE
+            accept_before = scanned + 1 if at_end else scanned - GREP_OVERLAP
+            patterns.scan(buffer, base, base, accept_before, hits, max_hits)
+            if at_end:
+                break
+            carry = buffer[-GREP_OVERLAP:]
+    result = {"path": path, "scanned": scanned, "hits": hits}
+    if extraction_error:
+        result["extraction_error"] = extraction_error
+    return result
+
+def grep_files(paths, patterns, max_hits=GREP_MAX_HITS_PER_FILE):
+    # Process pool entry point; files without hits are only counted
+    results = []
+    scanned = 0
+    patterns = SearchPatterns(patterns)
+    for path in paths:
+        try:
+            result = grep_file(path, patterns, max_hits)
+        except Exception as e:
+            results.append({"path": path, "error": str(e), "hits": []})
+            continue
+        scanned += result["scanned"]
+        if result["hits"]:
+            results.append(result)
+    return {"files": len(paths), "scanned": scanned, "results": results}
+
+class ContentSearchEngine(PoolJobEngine):
+    # Runs content searches as background jobs over a process pool. Results
+    # are appended to the job as each batch finishes so clients can stream
+    # them; cancelling stops dispatching and drops batches not yet started.
+    KIND = "search"
+    BATCH_FILES = 32
+
+    def start_job(self, files, patterns, max_hits=GREP_MAX_HITS_PER_FILE):
+        SearchPatterns(patterns)
+        job = {
+            "patterns": patterns,
+            "files_total": len(files),
+            "bytes_total": sum(size for _, size in files),
+            "files_done": 0,
+            "bytes_done": 0,
+            "hits": 0,
+            "errors": 0,
+            "cancelled": False,
+        }
+        return self.add_job(job, self._run_job, files, patterns, max_hits)
+
+    def _run_job(self, job, files, patterns, max_hits):
+        pool = self.get_pool()
+        futures = set()
+        batches = self.batches(files)
+        # Keep only a couple of batches per worker in flight so a cancel
+        # takes effect quickly
+        for batch in batches:
+            futures.add(pool.submit(grep_files, batch, patterns, max_hits))
+            if len(futures) >= self.workers * 2:
+                break
+        while futures and not job["cancelled"]:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                with self.lock:
+                    job["files_done"] += outcome["files"]
+                    job["bytes_done"] += outcome["scanned"]
+                    for result in outcome["results"]:
+                        job["results"].append(result)
+                        job["hits"] += len(result["hits"])
+                        if "error" in result:
+                            job["errors"] += 1
+                    self.updated.notify_all()
+                if not job["cancelled"]:
+                    batch = next(batches, None)
+                    if batch is not None:
+                        futures.add(pool.submit(grep_files, batch, patterns, max_hits))
+        for future in futures:
+            future.cancel()
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job["cancelled"] = True
+            return True
+
+    def add_rates(self, status, elapsed):
+        status["gb_per_second"] = round(status["bytes_done"] / 1e9 / elapsed, 3) if elapsed > 0 else None
+
+THUMBNAIL_DIR = os.path.join(DATA_DIR, 'thumbnails')
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+THUMBNAIL_DEFAULT_SIZE = 128
+THUMBNAIL_MAX_SOURCE_BYTES = 256 * 1024 * 1024
+THUMBNAIL_VIDEO_SAMPLE = 1024 * 1024
+THUMBNAIL_TIMEOUT = 60
+
+def thumbnail_path(directory, digest, size):
+    return os.path.join(directory, digest[:2], f"{digest}_{size}.jpg")
+
+def video_frame(filepath):
+    # First frame after one second, as PNG bytes, or None without ffmpeg
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return None
+    result = subprocess.run([ffmpeg, '-v', 'error', '-ss', '1', '-i', filepath, '-frames:v', '1',
+                             '-f', 'image2pipe', '-vcodec', 'png', '-'],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=THUMBNAIL_TIMEOUT)
+    return result.stdout or None
+
+@functools.lru_cache(maxsize=None)
+def load_pil():
+    # Pillow is imported on first use, and only once: a failed import is
+    # remembered instead of being retried on every image
+    try:
+        from PIL import Image
+        from PIL.ExifTags import TAGS
+    except ImportError as e:
+        return e
+    return Image, TAGS
+
+def pil_modules():
+    loaded = load_pil()
+    if isinstance(loaded, ImportError):
+        raise loaded
+    return loaded
+
+def make_thumbnail(filepath, size, directory=THUMBNAIL_DIR, video=False):
+    # Runs in a worker process. Thumbnails are stored under the SHA-256 of
+    # the source, so identical files share one thumbnail and a changed file
+    # never gets a stale one. Images are hashed in full from the same buffer
+    # that is decoded; videos are addressed by a digest of their size plus
+    # the first and last THUMBNAIL_VIDEO_SAMPLE bytes. Returns the path.
+    Image, _ = pil_modules()
+
+    with open_evidence(filepath) as f:
+        if video:
+            file_size = os.fstat(f.fileno()).st_size
+            sha = hashlib.sha256(str(file_size).encode())
+            sha.update(f.read(THUMBNAIL_VIDEO_SAMPLE))
+            f.seek(max(file_size - THUMBNAIL_VIDEO_SAMPLE, 0))
+            sha.update(f.read(THUMBNAIL_VIDEO_SAMPLE))
+            data = None
+        else:
+            data = f.read(THUMBNAIL_MAX_SOURCE_BYTES + 1)
+            if len(data) > THUMBNAIL_MAX_SOURCE_BYTES:
+                raise ValueError("Image too large for a thumbnail")
+            sha = hashlib.sha256(data)
+    target = thumbnail_path(directory, sha.hexdigest(), size)
+    if os.path.exists(target):
+        return target
+
+    if video:
+        data = video_frame(filepath)
+        if data is None:
+            raise ValueError("No video frame available (ffmpeg not found or unreadable video)")
+    image = Image.open(io.BytesIO(data))
+    # JPEG (and some other decoders) can decode at 1/2, 1/4 or 1/8 scale
+    # directly, which skips most of the work for large photos
+    image.draft('RGB', (size, size))
+    image.thumbnail((size, size), reducing_gap=2.0)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp = f"{target}.{os.getpid()}.tmp"
+    image.save(temp, 'JPEG', quality=80)
+    os.replace(temp, target)
+    return target
+
+class ThumbnailService(PoolService):
+    # Generates thumbnails on a process pool and remembers which stored
+    # thumbnail belongs to which (path, device, inode, size, mtime), so
+    # repeat requests are answered without reading the source again.
+    # Concurrent requests for the same thumbnail share one job.
+    MAX_REMEMBERED = 10000
+
+    def __init__(self, directory=THUMBNAIL_DIR, workers=None):
+        super().__init__(workers)
+        self.directory = directory
+        self.known = OrderedDict()
+        self.pending = {}
+
+    def normalize_size(self, size):
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return THUMBNAIL_DEFAULT_SIZE
+        # Snap to a fixed set so the cache is not filled with odd sizes
+        for allowed in THUMBNAIL_SIZES:
+            if size <= allowed:
+                return allowed
+        return THUMBNAIL_SIZES[-1]
+
+    def get(self, filepath, size=THUMBNAIL_DEFAULT_SIZE, video=False):
+        size = self.normalize_size(size)
+        st = os.stat(filepath)
+        key = (os.path.abspath(filepath), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, size)
+        with self.lock:
+            target = self.known.get(key)
+            if target is not None and os.path.exists(target):
+                self.known.move_to_end(key)
+                return target
+            future = self.pending.get(key)
+        if future is None:
+            future = self.get_pool().submit(make_thumbnail, filepath, size, self.directory, video)
+            with self.lock:
+                future = self.pending.setdefault(key, future)
+        try:
+            target = future.result(timeout=THUMBNAIL_TIMEOUT)
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+        with self.lock:
+            self.known[key] = target
+            while len(self.known) > self.MAX_REMEMBERED:
+                self.known.popitem(last=False)
+        return target
+
+EXPORT_CHUNK_SIZE = 1024 * 1024
+EXPORT_QUEUE_CHUNKS = 16
+EXPORT_FORMATS = ("zip", "tar")
+EXPORT_MANIFEST = "MANIFEST.json"
+
+class ExportCancelled(Exception):
+    pass
+
+class StreamPipe:
+    # Write-only file object handed to zipfile/tarfile. Written data goes
+    # through a bounded queue to the response generator, so the archive is
+    # never held in memory or on disk; the writer blocks while the client
+    # is slow and gives up once the client has gone away.
+    def __init__(self, max_chunks=EXPORT_QUEUE_CHUNKS):
+        self.queue = queue.Queue(max_chunks)
+        self.cancelled = threading.Event()
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        while True:
+            if self.cancelled.is_set():
+                raise ExportCancelled()
+            try:
+                self.queue.put(data, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def finish(self, error=None):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(error or StopIteration, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is StopIteration:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancelled.set()
+
+def export_member_name(path):
+    # Archive name that keeps the original location: C:\Users\x -> C/Users/x
+    drive, rest = os.path.splitdrive(os.path.abspath(path))
+    parts = [drive.rstrip(':\\/').replace(':', '')] if drive else []
+    parts.extend(part for part in rest.replace('\\', '/').split('/') if part)
+    return '/'.join(parts)
+
+class HashingReader:
+    # Wraps an evidence file being archived: hashes what is read and
+    # zero-pads up to the size recorded in the member header if the file
+    # shrinks while it is being exported, so the archive stays valid
+    def __init__(self, source, size):
+        self.source = source
+        self.remaining = size
+        self.sha = hashlib.sha256()
+        self.copied = 0
+
+    def read(self, size=EXPORT_CHUNK_SIZE):
+        size = min(size if size and size > 0 else EXPORT_CHUNK_SIZE, self.remaining)
+        if size <= 0:
+            return b''
+        data = self.source.read(size)
+        self.sha.update(data)
+        self.copied += len(data)
+        if len(data) < size:
+            data += bytes(size - len(data))
+        self.remaining -= len(data)
+        return data
+
+def write_export(files, pipe, archive_format="zip"):
+    # Writes every (path, size) into the archive followed by a manifest of
+    # SHA-256 values computed in the same read pass. Runs on its own thread.
+    import platform
+    manifest = {"created": datetime.now().isoformat(timespec='seconds'), "format": archive_format,
+                "host": platform.node(), "files": [], "errors": []}
+    try:
+        if archive_format == "zip":
+            archive = zipfile.ZipFile(pipe, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            archive = tarfile.open(fileobj=pipe, mode='w|', format=tarfile.PAX_FORMAT,
+                                   bufsize=EXPORT_CHUNK_SIZE, copybufsize=EXPORT_CHUNK_SIZE)
+        with archive:
+            for path, _ in files:
+                name = export_member_name(path)
+                try:
+                    with open_evidence(path) as source:
+                        st = os.fstat(source.fileno())
+                        size = st.st_size
+                        reader = HashingReader(source, size)
+                        if archive_format == "zip":
+                            info = zipfile.ZipInfo(name, time.localtime(max(st.st_mtime, 315532800))[:6])
+                            info.file_size = size
+                            with archive.open(info, 'w', force_zip64=size > 0xFFFFFFFF) as member:
+                                for chunk in iter(reader.read, b''):
+                                    member.write(chunk)
+                        else:
+                            info = tarfile.TarInfo(name)
+                            info.size = size
+                            info.mtime = st.st_mtime
+                            info.mode = stat.S_IMODE(st.st_mode)
+                            archive.addfile(info, reader)
+                        digest, copied = reader.sha.hexdigest(), reader.copied
+                    entry = {"path": path, "name": name, "size": size, "sha256": digest,
+                             "mtime": datetime.fromtimestamp(st.st_mtime).isoformat()}
+                    if copied != size:
+                        entry["error"] = f"File shrank while exporting ({copied} of {size} bytes read)"
+                    manifest["files"].append(entry)
+                except OSError as e:
+                    manifest["errors"].append({"path": path, "error": str(e)})
+
+            data = json.dumps(manifest, indent=2).encode('utf-8')
+            if archive_format == "zip":
+                archive.writestr(EXPORT_MANIFEST, data)
+            else:
+                info = tarfile.TarInfo(EXPORT_MANIFEST)
+                info.size = len(data)
+                info.mtime = time.time()
+                archive.addfile(info, io.BytesIO(data))
+        pipe.finish()
+    except ExportCancelled:
+        pass
+    except Exception as e:
+        pipe.finish(e)
+
+def stream_export(files, archive_format="zip"):
+    pipe = StreamPipe()
+    threading.Thread(target=write_export, args=(files, pipe, archive_format), daemon=True).start()
+    return iter(pipe)
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archives')
+# Part of every index's cache key; bumped when the index layout changes
+ARCHIVE_INDEX_VERSION = 2
+ARCHIVE_EXTENSIONS = {
+    '.zip': 'zip',
+    '.tar': 'tar', '.tar.gz': 'tar', '.tgz': 'tar', '.tar.bz2': 'tar',
+    '.tbz': 'tar', '.tbz2': 'tar', '.tar.xz': 'tar', '.txz': 'tar',
+}
+ARCHIVE_BUFFER_BYTES = 64 * 1024 * 1024
+TAR_COMPRESSIONS = ((b'\x1f\x8b', 'gz', gzip.open), (b'BZh', 'bz2', bz2.open), (b'\xfd7zXZ\x00', 'xz', lzma.open))
+ZIP_EOCD = struct.Struct("<4s4H2LH")
+ZIP64_LOCATOR = struct.Struct("<4sLQL")
+ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+ZIP_CENTRAL = struct.Struct("<4s4B4HL2L5H2L")
+ZIP_LOCAL = struct.Struct("<4s2B4HL2L2H")
+
+def archive_format(path):
+    name = path.lower()
+    for extension, kind in ARCHIVE_EXTENSIONS.items():
+        if name.endswith(extension):
+            return kind
+    return None
+
+def clean_member_name(name):
+    # Members are addressed by "/"-joined components; absolute names and
+    # "." / ".." components are dropped so a virtual path never escapes
+    return '/'.join(part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..'))
+
+@functools.lru_cache(maxsize=65536)
+def dos_timestamp(dos_date, dos_time):
+    try:
+        return time.mktime(((dos_date >> 9) + 1980, (dos_date >> 5) & 0xF, dos_date & 0x1F,
+                            dos_time >> 11, (dos_time >> 5) & 0x3F, (dos_time & 0x1F) * 2, 0, 1, -1))
+    except (OverflowError, ValueError):
+        return None
+
+def zip_central_directory(f):
+    # (offset, entry count) of the central directory. Data prepended to the
+    # archive (self-extractors) shifts every recorded offset by the same bias,
+    # which is added back here and returned so local headers can be found too.
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    tail_size = min(file_size, ZIP_EOCD.size + 0xFFFF)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+    position = tail.rfind(b'PK\x05\x06')
+    if position < 0 or tail_size - position < ZIP_EOCD.size:
+        raise zipfile.BadZipFile("End of central directory record not found")
+    record_offset = file_size - tail_size + position
+    _, _, _, _, count, cd_size, cd_offset, _ = ZIP_EOCD.unpack_from(tail, position)
+
+    locator_offset = record_offset - ZIP64_LOCATOR.size
+    if locator_offset >= ZIP64_EOCD.size:
+        f.seek(locator_offset)
+        if f.read(4) == b'PK\x06\x07':
+            f.seek(locator_offset - ZIP64_EOCD.size)
+            record = f.read(ZIP64_EOCD.size)
+            if record[:4] != b'PK\x06\x06':
+                raise zipfile.BadZipFile("Corrupt zip64 end of central directory record")
+            record_offset = locator_offset - ZIP64_EOCD.size
+            _, _, _, _, _, _, _, count, cd_size, cd_offset = ZIP64_EOCD.unpack(record)
+
+    bias = record_offset - cd_size - cd_offset
+    if bias < 0:
+        raise zipfile.BadZipFile("Central directory offset is past its end record")
+    return cd_offset + bias, count, bias
+
+def zip64_sizes(extra, size, csize, offset):
+    # The zip64 extra field (0x0001) holds the 64-bit values of whichever of
+    # size, compressed size and header offset overflowed, in that order
+    position = 0
+    while position + 4 <= len(extra):
+        tag, length = struct.unpack_from("<2H", extra, position)
+        if tag == 0x0001:
+            values = iter(struct.unpack_from(f"<{min(length, len(extra) - position - 4) // 8}Q", extra, position + 4))
+            if size == 0xFFFFFFFF:
+                size = next(values, size)
+            if csize == 0xFFFFFFFF:
+                csize = next(values, csize)
+            if offset == 0xFFFFFFFF:
+                offset = next(values, offset)
+            break
+        position += 4 + length
+    return size, csize, offset
+
+def iter_zip_members(archive, block_size=4 * 1024 * 1024):
+    # Walks the central directory a block at a time, so memory does not grow
+    # with the number of entries. Yields (name, is_dir, size, mtime, offset,
+    # compressed size, method, flags, crc).
+    with open(archive, 'rb') as f:
+        cd_offset, count, bias = zip_central_directory(f)
+        f.seek(cd_offset)
+        buffer = b''
+        position = 0
+        for _ in range(count):
+            if len(buffer) - position < ZIP_CENTRAL.size + 3 * 0xFFFF:
+                buffer = buffer[position:] + f.read(block_size)
+                position = 0
+            if len(buffer) - position < ZIP_CENTRAL.size or buffer[position:position + 4] != b'PK\x01\x02':
+                raise zipfile.BadZipFile("Truncated or corrupt central directory")
+            (_, _, _, _, _, flags, method, dos_time, dos_date, crc, csize, size, name_length,
+             extra_length, comment_length, _, _, external_attr, offset) = ZIP_CENTRAL.unpack_from(buffer, position)
+            position += ZIP_CENTRAL.size
+            raw_name = buffer[position:position + name_length]
+            if raw_name.isascii():
+                name = raw_name.decode('ascii')
+            else:
+                name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437', errors='replace')
+            position += name_length
+            if extra_length:
+                size, csize, offset = zip64_sizes(buffer[position:position + extra_length], size, csize, offset)
+            position += extra_length + comment_length
+            is_dir = name.endswith(('/', '\\')) or stat.S_ISDIR(external_attr >> 16)
+            yield (name, is_dir, size, dos_timestamp(dos_date, dos_time), offset + bias, csize, method, flags, crc)
+
+def tar_compression(archive):
+    with open(archive, 'rb') as f:
+        head = f.read(6)
+    for magic, compression, _ in TAR_COMPRESSIONS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def open_tar_stream(archive, compression):
+    for _, name, opener in TAR_COMPRESSIONS:
+        if name == compression:
+            return opener(archive, 'rb')
+    return open(archive, 'rb')
+
+def iter_tar_members(archive, compression):
+    # Reads member headers one at a time; TarFile's own member list is
+    # emptied as it goes so a million-entry tar is not held in memory.
+    # Offsets are positions in the decompressed stream.
+    with open_tar_stream(archive, compression) as stream, tarfile.open(fileobj=stream, mode='r:') as tf:
+        while True:
+            info = tf.next()
+            if info is None:
+                break
+            tf.members = []
+            if info.isdir():
+                yield (info.name, True, None, info.mtime, None, None, None, None, None)
+            elif info.isreg():
+                yield (info.name, False, info.size, info.mtime, info.offset_data, info.size, None, None, None)
+
+class ArchiveMemberReader(io.RawIOBase):
+    # Read-only, seekable window onto one tar member. Over a compressed
+    # archive a forward seek decompresses and discards, a backward seek
+    # starts decompressing again from the beginning.
+    def __init__(self, stream, start, size):
+        self.stream = stream
+        self.start = start
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def readinto(self, buffer):
+        remaining = self.size - self.position
+        if remaining <= 0:
+            return 0
+        with memoryview(buffer) as view:
+            target = view[:remaining]
+            if self.stream.tell() != self.start + self.position:
+                self.stream.seek(self.start + self.position)
+            count = self.stream.readinto(target)
+        self.position += count
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+def open_zip_member(archive, member):
+    if member["flags"] & 0x1:
+        raise ValueError("Encrypted zip members are not supported")
+    f = open(archive, 'rb')
+    try:
+        f.seek(member["offset"])
+        header = f.read(ZIP_LOCAL.size)
+        if len(header) < ZIP_LOCAL.size or header[:4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f"Bad local header for {member['path']}")
+        name_length, extra_length = ZIP_LOCAL.unpack(header)[-2:]
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+        # The central directory is authoritative for sizes and CRC; the
+        # local header may defer them to a data descriptor
+        info = zipfile.ZipInfo(member["path"])
+        info.compress_type = member["method"]
+        info.compress_size = member["csize"]
+        info.file_size = member["size"]
+        info.CRC = member["crc"]
+        return zipfile.ZipExtFile(f, 'r', info, close_fileobj=True)
+    except Exception:
+        f.close()
+        raise
+
+class ArchiveBrowser:
+    # Presents zip and tar files as read-only virtual directories. An
+    # archive's central directory or member headers are read once into a
+    # SQLite index under DATA_DIR, keyed by (path, device, inode, size,
+    # mtime); listings are paged queries on that index and members are
+    # streamed straight out of the archive, never extracted to disk.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS members (
+            path TEXT PRIMARY KEY,
+            parent TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            size INTEGER,
+            mtime REAL,
+            offset INTEGER,
+            csize INTEGER,
+            method INTEGER,
+            flags INTEGER,
+            crc INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS info (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    COLUMNS = ("path", "parent", "name", "type", "size", "mtime", "offset", "csize", "method", "flags", "crc")
+    BATCH_SIZE = 5000
+    # Directories first, then by name ignoring (ASCII) case; indexed, so
+    # listing order matches folders on disk without sorting per page
+    LISTING_ORDER = "type <> 'directory', name COLLATE NOCASE"
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.building = {}
+
+    def index_path(self, archive, st):
+        key = (ARCHIVE_INDEX_VERSION, os.path.abspath(archive), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = hashlib.sha1(repr(key).encode('utf-8', errors='surrogateescape')).hexdigest()
+        return os.path.join(self.directory, digest + '.db')
+
+    def split(self, path):
+        # (archive, member) when path does not exist on disk but one of its
+        # ancestors is an archive file; None otherwise
+        if not path or os.path.lexists(path):
+            return None
+        head = os.path.normpath(path)
+        parts = []
+        while True:
+            head, tail = os.path.split(head)
+            if not tail:
+                return None
+            parts.append(tail)
+            try:
+                st = os.stat(head)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and archive_format(head):
+                return head, clean_member_name('/'.join(reversed(parts)))
+            return None
+
+    def locate(self, path):
+        # Like split, but an archive file itself is the root of its listing
+        if path and archive_format(path) and os.path.isfile(path):
+            return path, ""
+        return self.split(path)
+
+    def virtual_path(self, archive, member):
+        return os.path.join(archive, *member.split('/'))
+
+    def connect(self, archive):
+        st = os.stat(archive)
+        db_path = self.index_path(archive, st)
+        if not os.path.exists(db_path):
+            with self.lock:
+                build_lock = self.building.setdefault(db_path, threading.Lock())
+            with build_lock:
+                if not os.path.exists(db_path):
+                    self._build(archive, db_path)
+            with self.lock:
+                self.building.pop(db_path, None)
+        return sqlite3.connect(db_path, timeout=30)
+
+    def _build(self, archive, db_path):
+        # Written under a temporary name and renamed when complete, so an
+        # interrupted build is never mistaken for a finished index
+        os.makedirs(self.directory, exist_ok=True)
+        partial = db_path + '.partial'
+        if os.path.exists(partial):
+            os.remove(partial)
+        started = time.time()
+        kind = archive_format(archive)
+        compression = tar_compression(archive) if kind == "tar" else None
+        members = iter_zip_members(archive) if kind == "zip" else iter_tar_members(archive, compression)
+
+        conn = sqlite3.connect(partial)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(self.SCHEMA)
+            insert_file = (f"INSERT OR REPLACE INTO members ({', '.join(self.COLUMNS)}) "
+                           f"VALUES ({', '.join('?' * len(self.COLUMNS))})")
+            insert_dir = (f"INSERT OR IGNORE INTO members ({', '.join(self.COLUMNS)}) "
+                          f"VALUES ({', '.join('?' * len(self.COLUMNS))})")
+            directories = set()
+            files = []
+            dirs = []
+            count = 0
+            for name, is_dir, size, mtime, offset, csize, method, flags, crc in members:
+                path = clean_member_name(name)
+                if not path:
+                    continue
+                parts = path.split('/')
+                # Archives need not list the directories their members sit
+                # in; every missing ancestor is added as it is first seen
+                for depth in range(1, len(parts)):
+                    ancestor = '/'.join(parts[:depth])
+                    if ancestor not in directories:
+                        directories.add(ancestor)
+                        dirs.append((ancestor, '/'.join(parts[:depth - 1]), parts[depth - 1], "directory",
+                                     None, None, None, None, None, None, None))
+                parent = '/'.join(parts[:-1])
+                if is_dir:
+                    if path not in directories:
+                        directories.add(path)
+                        dirs.append((path, parent, parts[-1], "directory", None, mtime, None, None, None, None, None))
+                else:
+                    files.append((path, parent, parts[-1], "file", size, mtime, offset, csize, method, flags, crc))
+                count += 1
+                if len(files) + len(dirs) >= self.BATCH_SIZE:
+                    conn.executemany(insert_dir, dirs)
+                    conn.executemany(insert_file, files)
+                    dirs, files = [], []
+            conn.executemany(insert_dir, dirs)
+            conn.executemany(insert_file, files)
+            conn.execute(f"CREATE INDEX idx_members_listing ON members(parent, {self.LISTING_ORDER})")
+            conn.executemany("INSERT INTO info (key, value) VALUES (?, ?)", [
+                ("archive", archive), ("format", kind), ("compression", compression or ""), ("entries", str(count))])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(partial, db_path)
+        log.info("Indexed archive %s: %d entries in %.1fs", archive, count, time.time() - started)
+
+    def iter_members(self, archive, parent="", after=None):
+        # Yields (key, member) for the children of parent in listing order,
+        # starting after the given key. Resuming from a key is an index
+        # range scan, so a page of a directory with a million entries costs
+        # the same as the first one.
+        conn = self.connect(archive)
+        try:
+            if parent and conn.execute("SELECT type FROM members WHERE path = ?", (parent,)).fetchone() != ("directory",):
+                raise FileNotFoundError(f"No such directory in {archive}: {parent}")
+            # One range scan for directories and one for everything else;
+            # names equal but for case are ordered by rowid, and those up to
+            # the key's own row were on an earlier page
+            after_group, after_name, after_rowid = after or (0, "", -1)
+            for group in (0, 1):
+                if group < after_group:
+                    continue
+                if group > after_group:
+                    after_name, after_rowid = "", -1
+                rows = conn.execute(
+                    "SELECT name = ? COLLATE NOCASE, rowid, path, name, type, size, mtime FROM members "
+                    "WHERE parent = ? AND type <> 'directory' = ? AND name COLLATE NOCASE >= ? "
+                    "ORDER BY name COLLATE NOCASE, rowid", (after_name, parent, group, after_name))
+                for same_name, rowid, path, name, item_type, size, mtime in rows:
+                    if same_name and rowid <= after_rowid:
+                        continue
+                    yield (group, name, rowid), {"path": path, "name": name, "type": item_type, "size": size, "mtime": mtime}
+        finally:
+            conn.close()
+
+    def stat(self, archive, member):
+        conn = self.connect(archive)
+        try:
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM members WHERE path = ?", (member,)).fetchone()
+            info = dict(conn.execute("SELECT key, value FROM info"))
+        finally:
+            conn.close()
+        if row is None:
+            raise FileNotFoundError(f"No such member in {archive}: {member}")
+        result = dict(zip(self.COLUMNS, row))
+        result["format"] = info.get("format")
+        result["compression"] = info.get("compression") or None
+        return result
+
+    def open(self, archive, member):
+        # Binary, seekable stream of one member's content
+        info = self.stat(archive, member)
+        if info["type"] == "directory":
+            raise IsADirectoryError(f"Is a directory in {archive}: {member}")
+        if info["format"] == "zip":
+            return open_zip_member(archive, info)
+        return ArchiveMemberReader(open_tar_stream(archive, info["compression"]), info["offset"], info["size"])
+
+TIMELINE_DIR = os.path.join(DATA_DIR, 'timelines')
+TIMELINE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+TIMELINE_RUN_EVENTS = 200000
+TIMELINE_INDEX_EVERY = 1024
+TIMELINE_PAGE_SIZE = 500
+TIMELINE_MAX_PAGE_SIZE = 10000
+
+def timeline_times(st):
+    # {time in ns: "macb" flags} for one entry; equal times are merged the
+    # way mactime does. Windows reports creation time as st_ctime before
+    # Python 3.12, so there it is treated as the birth time.
+    if sys.platform == 'win32' and not hasattr(st, 'st_birthtime'):
+        stamps = (("m", st.st_mtime_ns), ("a", st.st_atime_ns), ("b", st.st_ctime_ns))
+    else:
+        stamps = (("m", st.st_mtime_ns), ("a", st.st_atime_ns), ("c", st.st_ctime_ns))
+        birth = getattr(st, 'st_birthtime', None)
+        if birth:
+            stamps += (("b", int(birth * 1e9)),)
+    times = {}
+    for flag, value in stamps:
+        times.setdefault(max(value, 0), set()).add(flag)
+    return {value: ''.join(flag if flag in flags else '.' for flag in "macb") for value, flags in times.items()}
+
+def scan_timeline_directory(directory):
+    # Runs on a worker thread: (event lines, subdirectories, error count)
+    lines = []
+    subdirs = []
+    errors = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    errors += 1
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    subdirs.append(entry.path)
+                tail = (f"\t{st.st_size}\t{stat.filemode(st.st_mode)}\t{getattr(st, 'st_uid', 0)}"
+                        f"\t{getattr(st, 'st_gid', 0)}\t{st.st_ino}\t{json.dumps(entry.path)}\n")
+                for value, macb in timeline_times(st).items():
+                    lines.append(f"{value:020d}\t{macb}{tail}")
+    except OSError:
+        errors += 1
+    return lines, subdirs, errors
+
+def parse_timeline_line(line):
+    value, macb, size, mode, uid, gid, inode, path = line.rstrip('\n').split('\t', 7)
+    seconds = int(value) / 1e9
+    return {
+        "time": datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": seconds,
+        "macb": macb,
+        "size": int(size),
+        "mode": mode,
+        "uid": int(uid),
+        "gid": int(gid),
+        "inode": int(inode),
+        "path": json.loads(path),
+    }
+
+class TimelineEngine:
+    # Builds MAC(B)-time timelines of a directory tree. The crawl fans
+    # scandir out over a thread pool; events are sorted in runs of
+    # TIMELINE_RUN_EVENTS that are written to disk and then k-way merged, so
+    # the full timeline never has to fit in memory. Each timeline is a
+    # sorted text file (fixed-width ns timestamp first, so text order is time
+    # order) plus a sparse index of every TIMELINE_INDEX_EVERY-th line,
+    # which turns pagination and time-range queries into a bisect and a seek.
+    def __init__(self, directory=TIMELINE_DIR, workers=TIMELINE_WORKERS):
+        self.directory = directory
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.indexes = {}
+
+    def path_for(self, timeline_id, name):
+        return os.path.join(self.directory, timeline_id, name)
+
+    def start(self, root):
+        timeline_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, timeline_id))
+        status = {"id": timeline_id, "root": root, "running": True, "started": time.time(), "finished": None,
+                  "directories": 0, "events": 0, "errors": 0, "runs": 0, "error": None}
+        with self.lock:
+            self.jobs[timeline_id] = status
+        threading.Thread(target=self._run, args=(timeline_id, root), daemon=True).start()
+        return timeline_id
+
+    def get_status(self, timeline_id):
+        with self.lock:
+            status = self.jobs.get(timeline_id)
+            if status is not None:
+                return dict(status)
+        try:
+            with open(self.path_for(timeline_id, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        timelines = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        for name in names:
+            status = self.get_status(name)
+            if status:
+                timelines.append(status)
+        return sorted(timelines, key=lambda item: item["started"], reverse=True)
+
+    def _update(self, timeline_id, **changes):
+        with self.lock:
+            status = self.jobs[timeline_id]
+            for key, value in changes.items():
+                if isinstance(value, int) and key in ("directories", "events", "errors", "runs"):
+                    status[key] += value
+                else:
+                    status[key] = value
+
+    def _write_run(self, timeline_id, lines, runs):
+        lines.sort()
+        path = self.path_for(timeline_id, f"run_{len(runs):05d}.tmp")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        runs.append(path)
+        self._update(timeline_id, runs=1)
+
+    def _run(self, timeline_id, root):
+        runs = []
+        try:
+            pending = []
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(scan_timeline_directory, root)}
+                while futures:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        lines, subdirs, errors = future.result()
+                        pending.extend(lines)
+                        for subdir in subdirs:
+                            futures.add(pool.submit(scan_timeline_directory, subdir))
+                        self._update(timeline_id, directories=1, events=len(lines), errors=errors)
+                    if len(pending) >= TIMELINE_RUN_EVENTS:
+                        self._write_run(timeline_id, pending, runs)
+                        pending = []
+            if pending or not runs:
+                self._write_run(timeline_id, pending, runs)
+
+            sparse = []
+            position = 0
+            sources = [open(path, encoding='utf-8') for path in runs]
+            try:
+                with open(self.path_for(timeline_id, 'timeline.tsv'), 'w', encoding='utf-8', newline='\n') as out:
+                    for number, line in enumerate(heapq.merge(*sources)):
+                        if number % TIMELINE_INDEX_EVERY == 0:
+                            sparse.append((int(line[:20]), position))
+                        out.write(line)
+                        position += len(line.encode('utf-8'))
+            finally:
+                for source in sources:
+                    source.close()
+            with open(self.path_for(timeline_id, 'index.json'), 'w', encoding='utf-8') as f:
+                json.dump(sparse, f)
+            with self.lock:
+                self.indexes[timeline_id] = sparse
+            self._update(timeline_id, running=False, finished=time.time())
+        except Exception as e:
+            self._update(timeline_id, running=False, finished=time.time(), error=str(e))
+        finally:
+            for path in runs:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            status = self.get_status(timeline_id)
+            try:
+                with open(self.path_for(timeline_id, 'meta.json'), 'w', encoding='utf-8') as f:
+                    json.dump(status, f)
+            except OSError:
+                pass
+
+    def get_index(self, timeline_id):
+        with self.lock:
+            sparse = self.indexes.get(timeline_id)
+        if sparse is None:
+            with open(self.path_for(timeline_id, 'index.json'), encoding='utf-8') as f:
+                sparse = [tuple(item) for item in json.load(f)]
+            with self.lock:
+                self.indexes[timeline_id] = sparse
+        return sparse
+
+    def iter_lines(self, timeline_id, cursor=0, start=None, end=None):
+        # Yields (line number, line) from line cursor on, limited to
+        # [start, end] (epoch seconds). Seeks via the sparse index to the
+        # last sampled line at or before both the cursor and the start time.
+        sparse = self.get_index(timeline_id)
+        start_ns = int(start * 1e9) if start is not None else None
+        end_ns = int(end * 1e9) if end is not None else None
+        block = cursor // TIMELINE_INDEX_EVERY
+        if start_ns is not None:
+            # Last block whose first line is strictly earlier than start, so
+            # equal timestamps at the end of the previous block are not lost
+            block = max(block, bisect.bisect_left([value for value, _ in sparse], start_ns) - 1)
+        block = min(max(block, 0), max(len(sparse) - 1, 0))
+        if not sparse:
+            return
+        number = block * TIMELINE_INDEX_EVERY
+        with open(self.path_for(timeline_id, 'timeline.tsv'), 'rb') as f:
+            f.seek(sparse[block][1])
+            for raw in f:
+                if number >= cursor:
+                    value = int(raw[:20])
+                    if end_ns is not None and value > end_ns:
+                        return
+                    if start_ns is None or value >= start_ns:
+                        yield number, raw.decode('utf-8')
+                number += 1
+
+    def page(self, timeline_id, cursor=0, limit=TIMELINE_PAGE_SIZE, start=None, end=None):
+        events = []
+        next_cursor = None
+        for number, line in self.iter_lines(timeline_id, cursor, start, end):
+            if len(events) == limit:
+                next_cursor = number
+                break
+            event = parse_timeline_line(line)
+            event["line"] = number
+            events.append(event)
+        return events, next_cursor
+
+    def export(self, timeline_id, export_format="csv", start=None, end=None):
+        # mactime-style CSV of events, or a TSK 3.x bodyfile (one line per
+        # entry, MD5 left as 0) for loading into other timeline tools
+        if export_format == "csv":
+            yield "Date,Size,Type,Mode,UID,GID,Meta,File Name\n"
+            for _, line in self.iter_lines(timeline_id, 0, start, end):
+                event = parse_timeline_line(line)
+                path = event["path"].replace('"', '""')
+                yield (f'{event["time"]},{event["size"]},{event["macb"]},{event["mode"]},{event["uid"]},'
+                       f'{event["gid"]},{event["inode"]},"{path}"\n')
+        else:
+            entries = {}
+            for _, line in self.iter_lines(timeline_id, 0, start, end):
+                event = parse_timeline_line(line)
+                key = (event["path"], event["inode"])
+                entry = entries.setdefault(key, dict(event, times={}))
+                for flag in event["macb"].replace('.', ''):
+                    entry["times"][flag] = int(event["timestamp"])
+                if len(entries) >= TIMELINE_RUN_EVENTS:
+                    yield from self._bodyfile_lines(entries)
+                    entries = {}
+            yield from self._bodyfile_lines(entries)
+
+    @staticmethod
+    def _bodyfile_lines(entries):
+        # An entry whose events straddle a flush is written twice with
+        # partial times; timeline tools merge such duplicates
+        for entry in entries.values():
+            times = entry["times"]
+            name = entry["path"].replace('|', '\\|')
+            yield (f'0|{name}|{entry["inode"]}|{entry["mode"]}|{entry["uid"]}|{entry["gid"]}|{entry["size"]}|'
+                   f'{times.get("a", 0)}|{times.get("m", 0)}|{times.get("c", 0)}|{times.get("b", 0)}\n')
+
+DUPLICATES_DIR = os.path.join(DATA_DIR, 'duplicates')
+DUPLICATE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+DUPLICATE_BATCH = 2000
+DUPLICATE_PARTIAL_BYTES = 64 * 1024
+DUPLICATE_PAGE_SIZE = 100
+DUPLICATE_MAX_PAGE_SIZE = 1000
+DUPLICATE_MAX_GROUP_FILES = 1000
+DUPLICATE_KINDS = ("exact", "similar")
+# Near-duplicate detection: one-permutation MinHash over word 3-grams of the
+# first SIMILARITY_BYTES of each file (extracted text for Office documents),
+# with LSH banding so only files sharing a band are ever compared
+SIMILARITY_BYTES = 4 * 1024 * 1024
+SIMILARITY_BUCKETS = 64
+SIMILARITY_BAND_ROWS = 4
+SIMILARITY_MIN_SHINGLES = 32
+SIMILARITY_THRESHOLD = 0.8
+SIMILARITY_MAX_BUCKET = 100
+SIMILARITY_EMPTY = 0xFFFFFFFF
+SIMILARITY_TOKEN = re.compile(rb'\w{2,}')
+
+def scan_duplicate_directory(directory, min_size):
+    # Runs on a worker thread: ([(path, size)], subdirectories, error count).
+    # Only regular files are candidates; symlinks are not followed.
+    files = []
+    subdirs = []
+    errors = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        size = entry.stat(follow_symlinks=False).st_size
+                        if size >= min_size:
+                            files.append((entry.path, size))
+                except OSError:
+                    errors += 1
+    except OSError:
+        errors += 1
+    return files, subdirs, errors
+
+def partial_digest(path, size):
+    # SHA-256 of the first and last DUPLICATE_PARTIAL_BYTES. Files up to
+    # twice that are read whole, so for them this is the full SHA-256.
+    sha = hashlib.sha256()
+    with open_evidence(path) as f:
+        if size <= 2 * DUPLICATE_PARTIAL_BYTES:
+            data = f.read(size + 1)
+            if len(data) != size:
+                raise OSError(f"File changed size while reading: {path}")
+            sha.update(data)
+        else:
+            sha.update(f.read(DUPLICATE_PARTIAL_BYTES))
+            f.seek(size - DUPLICATE_PARTIAL_BYTES)
+            sha.update(f.read(DUPLICATE_PARTIAL_BYTES))
+    return sha.hexdigest()
+
+def full_digest(path, size):
+    result = hash_file(path, ("sha256",))
+    if result["size"] != size:
+        raise OSError(f"File changed size while reading: {path}")
+    return result["hashes"]["sha256"]
+
+def similarity_signature(path):
+    # SIMILARITY_BUCKETS minimum shingle hashes, or None for files with too
+    # little content to compare meaningfully
+    extractor = TEXT_EXTRACTORS.for_path(path)
+    if extractor:
+        data = extractor(path)[:SIMILARITY_BYTES].encode('utf-8', errors='replace')
+    else:
+        with open_evidence(path) as f:
+            data = f.read(SIMILARITY_BYTES)
+    tokens = [zlib.crc32(token) for token in SIMILARITY_TOKEN.findall(data.lower())]
+    shingles = {(a * 0x9E3779B1 ^ b * 0x85EBCA77 ^ c) & 0xFFFFFFFF for a, b, c in zip(tokens, tokens[1:], tokens[2:])}
+    if len(shingles) < SIMILARITY_MIN_SHINGLES:
+        return None
+    mins = [SIMILARITY_EMPTY] * SIMILARITY_BUCKETS
+    for value in shingles:
+        bucket = value % SIMILARITY_BUCKETS
+        value //= SIMILARITY_BUCKETS
+        if value < mins[bucket]:
+            mins[bucket] = value
+    return mins
+
+def signature_similarity(first, second):
+    # Estimated Jaccard similarity of the two shingle sets
+    matches = filled = 0
+    for a, b in zip(first, second):
+        if a != SIMILARITY_EMPTY or b != SIMILARITY_EMPTY:
+            filled += 1
+            if a == b:
+                matches += 1
+    return matches / filled if filled else 0.0
+
+class DuplicateFinder:
+    # Finds duplicate files under a directory in stages that each read as
+    # little as possible: files are grouped by size (no reads), same-size
+    # files by a hash of their first and last blocks, and only files that
+    # still collide are hashed in full. An optional similarity stage groups
+    # near-duplicates. Every stage works in batches against a SQLite file
+    # under DATA_DIR and reads run on a thread pool, so millions of files
+    # need neither millions of objects in memory nor a serial walk.
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stage INTEGER NOT NULL DEFAULT 0,
+            partial TEXT,
+            full TEXT,
+            exact_group INTEGER,
+            signature BLOB
+        );
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            size INTEGER,
+            hash TEXT,
+            count INTEGER NOT NULL,
+            wasted INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS members (
+            group_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            similarity REAL
+        );
+        CREATE TABLE IF NOT EXISTS bands (
+            band INTEGER NOT NULL,
+            key INTEGER NOT NULL,
+            file_id INTEGER NOT NULL
+        );
+    """
+    COUNTERS = ("directories", "files", "errors", "size_candidates", "partial_hashed",
+                "full_hashed", "bytes_read", "signatures")
+
+    def __init__(self, directory=DUPLICATES_DIR, workers=DUPLICATE_WORKERS):
+        self.directory = directory
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def path_for(self, job_id, name):
+        return os.path.join(self.directory, job_id, name)
+
+    def connect(self, job_id):
+        conn = sqlite3.connect(self.path_for(job_id, 'duplicates.db'), timeout=30)
+        conn.execute("PRAGMA synchronous=OFF")
+        return conn
+
+    def start(self, root, min_size=1, similar=False):
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, job_id))
+        status = {"id": job_id, "root": root, "min_size": min_size, "similar": similar, "running": True,
+                  "stage": "scanning", "started": time.time(), "finished": None, "error": None,
+                  "exact_groups": 0, "similar_groups": 0, "duplicate_files": 0, "wasted_bytes": 0}
+        status.update((key, 0) for key in self.COUNTERS)
+        with self.lock:
+            self.jobs[job_id] = status
+        threading.Thread(target=self._run, args=(job_id, root, min_size, similar), daemon=True).start()
+        return job_id
+
+    def get_status(self, job_id):
+        with self.lock:
+            status = self.jobs.get(job_id)
+            if status is not None:
+                return dict(status)
+        try:
+            with open(self.path_for(job_id, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        jobs = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        for name in names:
+            status = self.get_status(name)
+            if status:
+                jobs.append(status)
+        return sorted(jobs, key=lambda item: item["started"], reverse=True)
+
+    def _update(self, job_id, **changes):
+        with self.lock:
+            status = self.jobs[job_id]
+            for key, value in changes.items():
+                if key in self.COUNTERS:
+                    status[key] += value
+                else:
+                    status[key] = value
+
+    def _run(self, job_id, root, min_size, similar):
+        conn = None
+        try:
+            conn = self.connect(job_id)
+            conn.executescript(self.SCHEMA)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                self._scan(job_id, conn, pool, root, min_size)
+
+                self._update(job_id, stage="partial hash")
+                conn.execute("CREATE INDEX idx_files_size ON files(size)")
+                conn.execute("UPDATE files SET stage = 1 WHERE size IN "
+                             "(SELECT size FROM files GROUP BY size HAVING COUNT(*) > 1)")
+                conn.commit()
+                self._update(job_id, size_candidates=conn.execute("SELECT COUNT(*) FROM files WHERE stage = 1").fetchone()[0])
+                self._hash_stage(job_id, conn, pool, 1, "partial", partial_digest, "partial_hashed")
+
+                # Small files were read whole by the partial hash, which is
+                # therefore already their full hash
+                self._update(job_id, stage="full hash")
+                conn.execute("CREATE INDEX idx_files_partial ON files(size, partial)")
+                conn.execute("UPDATE files SET stage = 2 WHERE stage = 1 AND (size, partial) IN "
+                             "(SELECT size, partial FROM files WHERE stage = 1 AND partial IS NOT NULL "
+                             "GROUP BY size, partial HAVING COUNT(*) > 1)")
+                conn.execute("UPDATE files SET full = partial WHERE stage = 2 AND size <= ?",
+                             (2 * DUPLICATE_PARTIAL_BYTES,))
+                conn.commit()
+                self._hash_stage(job_id, conn, pool, 2, "full", full_digest, "full_hashed")
+                self._group_exact(job_id, conn)
+
+                if similar:
+                    self._update(job_id, stage="similarity")
+                    self._group_similar(job_id, conn, pool)
+            self._update(job_id, stage="done", running=False, finished=time.time())
+        except Exception as e:
+            log.error("Error in duplicate search %s: %s", job_id, e)
+            self._update(job_id, running=False, finished=time.time(), error=str(e))
+        finally:
+            if conn is not None:
+                conn.close()
+            status = self.get_status(job_id)
+            try:
+                with open(self.path_for(job_id, 'meta.json'), 'w', encoding='utf-8') as f:
+                    json.dump(status, f)
+            except OSError:
+                pass
+
+    def _scan(self, job_id, conn, pool, root, min_size):
+        pending = []
+        futures = {pool.submit(scan_duplicate_directory, root, min_size)}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, errors = future.result()
+                pending.extend(files)
+                for subdir in subdirs:
+                    futures.add(pool.submit(scan_duplicate_directory, subdir, min_size))
+                self._update(job_id, directories=1, files=len(files), errors=errors)
+            if len(pending) >= DUPLICATE_BATCH:
+                conn.executemany("INSERT INTO files (path, size) VALUES (?, ?)", pending)
+                pending = []
+        conn.executemany("INSERT INTO files (path, size) VALUES (?, ?)", pending)
+        conn.commit()
+
+    def _batches(self, conn, query, params=()):
+        # Pages through a query on id so no cursor stays open across updates
+        last = 0
+        while True:
+            rows = conn.execute(query + " AND id > ? ORDER BY id LIMIT ?", params + (last, DUPLICATE_BATCH)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+
+    def _hash_stage(self, job_id, conn, pool, stage, column, digest, counter):
+        def work(row):
+            file_id, path, size = row
+            try:
+                return file_id, digest(path, size)
+            except OSError:
+                return file_id, None
+
+        query = f"SELECT id, path, size FROM files WHERE stage = ? AND {column} IS NULL"
+        for rows in self._batches(conn, query, (stage,)):
+            results = list(pool.map(work, rows))
+            conn.executemany(f"UPDATE files SET {column} = ? WHERE id = ?",
+                             [(value, file_id) for file_id, value in results if value is not None])
+            conn.commit()
+            failed = sum(1 for _, value in results if value is None)
+            read = sum(min(size, 2 * DUPLICATE_PARTIAL_BYTES) if column == "partial" else size
+                       for (file_id, _, size), (_, value) in zip(rows, results) if value is not None)
+            self._update(job_id, **{counter: len(rows) - failed, "errors": failed, "bytes_read": read})
+
+    def _group_exact(self, job_id, conn):
+        # Groups are numbered by wasted space (size times extra copies), so
+        # the first page is always the biggest win
+        conn.execute(
+            "INSERT INTO groups (kind, size, hash, count, wasted) "
+            "SELECT 'exact', size, full, COUNT(*), size * (COUNT(*) - 1) FROM files "
+            "WHERE stage = 2 AND full IS NOT NULL GROUP BY size, full HAVING COUNT(*) > 1 "
+            "ORDER BY size * (COUNT(*) - 1) DESC, size DESC")
+        conn.execute("CREATE INDEX idx_groups_hash ON groups(size, hash)")
+        conn.execute("UPDATE files SET exact_group = (SELECT id FROM groups WHERE groups.size = files.size "
+                     "AND groups.hash = files.full AND groups.kind = 'exact') WHERE stage = 2 AND full IS NOT NULL")
+        conn.execute("INSERT INTO members (group_id, file_id) "
+                     "SELECT exact_group, id FROM files WHERE exact_group IS NOT NULL ORDER BY exact_group, id")
+        conn.execute("CREATE INDEX idx_members_group ON members(group_id)")
+        conn.commit()
+        groups, files, wasted = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(count), 0), COALESCE(SUM(wasted), 0) FROM groups").fetchone()
+        self._update(job_id, exact_groups=groups, duplicate_files=files, wasted_bytes=wasted)
+
+    def _group_similar(self, job_id, conn, pool):
+        # One representative per exact group plus every file that has no
+        # exact duplicate gets a signature; files sharing all rows of any
+        # band are candidate pairs, confirmed against the full signature
+        def work(row):
+            file_id, path = row
+            try:
+                return file_id, similarity_signature(path)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile, ParseError):
+                return file_id, None
+
+        conn.execute("UPDATE files SET stage = 3 WHERE exact_group IS NULL OR id IN "
+                     "(SELECT MIN(id) FROM files WHERE exact_group IS NOT NULL GROUP BY exact_group)")
+        conn.commit()
+        query = "SELECT id, path FROM files WHERE stage = 3"
+        band_count = SIMILARITY_BUCKETS // SIMILARITY_BAND_ROWS
+        for rows in self._batches(conn, query):
+            signatures = [(file_id, mins) for file_id, mins in pool.map(work, rows) if mins is not None]
+            conn.executemany("UPDATE files SET signature = ? WHERE id = ?",
+                             [(struct.pack(f"<{SIMILARITY_BUCKETS}I", *mins), file_id) for file_id, mins in signatures])
+            bands = []
+            for file_id, mins in signatures:
+                for band in range(band_count):
+                    rows_in_band = mins[band * SIMILARITY_BAND_ROWS:(band + 1) * SIMILARITY_BAND_ROWS]
+                    if SIMILARITY_EMPTY not in rows_in_band:
+                        bands.append((band, hash(tuple(rows_in_band)), file_id))
+            conn.executemany("INSERT INTO bands (band, key, file_id) VALUES (?, ?, ?)", bands)
+            conn.commit()
+            self._update(job_id, signatures=len(signatures))
+        conn.execute("CREATE INDEX idx_bands_key ON bands(band, key)")
+
+        # Union-find over confirmed pairs. Oversized buckets (boilerplate
+        # shared by thousands of files) are skipped to keep this sub-quadratic.
+        parent = {}
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        best = {}
+        signatures = {}
+        def signature(file_id):
+            if file_id not in signatures:
+                blob = conn.execute("SELECT signature FROM files WHERE id = ?", (file_id,)).fetchone()[0]
+                signatures[file_id] = struct.unpack(f"<{SIMILARITY_BUCKETS}I", blob)
+            return signatures[file_id]
+
+        buckets = conn.execute("SELECT band, key FROM bands GROUP BY band, key "
+                               "HAVING COUNT(*) > 1 AND COUNT(*) <= ?", (SIMILARITY_MAX_BUCKET,)).fetchall()
+        for band, key in buckets:
+            members = [row[0] for row in conn.execute(
+                "SELECT file_id FROM bands WHERE band = ? AND key = ? ORDER BY file_id", (band, key))]
+            for index, first in enumerate(members):
+                for second in members[index + 1:]:
+                    if find(first) == find(second):
+                        continue
+                    score = signature_similarity(signature(first), signature(second))
+                    if score >= SIMILARITY_THRESHOLD:
+                        parent[find(second)] = find(first)
+                        best[first] = max(best.get(first, 0), score)
+                        best[second] = max(best.get(second, 0), score)
+            if len(signatures) > 100000:
+                signatures.clear()
+
+        clusters = {}
+        for node in list(parent):
+            clusters.setdefault(find(node), []).append(node)
+        ordered = sorted((sorted(members) for members in clusters.values() if len(members) > 1), key=len, reverse=True)
+        for members in ordered:
+            cursor = conn.execute("INSERT INTO groups (kind, size, hash, count, wasted) VALUES ('similar', NULL, NULL, ?, 0)",
+                                  (len(members),))
+            conn.executemany("INSERT INTO members (group_id, file_id, similarity) VALUES (?, ?, ?)",
+                             [(cursor.lastrowid, file_id, round(best.get(file_id, 1.0), 3)) for file_id in members])
+        conn.commit()
+        self._update(job_id, similar_groups=len(ordered))
+
+    def page(self, job_id, cursor=0, limit=DUPLICATE_PAGE_SIZE, kind=None):
+        # Groups from id cursor on, each with up to DUPLICATE_MAX_GROUP_FILES
+        # of its files; returns (groups, next_cursor)
+        conn = self.connect(job_id)
+        try:
+            query = "SELECT id, kind, size, hash, count, wasted FROM groups WHERE id >= ?"
+            params = [cursor]
+            if kind:
+                query += " AND kind = ?"
+                params.append(kind)
+            rows = conn.execute(query + " ORDER BY id LIMIT ?", params + [limit + 1]).fetchall()
+            next_cursor = rows[limit][0] if len(rows) > limit else None
+            groups = []
+            for group_id, group_kind, size, digest, count, wasted in rows[:limit]:
+                files = [{"path": path, "size": file_size, "similarity": similarity, "exact_group": exact_group}
+                         for path, file_size, similarity, exact_group in conn.execute(
+                             "SELECT files.path, files.size, members.similarity, files.exact_group FROM members "
+                             "JOIN files ON files.id = members.file_id WHERE members.group_id = ? LIMIT ?",
+                             (group_id, DUPLICATE_MAX_GROUP_FILES))]
+                groups.append({"id": group_id, "kind": group_kind, "size": size, "sha256": digest,
+                               "count": count, "wasted": wasted, "files": files,
+                               "truncated": count > len(files)})
+            return groups, next_cursor
+        finally:
+            conn.close()
+
+def entry_is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+def scandir_sorted(directory):
+    # DirEntry objects, directories first and then by name ignoring case.
+    # is_dir() comes from the directory entry itself on most filesystems, so
+    # sorting costs no stat calls; sorting the two groups on a plain string
+    # key is about three times faster than one sort on a tuple key.
+    directories, files = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            (directories if entry_is_dir(entry) else files).append(entry)
+    directories.sort(key=lambda entry: entry.name.lower())
+    files.sort(key=lambda entry: entry.name.lower())
+    return directories + files
+
+class ListingSnapshots:
+    # Paged listings read a directory once: the first page takes a sorted
+    # scandir snapshot and stores it under an opaque token, and later pages
+    # are slices of it. Paging through N entries is one pass rather than
+    # O(N^2), and entries created or removed between pages are neither
+    # skipped nor repeated.
+    def __init__(self, lifetime=LIST_SNAPSHOT_SECONDS, limit=LIST_SNAPSHOTS):
+        self.lifetime = lifetime
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+
+    def create(self, directory):
+        entries = scandir_sorted(directory)
+        token = uuid.uuid4().hex
+        with self.lock:
+            now = time.monotonic()
+            self.snapshots[token] = (directory, entries, now)
+            while self.snapshots:
+                oldest = next(iter(self.snapshots.values()))
+                if len(self.snapshots) <= self.limit and now - oldest[2] <= self.lifetime:
+                    break
+                self.snapshots.popitem(last=False)
+        return token, entries
+
+    def get(self, token, directory):
+        # The snapshot's entries, or None once it has expired
+        with self.lock:
+            snapshot = self.snapshots.pop(token, None)
+            now = time.monotonic()
+            if snapshot is None or snapshot[0] != directory or now - snapshot[2] > self.lifetime:
+                return None
+            self.snapshots[token] = (directory, snapshot[1], now)
+            return snapshot[1]
+
+LOG_DEDUPE_SECONDS = 2
+
+class RecentOperations:
+    # Remembers when each operation key was last logged. Keys sit in an
+    # OrderedDict in the order they were (re)recorded, so expired ones are
+    # always at the head and eviction is amortised O(1) per call.
+    def __init__(self, window=LOG_DEDUPE_SECONDS, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.seen = OrderedDict()
+        self.lock = threading.Lock()
+
+    def is_duplicate(self, key):
+        # True if key was recorded within the window; records it otherwise
+        with self.lock:
+            now = self.clock()
+            horizon = now - self.window
+            seen = self.seen
+            while seen:
+                oldest_key, oldest_time = next(iter(seen.items()))
+                if oldest_time > horizon:
+                    break
+                seen.popitem(last=False)
+            if key in seen:
+                return True
+            seen[key] = now
+            return False
+
+    def __len__(self):
+        return len(self.seen)
+
+AUDIT_LOG_PATH = os.path.join(DATA_DIR, 'audit.jsonl')
+AUDIT_RING_SIZE = 5000
+AUDIT_PAGE_SIZE = 1000
+
+def tail_lines(path, count, block=64 * 1024):
+    # Last count lines of a file, reading backwards from the end
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return data.splitlines()[-count:]
+
+class AuditLog:
+    # Activity log backed by an append-only JSON-lines journal in DATA_DIR.
+    # Every entry gets a sequence number that keeps increasing across
+    # restarts; only the newest AUDIT_RING_SIZE entries are kept in memory,
+    # so clients fetch what is new with entries_since(seq).
+    def __init__(self, path=AUDIT_LOG_PATH, ring_size=AUDIT_RING_SIZE):
+        self.path = path
+        self.ring = deque(maxlen=ring_size)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.journal = None
+        self.load()
+
+    def load(self):
+        try:
+            lines = tail_lines(self.path, self.ring.maxlen)
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self.ring.append(entry)
+            self.seq = max(self.seq, entry.get("seq", 0))
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.journal = open(self.path, 'a', encoding='utf-8')
+        except OSError as e:
+            log.warning("Audit journal unavailable, logging to memory only: %s", e)
+
+    def append(self, entry):
+        with self.lock:
+            self.seq += 1
+            entry = dict(entry, seq=self.seq)
+            self.ring.append(entry)
+            if self.journal:
+                try:
+                    self.journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                    self.journal.flush()
+                except OSError as e:
+                    log.error("Cannot write audit journal: %s", e)
+        return entry
+
+    def entries_since(self, since=0, limit=AUDIT_PAGE_SIZE):
+        # Returns (the oldest limit entries newer than since, oldest first;
+        # the seq to pass as since for the next page; the newest seq; whether
+        # entries after since have already been dropped from memory). Paging
+        # with next_since until it reaches the newest seq returns every entry
+        # still held, in order. Walks back from the newest entry, so a poll
+        # costs O(new entries).
+        entries = []
+        with self.lock:
+            last = self.seq
+            oldest = self.ring[0]["seq"] if self.ring else last + 1
+            for entry in reversed(self.ring):
+                if entry["seq"] <= since:
+                    break
+                entries.append(entry)
+        entries.reverse()
+        entries = entries[:limit]
+        next_since = entries[-1]["seq"] if entries else min(since, last)
+        truncated = 0 < since < oldest - 1
+        return entries, next_since, last, truncated
+
+# How long a request waits for the target list to finish loading at startup
+TARGETS_WAIT_SECONDS = 30
+
+class LazyAttribute:
+    # Decorates a method that builds an attribute; it runs on first access
+    # and its result is stored on the instance, so later reads are plain
+    # attribute lookups. Threads racing for the first access share one
+    # result. Reentrant, because one service may need another to start.
+    lock = threading.RLock()
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        functools.update_wrapper(self, factory)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with self.lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+            return instance.__dict__[self.name]
 
 class Investigator:
     def __init__(self, allowed_dir=None):
         self.allowed_dir = os.path.abspath(allowed_dir) if allowed_dir else None
-        self.log = []
-        self.recent_operations = {}  
-        self.last_media_access = {}  
-       
+        # Serialises configuration changes; readers see either the old or the
+        # new target list/matcher, which are replaced together
+        self.config_lock = threading.Lock()
+        self.metadata_pool = None
+        self.describe_pool = None
+        # The target list and the system MIME tables load on a background
+        # thread, so the server binds without waiting for them; anything that
+        # needs the targets waits on targets_ready
+        self.targets_ready = threading.Event()
+        self.target_files = set()
+        self.target_matcher = TargetMatcher()
+        threading.Thread(target=self.warm_up, name="investigator-warm-up", daemon=True).start()
+
+    # Services are built on first use, so startup does not open the audit
+    # journal, map the hash sets or touch the data directory
+
+    @LazyAttribute
+    def audit_log(self):
+        return AuditLog()
+
+    @LazyAttribute
+    def recent_operations(self):
+        return RecentOperations()
+
+    @LazyAttribute
+    def timelines(self):
+        return TimelineEngine()
+
+    @LazyAttribute
+    def duplicates(self):
+        return DuplicateFinder()
+
+    @LazyAttribute
+    def file_index(self):
+        return FileIndex(INDEX_DB_PATH)
+
+    @LazyAttribute
+    def hash_engine(self):
+        return HashEngine()
+
+    @LazyAttribute
+    def known_hashes(self):
+        return KnownHashLibrary()
+
+    @LazyAttribute
+    def sniffer(self):
+        return FileSniffer()
+
+    @LazyAttribute
+    def text_pager(self):
+        return TextPager()
+
+    @LazyAttribute
+    def office_text(self):
+        return OfficeTextCache()
+
+    @LazyAttribute
+    def thumbnails(self):
+        return ThumbnailService()
+
+    @LazyAttribute
+    def content_search(self):
+        return ContentSearchEngine()
+
+    @LazyAttribute
+    def archives(self):
+        return ArchiveBrowser()
+
+    @LazyAttribute
+    def listings(self):
+        return ListingSnapshots()
+
+    def warm_up(self):
+        try:
+            with self.config_lock:
+                target_files = self.load_target_files()
+                self.target_matcher = TargetMatcher(target_files)
+                self.target_files = target_files
+        finally:
+            self.targets_ready.set()
         mimetypes.init()
-        
-        self.target_files = self.load_target_files()
 
+    def wait_for_targets(self, timeout=TARGETS_WAIT_SECONDS):
+        if not self.targets_ready.is_set() and not self.targets_ready.wait(timeout):
+            log.warning("Target list still loading after %ss; continuing without it", timeout)
+
+    @timed("load_target_files")
     def load_target_files(self):
         target_list = set()
         try:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             target_file_path = os.path.join(script_dir, 'target.txt')
-            print(f"Looking for target file at: {target_file_path}")
+            log.debug("Looking for target file at: %s", target_file_path)
             
             if os.path.exists(target_file_path):
                 with open(target_file_path, 'r', encoding='utf-8') as f:
@@ -52,92 +3953,44 @@ class Investigator:
                         line = line.strip()
                         if line and not line.startswith('#'):
                             target_list.add(line.lower())
-                print(f"Loaded {len(target_list)} target filenames for highlighting")
-                
-                sample_entries = list(target_list)[:5] if len(target_list) >= 5 else list(target_list)
-                print(f"Sample entries: {sample_entries}")
+                log.info("Loaded %d target filenames for highlighting", len(target_list))
+                log.debug("Sample entries: %s", list(target_list)[:5])
             else:
-                print(f"Target file not found at: {target_file_path}")
+                log.info("Target file not found at: %s", target_file_path)
         except Exception as e:
-            print(f"Error loading target file: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error loading target file: %s", e)
         
         return target_list
 
     def is_target_file(self, filename):
+        if not self.targets_ready.is_set():
+            self.wait_for_targets()
         if not filename or not self.target_files:
             return False
-            
-        filename_lower = filename.lower()
-        
-        if filename_lower in self.target_files:
-            print(f"Target match (exact): {filename}")
-            return True
-        
-        if "password.txt" in self.target_files and filename_lower == "passwords.txt":
-            print(f"Target match (variation): {filename}")
-            return True
-        if "passwords.txt" in self.target_files and filename_lower == "password.txt":
-            print(f"Target match (variation): {filename}")
-            return True
-            
-        for pattern in self.target_files:
-            if not pattern:
-                continue
-                
-            if '*' in pattern:
-                if pattern.startswith('*') and pattern.count('*') == 1:
-                    suffix = pattern[1:].lower()
-                    if suffix and filename_lower.endswith(suffix):
-                        print(f"Target match (suffix): {filename} matches {pattern}")
-                        return True
-                
-                elif pattern.endswith('*') and pattern.count('*') == 1:
-                    prefix = pattern[:-1].lower()
-                    if prefix and filename_lower.startswith(prefix):
-                        print(f"Target match (prefix): {filename} matches {pattern}")
-                        return True
-            
-            elif len(pattern) > 3:
-                if pattern in filename_lower:
-                    print(f"Target match (substring): {filename} contains {pattern}")
-                    return True
-        
-        return False
-
+        return self.target_matcher.match(filename) is not None
+    
     def is_within_allowed_dir(self, path):
-        if self.allowed_dir is None:
+        # Compares resolved paths component by component, so a sibling that
+        # shares the prefix (/data/case10 for /data/case1) and symlinks that
+        # lead out of the allowed directory are both refused
+        allowed_dir = self.allowed_dir
+        if allowed_dir is None:
             return True
-        return os.path.abspath(path).startswith(self.allowed_dir)
+        allowed_dir = os.path.normcase(os.path.realpath(allowed_dir))
+        path = os.path.normcase(os.path.realpath(path))
+        try:
+            return os.path.commonpath([allowed_dir, path]) == allowed_dir
+        except ValueError:
+            # Different drives on Windows
+            return False
 
-    def add_log_entry(self, action, path, status, message=None, is_media=False):
+    def add_log_entry(self, action, path, status, message=None):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         clean_path = path.split('?')[0] if '?' in path else path
         
-        if is_media:
-            current_time = time.time()
-            if clean_path in self.last_media_access:
-                if current_time - self.last_media_access[clean_path] < 5:
-                    return None
-            
-            self.last_media_access[clean_path] = current_time
-            
-            self.last_media_access = {k: v for k, v in self.last_media_access.items() 
-                                    if current_time - v < 30}
-        else:
-            operation_key = f"{action}_{clean_path}_{status}"
-            
-            current_time = time.time()
-            if operation_key in self.recent_operations:
-                if current_time - self.recent_operations[operation_key] < 2:
-                    return None
-            
-            self.recent_operations[operation_key] = current_time
-            
-            self.recent_operations = {k: v for k, v in self.recent_operations.items() 
-                                    if current_time - v < 5}
+        if self.recent_operations.is_duplicate((action, clean_path, status)):
+            return None
         
         log_entry = {
             "timestamp": timestamp,
@@ -149,39 +4002,30 @@ class Investigator:
         if message:
             log_entry["message"] = message
             
-        self.log.append(log_entry)
-        return log_entry
+        return self.audit_log.append(log_entry)
 
+    @timed("read_file")
     def read_file(self, filepath):
+        if not filepath or not self.is_within_allowed_dir(filepath):
+            self.add_log_entry("READ", filepath, "BLOCKED", "Outside the allowed directory")
+            return {
+                "content": None,
+                "type": "error",
+                "error": "Path is outside the allowed directory"
+            }, "[ERROR] Access denied"
         try:
+            located = self.archives.split(filepath)
+            if located:
+                return self.read_archive_member(filepath, *located)
+
             mime_type, encoding = mimetypes.guess_type(filepath)
             file_size = os.path.getsize(filepath)
             
-            if filepath.lower().endswith('.docx') and DOCX_AVAILABLE:
-                content = self.extract_text_from_docx(filepath)
-                message = f"[READ] {filepath} (Word document)"
-                self.add_log_entry("READ", filepath, "SUCCESS")
-                return {
-                    "content": content,
-                    "type": "text",
-                    "is_office": True,
-                    "office_type": "word",
-                    "mimetype": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                }, message
-                
-            elif filepath.lower().endswith('.pptx') and PPTX_AVAILABLE:
-                content = self.extract_text_from_pptx(filepath)
-                message = f"[READ] {filepath} (PowerPoint presentation)"
-                self.add_log_entry("READ", filepath, "SUCCESS")
-                return {
-                    "content": content,
-                    "type": "text",
-                    "is_office": True,
-                    "office_type": "powerpoint",
-                    "mimetype": "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-                }, message
+            extractor = self.office_extractor(filepath)
+            if extractor:
+                return self.read_office(filepath, lambda: self.office_text.get(filepath, extractor))
                 
-            elif self.is_text_file(filepath) and file_size < 5 * 1024 * 1024:
+            if self.is_text_file(filepath) and file_size <= TEXT_PREVIEW_BYTES:
                 with open(filepath, 'r', errors='replace') as file:
                     message = f"[READ] {filepath}"
                     self.add_log_entry("READ", filepath, "SUCCESS")
@@ -190,6 +4034,19 @@ class Investigator:
                         "type": "text",
                         "mimetype": mime_type or "text/plain"
                     }, message
+            
+            elif self.is_text_file(filepath):
+                # Large text files are shown one page at a time through /api/text
+                page = self.text_pager.read_lines(filepath, 0, TEXT_PAGE_LINES)
+                message = f"[READ] {filepath} (lines 1-{page['next_line']})"
+                self.add_log_entry("READ", filepath, "SUCCESS")
+                page.update({
+                    "type": "text",
+                    "paged": True,
+                    "page_lines": TEXT_PAGE_LINES,
+                    "mimetype": mime_type or "text/plain"
+                })
+                return page, message
             else:
                 message = f"[READ] {filepath}"
                 self.add_log_entry("READ", filepath, "SUCCESS")
@@ -198,6 +4055,7 @@ class Investigator:
                     "type": "binary",
                     "mimetype": mime_type or "application/octet-stream",
                     "filename": os.path.basename(filepath),
+                    "content_type": self.sniffer.sniff(filepath),
                     "size": file_size,
                     "last_modified": datetime.fromtimestamp(os.path.getmtime(filepath)).strftime("%Y-%m-%d %H:%M:%S")
                 }, message
@@ -210,15 +4068,198 @@ class Investigator:
                 "error": str(e)
             }, message
 
-    def get_file_metadata(self, filepath):
+    def read_office(self, filepath, extract):
+        # Extraction errors are reported here rather than returned as text by
+        # the extractor, so a failure never lands in the text cache
+        office_type, label, office_mime = self.document_type(filepath)
+        try:
+            content = extract()
+        except EXTRACTION_ERRORS as e:
+            self.add_log_entry("READ", filepath, "ERROR", str(e))
+            return {
+                "content": f"Error extracting text from {label}: {e}",
+                "type": "text",
+                "is_office": True,
+                "office_type": office_type,
+                "mimetype": office_mime,
+                "error": str(e)
+            }, f"[ERROR] Cannot extract text from {label}: {e}"
+        self.add_log_entry("READ", filepath, "SUCCESS")
+        return {
+            "content": content,
+            "type": "text",
+            "is_office": True,
+            "office_type": office_type,
+            "mimetype": office_mime
+        }, f"[READ] {filepath} ({label})"
+
+    @timed("read_archive_member")
+    def read_archive_member(self, filepath, archive, member):
+        # Members are streamed from the archive: Office documents are read
+        # into memory for extraction (up to ARCHIVE_BUFFER_BYTES), text shows
+        # its first TEXT_PREVIEW_BYTES and anything else is described
+        info = self.archives.stat(archive, member)
+        if info["type"] == "directory":
+            raise IsADirectoryError(f"Is a directory: {filepath}")
+        mime_type = FileSniffer.guess_from_name(filepath)
+        extractor = self.office_extractor(filepath)
+        with self.archives.open(archive, member) as stream:
+            if extractor and info["size"] <= ARCHIVE_BUFFER_BYTES:
+                data = stream.read()
+                return self.read_office(filepath, lambda: extractor(io.BytesIO(data)))
+
+            head = stream.read(TEXT_PREVIEW_BYTES)
+        content_type = self.sniffer.identify(head[:FileSniffer.SNIFF_SIZE])
+        self.add_log_entry("READ", filepath, "SUCCESS")
+        if FileSniffer.is_text_type(content_type):
+            truncated = info["size"] > len(head)
+            return {
+                "content": head.decode('utf-8', errors='replace'),
+                "type": "text",
+                "truncated": truncated,
+                "mimetype": mime_type or "text/plain"
+            }, f"[READ] {filepath}" + (f" (first {len(head)} bytes)" if truncated else "")
+        return {
+            "content": None,
+            "type": "binary",
+            "mimetype": mime_type or "application/octet-stream",
+            "filename": info["name"],
+            "content_type": content_type,
+            "size": info["size"],
+            "last_modified": datetime.fromtimestamp(info["mtime"]).strftime("%Y-%m-%d %H:%M:%S") if info["mtime"] else None
+        }, f"[READ] {filepath}"
+
+    @timed("read_text_page")
+    def read_text_page(self, filepath, line=None, lines=None, offset=None, length=None):
+        if not filepath or not self.is_within_allowed_dir(filepath):
+            return {"error": "Path is outside the allowed directory"}, "[ERROR] Access denied"
+        try:
+            if offset is not None:
+                page = self.text_pager.read_bytes(filepath, offset, length or TEXT_PREVIEW_BYTES)
+                message = f"[READ] {filepath} (bytes {page['start_offset']}-{page['end_offset']})"
+            else:
+                page = self.text_pager.read_lines(filepath, line or 0, lines or TEXT_PAGE_LINES)
+                message = f"[READ] {filepath} (lines {page['start_line'] + 1}-{page['next_line']})"
+        except (OSError, ValueError, TypeError) as e:
+            self.add_log_entry("READ", filepath, "ERROR", str(e))
+            return {"error": str(e)}, f"[ERROR] Cannot read: {e}"
+        self.add_log_entry("READ", filepath, "SUCCESS")
+        return page, message
+
+    @timed("read_hex")
+    def read_hex(self, filepath, offset=0, length=HEX_PAGE_BYTES):
+        if not filepath or not self.is_within_allowed_dir(filepath):
+            return {"error": "Path is outside the allowed directory"}, "[ERROR] Access denied"
+        try:
+            offset = max(int(offset or 0), 0)
+            length = max(min(int(length or HEX_PAGE_BYTES), HEX_MAX_PAGE_BYTES), 1)
+            f, mm = open_mapped(filepath)
+            try:
+                size = len(mm) if mm is not None else 0
+                offset = min(offset - offset % HEX_ROW_BYTES, size)
+                data = mm[offset:offset + length] if mm is not None else b''
+            finally:
+                if mm is not None:
+                    mm.close()
+                f.close()
+        except (OSError, ValueError, TypeError) as e:
+            self.add_log_entry("HEX", filepath, "ERROR", str(e))
+            return {"error": str(e)}, f"[ERROR] Cannot read: {e}"
+        self.add_log_entry("HEX", filepath, "SUCCESS")
+        return {
+            "offset": offset,
+            "length": len(data),
+            "size": size,
+            "eof": offset + len(data) >= size,
+            "rows": format_hex_rows(data, offset),
+        }, f"[READ] {filepath} (bytes {offset}-{offset + len(data)})"
+
+    @timed("search_hex")
+    def search_hex(self, filepath, pattern, pattern_type="hex", start=0, max_matches=1):
+        if not filepath or not self.is_within_allowed_dir(filepath):
+            return {"error": "Path is outside the allowed directory"}, "[ERROR] Access denied"
+        try:
+            needle = parse_byte_pattern(pattern, pattern_type or "hex")
+            start = max(int(start or 0), 0)
+            max_matches = max(min(int(max_matches or 1), HEX_MAX_MATCHES), 1)
+            matches = []
+            f, mm = open_mapped(filepath)
+            try:
+                position = start
+                while mm is not None and len(matches) < max_matches:
+                    position = mm.find(needle, position)
+                    if position == -1:
+                        break
+                    matches.append(position)
+                    position += 1
+            finally:
+                if mm is not None:
+                    mm.close()
+                f.close()
+        except (OSError, ValueError, TypeError) as e:
+            return {"error": str(e)}, f"[ERROR] Search failed: {e}"
+        self.add_log_entry("HEX_SEARCH", filepath, "SUCCESS")
+        return {
+            "pattern": needle.hex(' '),
+            "start": start,
+            "matches": matches,
+        }, f"[SUCCESS] Found {len(matches)} match{'es' if len(matches) != 1 else ''}"
+
+    def start_content_search(self, paths, patterns, max_hits=None):
+        paths = paths or ([self.allowed_dir] if self.allowed_dir else [])
+        if not paths:
+            return None, "[ERROR] No paths given"
+        try:
+            files = self.collect_files(paths)
+            job_id = self.content_search.start_job(files, patterns or [], int(max_hits or GREP_MAX_HITS_PER_FILE))
+        except (re.error, ValueError, TypeError) as e:
+            return None, f"[ERROR] Invalid search: {e}"
+        self.add_log_entry("GREP", ", ".join(paths[:3]) + (" ..." if len(paths) > 3 else ""), "SUCCESS",
+                           f"Searching {len(files)} files")
+        return job_id, f"[SUCCESS] Searching {len(files)} files"
+
+    def get_content_search(self, job_id, offset=0):
+        return self.content_search.get_job(job_id, offset)
+
+    def wait_for_content_search(self, job_id, offset, timeout):
+        self.content_search.wait_for_results(job_id, offset, timeout)
+
+    @timed("get_thumbnail")
+    def get_thumbnail(self, filepath, size=THUMBNAIL_DEFAULT_SIZE):
+        if not self.is_within_allowed_dir(filepath):
+            return None, "[ERROR] Access denied"
+        try:
+            content_type, _ = self.identify_content(filepath)
+            if not content_type.startswith(('image/', 'video/')):
+                return None, f"[ERROR] Not an image or video: {filepath}"
+            return self.thumbnails.get(filepath, size, content_type.startswith('video/')), "[SUCCESS] Thumbnail ready"
+        except ImportError:
+            return None, "[ERROR] Thumbnails need Pillow (pip install pillow)"
+        except Exception as e:
+            return None, f"[ERROR] Cannot create thumbnail: {e}"
+
+    def cancel_content_search(self, job_id):
+        if not self.content_search.cancel(job_id):
+            return False, f"[ERROR] Unknown search job: {job_id}"
+        self.add_log_entry("GREP", job_id, "CANCELLED")
+        return True, "[SUCCESS] Search cancelled"
+
+    @timed("get_file_metadata")
+    def get_file_metadata(self, filepath, sections=None, include_platform=True):
+        # sections limits the work to the listed parts of METADATA_SECTIONS
+        # (METADATA_DEFAULT_SECTIONS if none are given);
+        # include_platform=False leaves the constant platform fields out of
+        # "system" so a batch can send them once
+        sections = set(sections or METADATA_DEFAULT_SECTIONS)
         try:
             file_stat = os.stat(filepath)
             filename = os.path.basename(filepath)
             file_size = file_stat.st_size
             mime_type, encoding = mimetypes.guess_type(filepath)
             
-            metadata = {
-                "basic": {
+            metadata = {}
+            if "basic" in sections:
+                metadata["basic"] = {
                     "filename": filename,
                     "filepath": filepath,
                     "size": file_size,
@@ -226,13 +4267,22 @@ class Investigator:
                     "mimetype": mime_type or "unknown",
                     "encoding": encoding,
                     "extension": os.path.splitext(filepath)[1],
-                },
-                "timestamps": {
+                    "is_target": self.is_target_file(filename),
+                }
+                try:
+                    content_type, mismatch = self.identify_content(filepath, file_stat)
+                    metadata["basic"]["content_type"] = content_type
+                    metadata["basic"]["type_mismatch"] = mismatch
+                except OSError as e:
+                    metadata["basic"]["content_type_error"] = str(e)
+            if "timestamps" in sections:
+                metadata["timestamps"] = {
                     "created": datetime.fromtimestamp(file_stat.st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
                     "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
                     "accessed": datetime.fromtimestamp(file_stat.st_atime).strftime("%Y-%m-%d %H:%M:%S"),
-                },
-                "permissions": {
+                }
+            if "permissions" in sections:
+                metadata["permissions"] = {
                     "owner_read": bool(file_stat.st_mode & 0o400),
                     "owner_write": bool(file_stat.st_mode & 0o200),
                     "owner_execute": bool(file_stat.st_mode & 0o100),
@@ -243,35 +4293,53 @@ class Investigator:
                     "other_write": bool(file_stat.st_mode & 0o002),
                     "other_execute": bool(file_stat.st_mode & 0o001),
                     "mode_octal": oct(file_stat.st_mode)[-3:],
-                },
-                "system": {
+                }
+            if "system" in sections:
+                metadata["system"] = {
                     "inode": file_stat.st_ino,
                     "device": file_stat.st_dev,
-                    "platform": platform.system(),
-                    "platform_version": platform.version(),
-                    "python_version": platform.python_version(),
                 }
-            }
+                if include_platform:
+                    metadata["system"].update(platform_info())
             
-            try:
-                if mime_type and mime_type.startswith('image/'):
-                    from PIL import Image
-                    from PIL.ExifTags import TAGS
-                    
-                    img = Image.open(filepath)
-                    exif_data = {}
-                    
-                    if hasattr(img, '_getexif') and img._getexif():
-                        for tag, value in img._getexif().items():
-                            if tag in TAGS:
-                                exif_data[TAGS[tag]] = str(value)
-                    
-                    if exif_data:
-                        metadata["exif"] = exif_data
-            except ImportError:
-                metadata["exif_support"] = "PIL library not installed. Install with 'pip install pillow' for EXIF data."
-            except Exception as e:
-                metadata["exif_error"] = str(e)
+            if "exif" in sections:
+                try:
+                    if mime_type and mime_type.startswith('image/'):
+                        Image, TAGS = pil_modules()
+                        
+                        with metrics.timer("exif"), Image.open(filepath) as img:
+                            exif_data = {}
+                            
+                            if hasattr(img, '_getexif') and img._getexif():
+                                for tag, value in img._getexif().items():
+                                    if tag in TAGS:
+                                        exif_data[TAGS[tag]] = str(value)
+                        
+                        if exif_data:
+                            metadata["exif"] = exif_data
+                except ImportError:
+                    metadata["exif_support"] = "PIL library not installed. Install with 'pip install pillow' for EXIF data."
+                except Exception as e:
+                    metadata["exif_error"] = str(e)
+            
+            if "hashes" in sections:
+                if file_size <= METADATA_HASH_LIMIT:
+                    try:
+                        hashed = self.hash_engine.hash_now(filepath)
+                        metadata["hashes"] = hashed["hashes"]
+                        if hashed.get("changed_during_read"):
+                            metadata["hash_warning"] = "File changed while it was being hashed; the digests match neither version"
+                        known = self.known_hashes.lookup(metadata["hashes"])
+                        if "basic" in metadata:
+                            metadata["basic"]["known_status"] = known["status"] if known else None
+                            if known:
+                                metadata["basic"]["known_set"] = known["set"]
+                        else:
+                            metadata["known"] = known
+                    except Exception as e:
+                        metadata["hash_error"] = str(e)
+                else:
+                    metadata["hash_note"] = f"File larger than {self.format_size(METADATA_HASH_LIMIT)}; use /api/hash to hash it"
             
             self.add_log_entry("METADATA", filepath, "SUCCESS")
             
@@ -280,6 +4348,105 @@ class Investigator:
         except Exception as e:
             self.add_log_entry("METADATA", filepath, "ERROR", str(e))
             return {"error": str(e)}, f"[ERROR] Failed to get metadata: {e}"
+
+    def iter_batch_metadata(self, paths, sections=None):
+        # Yields {"path", "metadata", "message"} in completion order; the
+        # work is spread over a thread pool (stat, sniffing, EXIF and hashing
+        # all release the GIL while waiting on the disk)
+        if self.metadata_pool is None:
+            with self.config_lock:
+                if self.metadata_pool is None:
+                    self.metadata_pool = ThreadPoolExecutor(max_workers=METADATA_WORKERS)
+        futures = {self.metadata_pool.submit(self.get_file_metadata, path, sections, False): path
+                   for path in paths}
+        try:
+            for future in as_completed(futures):
+                metadata, message = future.result()
+                yield {"path": futures[future], "metadata": metadata, "message": message}
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def start_timeline(self, directory=None):
+        directory = directory or self.allowed_dir
+        if not directory:
+            return None, "[ERROR] No directory for the timeline; set an allowed directory first"
+        directory = os.path.abspath(directory)
+        if not self.is_within_allowed_dir(directory) or not os.path.isdir(directory):
+            return None, f"[ERROR] Not a directory inside the allowed directory: {directory}"
+        timeline_id = self.timelines.start(directory)
+        self.add_log_entry("TIMELINE", directory, "SUCCESS", f"Building timeline {timeline_id}")
+        return timeline_id, f"[SUCCESS] Building timeline of {directory}"
+
+    @timed("get_timeline_page")
+    def get_timeline_page(self, timeline_id, cursor=0, limit=TIMELINE_PAGE_SIZE, start=None, end=None):
+        # Returns (status, events, next_cursor, message)
+        status = self.timelines.get_status(timeline_id)
+        if status is None:
+            return None, [], None, f"[ERROR] Unknown timeline: {timeline_id}"
+        if status.get("error"):
+            return status, [], None, f"[ERROR] Timeline failed: {status['error']}"
+        if status["running"]:
+            return status, [], None, "[SUCCESS] Timeline is still being built"
+        try:
+            cursor = max(int(cursor or 0), 0)
+            limit = max(min(int(limit or TIMELINE_PAGE_SIZE), TIMELINE_MAX_PAGE_SIZE), 1)
+            events, next_cursor = self.timelines.page(timeline_id, cursor, limit, parse_timestamp(start), parse_timestamp(end))
+        except (TypeError, ValueError) as e:
+            return status, [], None, f"[ERROR] {e}"
+        except OSError as e:
+            return status, [], None, f"[ERROR] Cannot read timeline: {e}"
+        return status, events, next_cursor, f"[SUCCESS] {len(events)} timeline events"
+
+    def start_duplicate_search(self, directory=None, min_size=None, similar=False):
+        directory = directory or self.allowed_dir
+        if not directory:
+            return None, "[ERROR] No directory to search; set an allowed directory first"
+        directory = os.path.abspath(directory)
+        if not self.is_within_allowed_dir(directory) or not os.path.isdir(directory):
+            return None, f"[ERROR] Not a directory inside the allowed directory: {directory}"
+        try:
+            min_size = max(parse_size(min_size) or 1, 1)
+        except ValueError as e:
+            return None, f"[ERROR] {e}"
+        job_id = self.duplicates.start(directory, min_size, bool(similar))
+        self.add_log_entry("DUPLICATES", directory, "SUCCESS", f"Searching for duplicates ({job_id})")
+        return job_id, f"[SUCCESS] Searching for duplicates in {directory}"
+
+    @timed("get_duplicates_page")
+    def get_duplicates_page(self, job_id, cursor=0, limit=DUPLICATE_PAGE_SIZE, kind=None):
+        # Returns (status, groups, next_cursor, message)
+        status = self.duplicates.get_status(job_id)
+        if status is None:
+            return None, [], None, f"[ERROR] Unknown duplicate search: {job_id}"
+        if status.get("error"):
+            return status, [], None, f"[ERROR] Duplicate search failed: {status['error']}"
+        if status["running"]:
+            return status, [], None, f"[SUCCESS] Duplicate search is running ({status['stage']})"
+        if kind and kind not in DUPLICATE_KINDS:
+            return status, [], None, f"[ERROR] Unknown group kind: {kind}"
+        try:
+            cursor = max(int(cursor or 0), 0)
+            limit = max(min(int(limit or DUPLICATE_PAGE_SIZE), DUPLICATE_MAX_PAGE_SIZE), 1)
+            groups, next_cursor = self.duplicates.page(job_id, cursor, limit, kind)
+        except (TypeError, ValueError) as e:
+            return status, [], None, f"[ERROR] {e}"
+        except (OSError, sqlite3.Error) as e:
+            return status, [], None, f"[ERROR] Cannot read duplicate search: {e}"
+        return status, groups, next_cursor, f"[SUCCESS] {len(groups)} duplicate groups"
+
+    def check_metadata_batch(self, paths, sections):
+        # Returns (paths, sections, error message or None)
+        if not paths or not isinstance(paths, list):
+            return None, None, "[ERROR] No paths given"
+        if len(paths) > METADATA_BATCH_LIMIT:
+            return None, None, f"[ERROR] At most {METADATA_BATCH_LIMIT} paths per batch"
+        sections = sections or list(METADATA_DEFAULT_SECTIONS)
+        unknown = [section for section in sections if section not in METADATA_SECTIONS]
+        if unknown:
+            return None, None, f"[ERROR] Unknown metadata sections: {', '.join(unknown)}"
+        paths = [path for path in dict.fromkeys(paths) if self.is_within_allowed_dir(path)]
+        return paths, sections, None
     
     def format_size(self, size_bytes):
         if size_bytes == 0:
@@ -294,6 +4461,13 @@ class Investigator:
         return f"{size_bytes:.2f} {size_names[i]}"
 
     def is_text_file(self, filepath):
+        try:
+            content_type = self.sniffer.sniff(filepath)
+            if content_type != FileSniffer.EMPTY:
+                return FileSniffer.is_text_type(content_type)
+        except OSError:
+            pass
+        
         mime_type, encoding = mimetypes.guess_type(filepath)
         
         if mime_type:
@@ -322,68 +4496,206 @@ class Investigator:
         self.add_log_entry("DELETE", filepath, "BLOCKED")
         return False, message
     
-    def get_logs(self):
-        return self.log
+    def get_logs(self, since=0, limit=AUDIT_PAGE_SIZE):
+        return self.audit_log.entries_since(since, limit)
     
     def reload_target_files(self):
-        old_count = len(self.target_files)
-        self.target_files = self.load_target_files()
-        new_count = len(self.target_files)
+        with self.config_lock:
+            old_count = len(self.target_files)
+            target_files = self.load_target_files()
+            self.target_matcher = TargetMatcher(target_files)
+            self.target_files = target_files
+            new_count = len(target_files)
         self.add_log_entry("CONFIG", "target.txt", "SUCCESS", f"Reloaded target files: {old_count} → {new_count}")
         return True, f"Reloaded target files: {old_count} → {new_count}"
     
-    def list_directory(self, directory=None):
+    def resolve_listing_dir(self, directory):
+        # "" always means the drive list; None means the allowed directory if
+        # one is set and the drive list otherwise.
         if directory == "":
-            return self.list_drives()
-            
+            return None
         if directory is None:
-            if self.allowed_dir:
-                directory = self.allowed_dir
-            else:
-                return self.list_drives()
+            return self.allowed_dir
+        return directory
+
+    def describe_entry(self, entry, inspect=False):
+        # A listing only stats its files. Reading them (content sniffing and
+        # Office text prefetch) is opt-in with inspect, because every read
+        # is an access to the evidence and, where O_NOATIME is not honoured,
+        # updates the atime a timeline later reports.
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        item_type = "directory" if is_dir else "file"
+
+        icon = None
+        size = None
+        is_target = False
+        known = None
+        content_type = None
+        mismatch = False
+        if item_type == "file":
+            try:
+                # One stat, which DirEntry caches; known_status only consults
+                # hashes already in memory
+                st = entry.stat()
+                size = st.st_size
+                known = self.known_status(entry.path, st)
+                if inspect:
+                    content_type, mismatch = self.identify_content(entry.path, st)
+            except OSError:
+                pass
+            icon = self.get_file_icon(entry.path, self.icon_type(entry.path, content_type))
+            is_target = self.is_target_file(entry.name)
+            extractor = self.office_extractor(entry.path) if inspect else None
+            if extractor and size is not None:
+                # Warm the text cache so opening the document later is instant
+                self.office_text.prefetch(entry.path, extractor, st)
+
+        return {
+            "name": entry.name,
+            "type": item_type,
+            "path": entry.path,
+            "icon": icon,
+            "size": size,
+            "is_target": is_target,
+            "known": known,
+            "content_type": content_type,
+            "type_mismatch": mismatch,
+            "is_archive": item_type == "file" and archive_format(entry.name) is not None
+        }
+
+    def describe_entries(self, entries, inspect=False):
+        # Describes a page of entries in order. Inspecting reads every file,
+        # so those reads overlap on a few threads
+        if not inspect or len(entries) < 2:
+            return [self.describe_entry(entry, inspect) for entry in entries]
+        if self.describe_pool is None:
+            with self.config_lock:
+                if self.describe_pool is None:
+                    self.describe_pool = ThreadPoolExecutor(max_workers=LIST_DESCRIBE_WORKERS)
+        return list(self.describe_pool.map(functools.partial(self.describe_entry, inspect=True), entries))
+
+    def describe_member(self, archive, member):
+        path = self.archives.virtual_path(archive, member["path"])
+        icon = None
+        content_type = None
+        if member["type"] == "file":
+            content_type = FileSniffer.guess_from_name(member["name"])
+            icon = self.get_file_icon(path, content_type)
+        return {
+            "name": member["name"],
+            "type": member["type"],
+            "path": path,
+            "icon": icon,
+            "size": member["size"],
+            "is_target": member["type"] == "file" and self.is_target_file(member["name"]),
+            "known": None,
+            "content_type": content_type,
+            "type_mismatch": False,
+            "is_archive": False,
+            "in_archive": True
+        }
+
+    def iter_directory(self, directory, ordered=True, inspect=False):
+        # Yields items directories first and then by name. Unordered, a folder
+        # on disk is yielded as scandir reads it, without waiting for the
+        # whole directory; archive members are always in order.
+        located = self.archives.locate(directory)
+        if located:
+            archive, member = located
+            for _, item in self.archives.iter_members(archive, member):
+                yield self.describe_member(archive, item)
+            return
+        if ordered:
+            entries = scandir_sorted(directory)
+            for start in range(0, len(entries), LIST_PAGE_SIZE):
+                yield from self.describe_entries(entries[start:start + LIST_PAGE_SIZE], inspect)
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                yield self.describe_entry(entry, inspect)
+
+    @timed("list_directory")
+    def list_directory(self, directory=None, inspect=False):
+        directory = self.resolve_listing_dir(directory)
+        if directory is None:
+            return self.list_drives()
         
         try:
-            items = []
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                item_type = "directory" if os.path.isdir(item_path) else "file"
-                
-                icon = self.get_file_icon(item_path) if item_type == "file" else None
-                
-                size = None
-                if item_type == "file":
-                    try:
-                        size = os.path.getsize(item_path)
-                    except:
-                        pass
-                
-                is_target = False
-                if item_type == "file":
-                    is_target = self.is_target_file(item)
-                    if is_target:
-                        print(f"Flagged target file in directory listing: {item}")
-                
-                item_data = {
-                    "name": item, 
-                    "type": item_type, 
-                    "path": item_path,
-                    "icon": icon,
-                    "size": size,
-                    "is_target": is_target
-                }
-                
-                items.append(item_data)
-                
-            print(f"Listed {len(items)} items, {sum(1 for i in items if i.get('is_target'))} are target files")
+            items = list(self.iter_directory(directory, inspect=inspect))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Listed %d items, %d are target files", len(items), sum(1 for i in items if i.get('is_target')))
             return items, f"[SUCCESS] Listed directory: {directory}"
         except Exception as e:
-            print(f"Error listing directory: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error listing directory: %s", e)
             return [], f"[ERROR] Cannot list directory: {e}"
+
+    @timed("list_directory_page")
+    def list_directory_page(self, directory=None, cursor=0, limit=LIST_PAGE_SIZE, inspect=False):
+        # The cursor is opaque to clients: "<snapshot token>:<offset>" for a
+        # folder on disk, the encoded key of the last member for an archive.
+        # No cursor (or 0) asks for the first page.
+        directory = self.resolve_listing_dir(directory)
+        if directory is None:
+            items, message = self.list_drives()
+            return items, None, message
+
+        try:
+            limit = max(min(int(limit or LIST_PAGE_SIZE), LIST_MAX_PAGE_SIZE), 1)
+            located = self.archives.locate(directory)
+            if cursor and located:
+                after = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            elif cursor:
+                token, offset = str(cursor).split(':')
+                offset = int(offset)
+        except (TypeError, ValueError):
+            return [], None, "[ERROR] Invalid cursor or limit"
+
+        try:
+            items = []
+            next_cursor = None
+            if located:
+                archive, member = located
+                last = None
+                for key, row in self.archives.iter_members(archive, member, after if cursor else None):
+                    if len(items) == limit:
+                        next_cursor = base64.urlsafe_b64encode(json.dumps(last).encode()).decode()
+                        break
+                    items.append(self.describe_member(archive, row))
+                    last = key
+            else:
+                if cursor:
+                    entries = self.listings.get(token, directory)
+                    if entries is None:
+                        return [], None, "[ERROR] Listing expired; open the directory again"
+                else:
+                    token, entries = self.listings.create(directory)
+                    offset = 0
+                items = self.describe_entries(entries[offset:offset + limit], inspect)
+                if offset + limit < len(entries):
+                    next_cursor = f"{token}:{offset + limit}"
+            return items, next_cursor, f"[SUCCESS] Listed directory: {directory}"
+        except Exception as e:
+            log.error("Error listing directory: %s", e)
+            return [], None, f"[ERROR] Cannot list directory: {e}"
     
-    def get_file_icon(self, filepath):
-        mime_type, encoding = mimetypes.guess_type(filepath)
+    def identify_content(self, filepath, st=None):
+        # Returns (content type, whether it contradicts the file name)
+        content_type = self.sniffer.sniff(filepath, st)
+        guessed = FileSniffer.guess_from_name(filepath)
+        return content_type, FileSniffer.is_mismatch(guessed, content_type)
+
+    def icon_type(self, filepath, content_type):
+        # Icons follow the content when it was recognised, the name otherwise
+        if content_type in (None, FileSniffer.EMPTY, "application/octet-stream"):
+            return mimetypes.guess_type(filepath)[0]
+        return content_type
+
+    def get_file_icon(self, filepath, mime_type=None):
+        if mime_type is None:
+            mime_type, encoding = mimetypes.guess_type(filepath)
         if not mime_type:
             return "📄"
             
@@ -408,9 +4720,11 @@ class Investigator:
         else:
             return "📄"
     
+    @timed("list_drives")
     def list_drives(self):
         drives = []
         if sys.platform == 'win32':
+            import ctypes
             bitmask = ctypes.windll.kernel32.GetLogicalDrives()
             for letter in string.ascii_uppercase:
                 if bitmask & 1:
@@ -446,6 +4760,7 @@ class Investigator:
                         if path.startswith('/media/') or path.startswith('/mnt/'):
                             name = os.path.basename(path)
                             drives.append({"name": f"Drive {name}", "type": "drive", "path": path})
+        drives.sort(key=lambda drive: drive["name"].lower())
         
         cwd = os.getcwd()
         drives.append({"name": "Current Working Directory", "type": "directory", "path": cwd})
@@ -453,65 +4768,293 @@ class Investigator:
         return drives, "[SUCCESS] Listed available drives"
     
     def set_allowed_dir(self, directory):
-        self.allowed_dir = os.path.abspath(directory) if directory else None
+        with self.config_lock:
+            self.allowed_dir = os.path.abspath(directory) if directory else None
         message = f"[SUCCESS] Set allowed directory to: {self.allowed_dir}"
         self.add_log_entry("CONFIG", self.allowed_dir, "SUCCESS")
         return True, message
 
-    def extract_text_from_docx(self, filepath):
-        if not DOCX_AVAILABLE:
-            return "Word document preview not available (python-docx not installed)"
-            
+    def start_index(self, directory=None, incremental=False):
+        directory = directory or self.allowed_dir
+        if not directory:
+            return False, "[ERROR] No directory to index; set an allowed directory first"
+        if not self.is_within_allowed_dir(directory):
+            return False, f"[ERROR] {directory} is outside the allowed directory"
+        self.wait_for_targets()
+        success, message = self.file_index.start(directory, self.target_matcher, incremental)
+        self.add_log_entry("INDEX", directory, "SUCCESS" if success else "ERROR", message)
+        return success, message
+
+    def get_index_status(self):
+        return self.file_index.get_status()
+
+    @timed("search_index")
+    def search_index(self, query):
         try:
-            doc = Document(filepath)
-            full_text = []
-            
-            for para in doc.paragraphs:
-                if para.text:
-                    full_text.append(para.text)
-            
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text:
-                            row_text.append(cell.text)
-                    if row_text:
-                        full_text.append(" | ".join(row_text))
-            
-            return "\n\n".join(full_text)
-        except Exception as e:
+            results = self.file_index.search(query)
+        except (ValueError, TypeError) as e:
+            return [], f"[ERROR] Invalid search: {e}"
+        except sqlite3.Error as e:
+            return [], f"[ERROR] Search failed: {e}"
+        if self.allowed_dir:
+            results = [item for item in results if self.is_within_allowed_dir(item["path"])]
+        self.add_log_entry("SEARCH", json.dumps(query, sort_keys=True), "SUCCESS")
+        return results, f"[SUCCESS] Found {len(results)} indexed entries"
+
+    @timed("collect_files")
+    def collect_files(self, paths, recursive=True):
+        # Expands a list of files/directories into (path, size) pairs
+        files = []
+        seen = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if not self.is_within_allowed_dir(path):
+                continue
+            if os.path.isdir(path):
+                if not recursive:
+                    continue
+                for dirpath, dirnames, filenames in os.walk(path):
+                    for name in filenames:
+                        full_path = os.path.join(dirpath, name)
+                        try:
+                            st = os.stat(full_path, follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if stat.S_ISREG(st.st_mode) and full_path not in seen:
+                            seen.add(full_path)
+                            files.append((full_path, st.st_size))
+            elif os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                files.append((path, os.path.getsize(path)))
+        return files
+
+    def export_files(self, paths=None, query=None, archive_format="zip"):
+        # Returns (chunk iterator, download name, message); paths may be files
+        # or directories, query is an /api/search query over the index
+        archive_format = (archive_format or "zip").lower()
+        if archive_format not in EXPORT_FORMATS:
+            return None, None, f"[ERROR] Unknown export format: {archive_format}"
+        paths = list(paths or [])
+        if query:
+            results, message = self.search_index(query)
+            if message.startswith("[ERROR]"):
+                return None, None, message
+            paths.extend(item["path"] for item in results if item.get("type") == "file")
+        if not paths:
+            return None, None, "[ERROR] No paths given"
+        files = self.collect_files(paths)
+        if not files:
+            return None, None, "[ERROR] No readable files to export"
+        total = sum(size for _, size in files)
+        self.add_log_entry("EXPORT", f"{len(files)} files", "SUCCESS", f"{total} bytes as {archive_format}")
+        name = f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{archive_format}"
+        return stream_export(files, archive_format), name, f"[SUCCESS] Exporting {len(files)} files"
+
+    def start_hash_job(self, paths, algorithms=None, recursive=True):
+        if not paths:
+            return None, "[ERROR] No paths given"
+        try:
+            files = self.collect_files(paths, recursive)
+            job_id = self.hash_engine.start_job(files, algorithms or HASH_ALGORITHMS)
+        except ValueError as e:
+            return None, f"[ERROR] {e}"
+        self.add_log_entry("HASH", ", ".join(paths[:3]) + (" ..." if len(paths) > 3 else ""), "SUCCESS",
+                           f"Hashing {len(files)} files")
+        return job_id, f"[SUCCESS] Hashing {len(files)} files"
+
+    def get_hash_job(self, job_id, offset=0):
+        job = self.hash_engine.get_job(job_id, offset)
+        if job is not None and self.known_hashes:
+            # Fresh dicts: the results are shared with the hash cache and with
+            # other readers of the job, so they are never modified in place
+            results = []
+            for result in job["results"]:
+                known = self.known_hashes.lookup(result.get("hashes"))
+                results.append(dict(result, known=known["status"] if known else None))
+            job["results"] = results
+        return job
+
+    def known_status(self, filepath, st):
+        # Only files that have already been hashed can be classified; the
+        # listing never hashes on its own.
+        if not self.known_hashes:
+            return None
+        cached = self.hash_engine.get_cached(filepath, st, HASH_ALGORITHMS)
+        if cached is None:
+            return None
+        known = self.known_hashes.lookup(cached["hashes"])
+        return known["status"] if known else None
+
+    def list_hash_sets(self):
+        return self.known_hashes.describe()
+
+    @timed("import_hash_set")
+    def import_hash_set(self, source, name, status, algorithm):
+        if not source or not os.path.isfile(source):
+            return False, f"[ERROR] Hash list not found: {source}"
+        try:
+            count = self.known_hashes.import_list(source, name, status, (algorithm or "").lower())
+        except (OSError, ValueError) as e:
+            self.add_log_entry("HASHSET", source, "ERROR", str(e))
+            return False, f"[ERROR] Cannot import hash list: {e}"
+        self.add_log_entry("HASHSET", source, "SUCCESS", f"Imported {count} {algorithm} hashes as {status}")
+        return True, f"[SUCCESS] Imported {count} hashes into {name} ({status})"
+
+    # extension -> (office_type, description, mimetype) for read_file
+    OFFICE_TYPES = {
+        '.docx': ("word", "Word document", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        '.pptx': ("powerpoint", "PowerPoint presentation", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+        '.xlsx': ("excel", "Excel workbook", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    }
+
+    TIMED_EXTRACTORS = {
+        extract_docx_text: timed("extract_docx")(extract_docx_text),
+        extract_pptx_text: timed("extract_pptx")(extract_pptx_text),
+        extract_xlsx_text: timed("extract_xlsx")(extract_xlsx_text),
+    }
+
+    def office_extractor(self, filepath):
+        extractor = TEXT_EXTRACTORS.for_path(filepath)
+        if extractor is None:
+            return None
+        # The built-in formats are timed; errors propagate so that only
+        # successful extractions are cached
+        return self.TIMED_EXTRACTORS.get(extractor, extractor)
+
+    def document_type(self, filepath):
+        # (office_type, description, mimetype); formats registered through
+        # TEXT_EXTRACTORS show as generic documents
+        extension = os.path.splitext(filepath.lower())[1]
+        if extension in self.OFFICE_TYPES:
+            return self.OFFICE_TYPES[extension]
+        return ("document", f"{extension[1:].upper()} document",
+                mimetypes.guess_type(filepath)[0] or "application/octet-stream")
+
+    @staticmethod
+    def extract_text_from_docx(filepath):
+        try:
+            return extract_docx_text(filepath)
+        except (OSError, KeyError, zipfile.BadZipFile, ParseError) as e:
             return f"Error extracting text from Word document: {str(e)}"
     
-    def extract_text_from_pptx(self, filepath):
-        if not PPTX_AVAILABLE:
-            return "PowerPoint preview not available (python-pptx not installed)"
-            
+    @staticmethod
+    def extract_text_from_pptx(filepath):
         try:
-            prs = Presentation(filepath)
-            full_text = []
-            
-            full_text.append("=== PRESENTATION OVERVIEW ===\n")
-            
-            for i, slide in enumerate(prs.slides):
-                slide_text = [f"\n=== SLIDE {i+1} ==="]
-                
-                if slide.shapes.title:
-                    slide_text.append(f"Title: {slide.shapes.title.text}")
-                
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text:
-                        if shape != slide.shapes.title:
-                            slide_text.append(shape.text)
-                
-                full_text.append("\n".join(slide_text))
-            
-            return "\n\n".join(full_text)
-        except Exception as e:
+            return extract_pptx_text(filepath)
+        except (OSError, KeyError, zipfile.BadZipFile, ParseError) as e:
             return f"Error extracting text from PowerPoint presentation: {str(e)}"
 
+    @staticmethod
+    def extract_text_from_xlsx(filepath):
+        try:
+            return extract_xlsx_text(filepath)
+        except EXTRACTION_ERRORS as e:
+            return f"Error extracting text from Excel workbook: {str(e)}"
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # jsonify() goes through here, so serialising a response is measured
+    # apart from the operation that produced it
+    @timed("json_serialize")
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
+
+# Streamed responses (NDJSON listings, metadata batches and search results,
+# exports) hold a server worker thread for as long as they run. At most
+# STREAM_SLOTS run at once, each for at most STREAM_MAX_SECONDS, and waitress
+# gets STREAM_SLOTS threads on top of --threads, so streams cannot starve
+# ordinary API calls.
+STREAM_SLOTS = 4
+STREAM_MAX_SECONDS = 3600
+
+class StreamSlots:
+    def __init__(self, slots=STREAM_SLOTS, max_seconds=STREAM_MAX_SECONDS):
+        self.slots = slots
+        self.max_seconds = max_seconds
+        self.semaphore = threading.BoundedSemaphore(slots)
+
+    def open(self, chunks, trailer=None):
+        # A BoundedStream over chunks holding one slot, or None if all slots
+        # are taken. trailer is sent last if the time limit cuts it short.
+        if not self.semaphore.acquire(blocking=False):
+            return None
+        return BoundedStream(chunks, self.semaphore.release, self.max_seconds, trailer)
+
+class BoundedStream:
+    # Iterates chunks until they run out or max_seconds have passed. The
+    # slot is released when the stream ends or is closed, which the server
+    # does when the client goes away.
+    def __init__(self, chunks, release, max_seconds, trailer=None):
+        self.chunks = iter(chunks)
+        self.release = release
+        self.max_seconds = max_seconds
+        self.deadline = time.monotonic() + max_seconds
+        self.trailer = trailer
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        if time.monotonic() > self.deadline:
+            log.warning("Stream stopped after the %d s limit", self.max_seconds)
+            self.close()
+            if self.trailer is None:
+                raise StopIteration
+            return self.trailer
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.chunks, 'close', None)
+            if close:
+                close()
+        finally:
+            self.release()
+
+def ndjson_time_limit_line(hint):
+    return json.dumps({'done': True, 'error': f"Stream time limit of {streams.max_seconds} s reached; {hint}"}) + "\n"
+
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 blocker = None
+streams = StreamSlots()
+
+def stream_response(chunks, mimetype, trailer=None, **kwargs):
+    # Response over chunks in a stream slot, or 503 if none is free
+    stream = streams.open(chunks, trailer)
+    if stream is None:
+        return jsonify({'message': f"[ERROR] {streams.slots} streams are already running; try again shortly"}), 503
+    return Response(stream, mimetype=mimetype, **kwargs)
+
+@app.before_request
+def start_request_timer():
+    if not METRICS_ENABLED:
+        return
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Streamed responses (NDJSON listings, exports) are timed up to the
+    # first byte; their generators run after this hook
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("investigator_http_request_seconds", (("route", route), ("method", request.method)),
+                        time.perf_counter() - started)
+        metrics.inc("investigator_http_requests_total",
+                    (("route", route), ("method", request.method), ("status", str(response.status_code))))
+        if response.content_length:
+            metrics.inc("investigator_http_response_bytes_total", (("route", route),), response.content_length)
+    return response
 
 @app.route('/')
 def index():
@@ -521,14 +5064,47 @@ def index():
 def list_dir():
     data = request.json
     directory = data.get('directory', None)
-    items, message = blocker.list_directory(directory)
+    inspect = bool(data.get('inspect'))
+
+    if data.get('stream'):
+        return stream_response(stream_listing(directory, inspect), 'application/x-ndjson',
+                               ndjson_time_limit_line("list the directory in pages instead"))
+
+    if 'cursor' in data or 'limit' in data:
+        items, next_cursor, message = blocker.list_directory_page(
+            directory, data.get('cursor', 0), data.get('limit', LIST_PAGE_SIZE), inspect)
+        return jsonify({'items': items, 'next_cursor': next_cursor, 'message': message})
+
+    items, message = blocker.list_directory(directory, inspect)
     
-    target_files = [item["name"] for item in items if item.get("is_target")]
-    if target_files:
-        print(f"API response includes target files: {', '.join(target_files)}")
+    if log.isEnabledFor(logging.DEBUG):
+        target_files = [item["name"] for item in items if item.get("is_target")]
+        if target_files:
+            log.debug("API response includes target files: %s", ', '.join(target_files))
     
     return jsonify({'items': items, 'message': message})
 
+def stream_listing(directory, inspect=False):
+    # One JSON object per line, written as scandir produces entries, so the
+    # client can render the first rows before the directory is fully read.
+    resolved = blocker.resolve_listing_dir(directory)
+    if resolved is None:
+        items, message = blocker.list_drives()
+        for item in items:
+            yield json.dumps(item) + "\n"
+        yield json.dumps({'done': True, 'count': len(items), 'message': message}) + "\n"
+        return
+
+    count = 0
+    try:
+        for item in blocker.iter_directory(resolved, ordered=False, inspect=inspect):
+            count += 1
+            yield json.dumps(item) + "\n"
+        message = f"[SUCCESS] Listed directory: {resolved}"
+    except Exception as e:
+        message = f"[ERROR] Cannot list directory: {e}"
+    yield json.dumps({'done': True, 'count': count, 'message': message}) + "\n"
+
 @app.route('/api/read', methods=['POST'])
 def read_file():
     data = request.json
@@ -536,36 +5112,254 @@ def read_file():
     content_data, message = blocker.read_file(filepath)
     return jsonify({'data': content_data, 'message': message})
 
+@app.route('/api/text', methods=['POST'])
+def read_text_page():
+    data = request.json or {}
+    page, message = blocker.read_text_page(
+        data.get('filepath'), data.get('line'), data.get('lines'), data.get('offset'), data.get('length'))
+    return jsonify({'data': page, 'message': message})
+
+@app.route('/api/hex', methods=['POST'])
+def read_hex():
+    data = request.json or {}
+    window, message = blocker.read_hex(data.get('filepath'), data.get('offset'), data.get('length'))
+    return jsonify({'data': window, 'message': message})
+
+@app.route('/api/hex/search', methods=['POST'])
+def search_hex():
+    data = request.json or {}
+    result, message = blocker.search_hex(
+        data.get('filepath'), data.get('pattern'), data.get('type', 'hex'), data.get('start'), data.get('max_matches'))
+    return jsonify({'data': result, 'message': message})
+
 @app.route('/api/metadata', methods=['POST'])
 def get_file_metadata():
     data = request.json
     filepath = data.get('filepath')
-    metadata, message = blocker.get_file_metadata(filepath)
+    metadata, message = blocker.get_file_metadata(filepath, data.get('sections'))
     return jsonify({'metadata': metadata, 'message': message})
 
+@app.route('/api/metadata/batch', methods=['POST'])
+def get_batch_metadata():
+    data = request.json or {}
+    paths, sections, error = blocker.check_metadata_batch(data.get('paths'), data.get('sections'))
+    if error:
+        return jsonify({'results': [], 'message': error}), 400
+
+    if data.get('stream'):
+        # NDJSON: a header line with the shared system info, then one line
+        # per file as soon as it is done
+        def generate():
+            yield json.dumps({'system': platform_info(), 'count': len(paths), 'sections': sections}) + '\n'
+            for result in blocker.iter_batch_metadata(paths, sections):
+                yield json.dumps(result) + '\n'
+        return stream_response(generate(), 'application/x-ndjson',
+                               ndjson_time_limit_line("request the remaining paths in another batch"))
+
+    results = list(blocker.iter_batch_metadata(paths, sections))
+    return jsonify({'system': platform_info(), 'sections': sections, 'results': results,
+                    'message': f"[SUCCESS] Got metadata for {len(results)} files"})
+
+@app.route('/api/timeline', methods=['POST'])
+def start_timeline():
+    data = request.json or {}
+    timeline_id, message = blocker.start_timeline(data.get('directory'))
+    return jsonify({'timeline_id': timeline_id, 'message': message})
+
+@app.route('/api/timeline', methods=['GET'])
+def list_timelines():
+    return jsonify({'timelines': blocker.timelines.list(), 'message': "[SUCCESS] Timelines"})
+
+@app.route('/api/timeline/<timeline_id>', methods=['GET'])
+def get_timeline(timeline_id):
+    status, events, next_cursor, message = blocker.get_timeline_page(
+        timeline_id, request.args.get('cursor', 0), request.args.get('limit', TIMELINE_PAGE_SIZE),
+        request.args.get('start'), request.args.get('end'))
+    if status is None:
+        return jsonify({'status': None, 'events': [], 'message': message}), 404
+    return jsonify({'status': status, 'events': events, 'next_cursor': next_cursor, 'message': message})
+
+@app.route('/api/timeline/<timeline_id>/export', methods=['GET'])
+def export_timeline(timeline_id):
+    export_format = request.args.get('format', 'csv')
+    status = blocker.timelines.get_status(timeline_id)
+    if status is None or status["running"] or status.get("error") or export_format not in ("csv", "bodyfile"):
+        return jsonify({'message': "[ERROR] Unknown or unfinished timeline, or format is not csv/bodyfile"}), 400
+    try:
+        start = parse_timestamp(request.args.get('start'))
+        end = parse_timestamp(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'message': f"[ERROR] {e}"}), 400
+    blocker.add_log_entry("EXPORT", f"timeline {timeline_id}", "SUCCESS", export_format)
+    name = f"timeline_{timeline_id[:8]}.{'csv' if export_format == 'csv' else 'body'}"
+    return stream_response(blocker.timelines.export(timeline_id, export_format, start, end),
+                           'text/csv' if export_format == 'csv' else 'text/plain',
+                           headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+@app.route('/api/duplicates', methods=['POST'])
+def start_duplicate_search():
+    data = request.json or {}
+    job_id, message = blocker.start_duplicate_search(data.get('directory'), data.get('min_size'), data.get('similar'))
+    return jsonify({'job_id': job_id, 'message': message})
+
+@app.route('/api/duplicates', methods=['GET'])
+def list_duplicate_searches():
+    return jsonify({'jobs': blocker.duplicates.list(), 'message': "[SUCCESS] Duplicate searches"})
+
+@app.route('/api/duplicates/<job_id>', methods=['GET'])
+def get_duplicates(job_id):
+    status, groups, next_cursor, message = blocker.get_duplicates_page(
+        job_id, request.args.get('cursor', 0), request.args.get('limit', DUPLICATE_PAGE_SIZE), request.args.get('kind'))
+    if status is None:
+        return jsonify({'status': None, 'groups': [], 'message': message}), 404
+    return jsonify({'status': status, 'groups': groups, 'next_cursor': next_cursor, 'message': message})
+
+def process_gauges():
+    gauges = [
+        ("process_cpu_seconds_total", f"{time.process_time():.3f}"),
+        ("investigator_uptime_seconds", f"{time.time() - metrics.started:.0f}"),
+        ("investigator_threads", threading.active_count()),
+    ]
+    try:
+        with open('/proc/self/statm') as f:
+            gauges.append(("process_resident_memory_bytes", int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')))
+    except (OSError, ValueError, AttributeError):
+        pass
+    for key, value in blocker.office_text.stats().items():
+        gauges.append((f"investigator_office_text_cache_{key}", value))
+    gauges.append(("investigator_profiler_samples", profiler.status()["samples"]))
+    return gauges
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(process_gauges()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiler', methods=['GET', 'POST'])
+def toggle_profiler():
+    if request.method == 'POST':
+        data = request.json or {}
+        if data.get('enabled'):
+            try:
+                interval = min(max(float(data.get('interval') or PROFILER_INTERVAL), 0.001), 1.0)
+            except (TypeError, ValueError):
+                return jsonify({'status': profiler.status(), 'message': "[ERROR] Invalid interval"}), 400
+            started = profiler.start(interval)
+            message = "[SUCCESS] Profiler started" if started else "[ERROR] Profiler is already running"
+        else:
+            message = "[SUCCESS] Profiler stopped" if profiler.stop() else "[SUCCESS] Profiler was not running"
+        log.info(message)
+        return jsonify({'status': profiler.status(), 'message': message})
+    return jsonify({'status': profiler.status(), 'message': "[SUCCESS] Profiler status"})
+
+@app.route('/api/metrics/profile', methods=['GET'])
+def get_profile():
+    limit = request.args.get('limit', type=int)
+    return Response(profiler.collapsed(limit), mimetype='text/plain')
+
+def file_etag(st):
+    # Strong validator: any change of inode, size or mtime yields a new tag
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+def send_evidence(filepath, as_attachment=False):
+    # Byte ranges, If-None-Match/If-Range and 304s are handled by send_file's
+    # conditional mode. Browsers may keep a copy but must revalidate it, which
+    # costs a stat instead of re-reading the file.
+    located = blocker.archives.split(filepath)
+    if located:
+        return send_archive_member(filepath, *located, as_attachment=as_attachment)
+    st = os.stat(filepath)
+    response = send_file(filepath, as_attachment=as_attachment, etag=file_etag(st),
+                         conditional=True, last_modified=st.st_mtime)
+    return revalidate_privately(response)
+
+def send_archive_member(filepath, archive, member, as_attachment=False):
+    # The member stream is seekable, so ranges only decompress what they
+    # need to (stored zip and plain tar members seek directly)
+    st = os.stat(archive)
+    info = blocker.archives.stat(archive, member)
+    stream = blocker.archives.open(archive, member)
+    response = Response(FileWrapper(stream, EXPORT_CHUNK_SIZE), direct_passthrough=True,
+                        mimetype=FileSniffer.guess_from_name(filepath) or 'application/octet-stream')
+    response.content_length = info["size"]
+    member_tag = hashlib.sha1(member.encode('utf-8', errors='surrogateescape')).hexdigest()[:16]
+    response.set_etag(f"{file_etag(st)}-{member_tag}")
+    if info["mtime"]:
+        response.last_modified = info["mtime"]
+    if as_attachment:
+        try:
+            info["name"].encode('ascii')
+            disposition = {"filename": info["name"]}
+        except UnicodeEncodeError:
+            disposition = {"filename*": "UTF-8''" + quote(info["name"], safe='')}
+        response.headers.set('Content-Disposition', 'attachment', **disposition)
+    response.make_conditional(request.environ, accept_ranges=True, complete_length=info["size"])
+    return revalidate_privately(response)
+
+def revalidate_privately(response):
+    response.cache_control.public = False
+    response.cache_control.max_age = None
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+def route_path(filepath):
+    # The URL router merges the "//" of /api/media//home/..., dropping the
+    # leading slash of POSIX absolute paths
+    filepath = os.path.normpath(filepath)
+    if os.name != 'nt' and not os.path.isabs(filepath):
+        filepath = '/' + filepath
+    return filepath
+
+def is_follow_up_request():
+    # Range requests past the start (video seeking, PDF paging) and cache
+    # revalidations are part of a view that has already been logged
+    ranges = request.range
+    if ranges and any(start > 0 for start, _ in ranges.ranges):
+        return True
+    return bool(request.if_none_match)
+
+def refuse_outside(action, filepath):
+    # 403 for paths outside the allowed directory, or None if allowed
+    if blocker.is_within_allowed_dir(filepath):
+        return None
+    blocker.add_log_entry(action, filepath, "BLOCKED", "Outside the allowed directory")
+    return jsonify({'message': "[ERROR] Access denied"}), 403
+
 @app.route('/api/download/<path:filepath>')
 def download_file(filepath):
-    filepath = os.path.normpath(filepath)
+    filepath = route_path(filepath)
+    refused = refuse_outside("DOWNLOAD", filepath)
+    if refused:
+        return refused
     
-    blocker.add_log_entry("DOWNLOAD", filepath, "SUCCESS")
+    if not is_follow_up_request():
+        blocker.add_log_entry("DOWNLOAD", filepath, "SUCCESS")
     
-    return send_file(filepath, as_attachment=True)
+    return send_evidence(filepath, as_attachment=True)
 
 @app.route('/api/media/<path:filepath>')
 def serve_media(filepath):
-    filepath = os.path.normpath(filepath)
-    
-    mime_type, _ = mimetypes.guess_type(filepath)
-    is_media = mime_type and (
-        mime_type.startswith('image/') or 
-        mime_type.startswith('video/') or
-        mime_type.startswith('audio/') or
-        mime_type == 'application/pdf'
-    )
+    filepath = route_path(filepath)
+    refused = refuse_outside("READ", filepath)
+    if refused:
+        return refused
     
-    blocker.add_log_entry("READ", filepath, "SUCCESS", is_media=is_media)
+    if not is_follow_up_request():
+        blocker.add_log_entry("READ", filepath, "SUCCESS")
     
-    return send_file(filepath)
+    return send_evidence(filepath)
+
+@app.route('/api/thumbnail')
+def serve_thumbnail():
+    filepath = os.path.normpath(request.args.get('path', ''))
+    refused = refuse_outside("READ", filepath)
+    if refused:
+        return refused
+    thumbnail, message = blocker.get_thumbnail(filepath, request.args.get('size', THUMBNAIL_DEFAULT_SIZE))
+    if thumbnail is None:
+        return jsonify({'message': message}), 404
+    return send_file(thumbnail, mimetype='image/jpeg')
 
 @app.route('/api/write', methods=['POST'])
 def write_file():
@@ -584,7 +5378,10 @@ def delete_file():
 
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
-    return jsonify({'logs': blocker.get_logs()})
+    since = max(request.args.get('since', 0, type=int), 0)
+    limit = max(min(request.args.get('limit', AUDIT_PAGE_SIZE, type=int), AUDIT_RING_SIZE), 1)
+    logs, next_since, last_seq, truncated = blocker.get_logs(since, limit)
+    return jsonify({'logs': logs, 'next_since': next_since, 'last_seq': last_seq, 'truncated': truncated})
 
 @app.route('/api/set_allowed_dir', methods=['POST'])
 def set_allowed_dir():
@@ -595,6 +5392,7 @@ def set_allowed_dir():
 
 @app.route('/api/debug/target_files')
 def debug_target_files():
+    blocker.wait_for_targets()
     return jsonify({
         'target_files_count': len(blocker.target_files),
         'target_files': list(blocker.target_files)[:20],
@@ -615,24 +5413,162 @@ def reload_targets():
     success, message = blocker.reload_target_files()
     return jsonify({'success': success, 'message': message})
 
-def open_browser():
-    webbrowser.open('http://localhost:5000')
+@app.route('/api/index', methods=['POST'])
+def start_index():
+    data = request.json or {}
+    success, message = blocker.start_index(data.get('directory'), bool(data.get('incremental')))
+    return jsonify({'success': success, 'message': message, 'status': blocker.get_index_status()})
+
+@app.route('/api/index/status', methods=['GET'])
+def index_status():
+    return jsonify({'status': blocker.get_index_status()})
+
+@app.route('/api/search', methods=['POST'])
+def search_index():
+    query = request.json or {}
+    results, message = blocker.search_index(query)
+    return jsonify({'results': results, 'count': len(results), 'message': message})
+
+@app.route('/api/export', methods=['POST'])
+def export_files():
+    data = request.json or {}
+    chunks, name, message = blocker.export_files(data.get('paths'), data.get('query'), data.get('format'))
+    if chunks is None:
+        return jsonify({'message': message}), 400
+    mimetype = 'application/zip' if name.endswith('.zip') else 'application/x-tar'
+    return stream_response(chunks, mimetype,
+                           headers={'Content-Disposition': f'attachment; filename="{name}"', 'Cache-Control': 'no-store'})
+
+@app.route('/api/hash', methods=['POST'])
+def start_hash_job():
+    data = request.json or {}
+    paths = data.get('paths') or ([data['filepath']] if data.get('filepath') else [])
+    job_id, message = blocker.start_hash_job(paths, data.get('algorithms'), data.get('recursive', True))
+    return jsonify({'job_id': job_id, 'message': message})
+
+@app.route('/api/hash/<job_id>', methods=['GET'])
+def get_hash_job(job_id):
+    offset = request.args.get('offset', 0, type=int)
+    job = blocker.get_hash_job(job_id, offset)
+    if job is None:
+        return jsonify({'job': None, 'message': f"[ERROR] Unknown hash job: {job_id}"}), 404
+    return jsonify({'job': job, 'message': "[SUCCESS] Hash job status"})
+
+@app.route('/api/hashsets', methods=['GET'])
+def list_hash_sets():
+    return jsonify({'hashsets': blocker.list_hash_sets()})
+
+@app.route('/api/hashsets/import', methods=['POST'])
+def import_hash_set():
+    data = request.json or {}
+    success, message = blocker.import_hash_set(
+        data.get('source'), data.get('name'), data.get('status'), data.get('algorithm'))
+    return jsonify({'success': success, 'message': message, 'hashsets': blocker.list_hash_sets()})
+
+@app.route('/api/grep', methods=['POST'])
+def start_content_search():
+    data = request.json or {}
+    job_id, message = blocker.start_content_search(data.get('paths'), data.get('patterns'), data.get('max_hits'))
+    return jsonify({'job_id': job_id, 'message': message})
+
+@app.route('/api/grep/<job_id>', methods=['GET'])
+def get_content_search(job_id):
+    offset = request.args.get('offset', 0, type=int)
+    job = blocker.get_content_search(job_id, offset)
+    if job is None:
+        return jsonify({'job': None, 'message': f"[ERROR] Unknown search job: {job_id}"}), 404
+    return jsonify({'job': job, 'message': "[SUCCESS] Search job status"})
+
+@app.route('/api/grep/<job_id>/stream', methods=['GET'])
+def stream_content_search(job_id):
+    if blocker.get_content_search(job_id) is None:
+        return jsonify({'message': f"[ERROR] Unknown search job: {job_id}"}), 404
+
+    def generate():
+        # One JSON line per file with hits as soon as it is found, then a
+        # final summary line
+        offset = 0
+        while True:
+            job = blocker.get_content_search(job_id, offset)
+            if job is None:
+                # Evicted while streaming
+                yield json.dumps({'done': True, 'error': f"Unknown search job: {job_id}"}) + "\n"
+                return
+            for result in job["results"]:
+                yield json.dumps(result) + "\n"
+            offset += len(job["results"])
+            if not job["running"]:
+                del job["results"]
+                job["done"] = True
+                yield json.dumps(job) + "\n"
+                return
+            blocker.wait_for_content_search(job_id, offset, GREP_STREAM_WAIT_SECONDS)
+
+    return stream_response(generate(), 'application/x-ndjson',
+                           ndjson_time_limit_line(f"the search continues; poll /api/grep/{job_id}?offset=N"))
+
+@app.route('/api/grep/<job_id>/cancel', methods=['POST'])
+def cancel_content_search(job_id):
+    success, message = blocker.cancel_content_search(job_id)
+    return jsonify({'success': success, 'message': message})
+
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 5000
+SERVER_THREADS = 8
+
+def open_browser(port=SERVER_PORT):
+    import webbrowser
+    webbrowser.open(f'http://localhost:{port}')
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS, dev=False):
+    # waitress is the production server: a fixed pool of worker threads, each
+    # request's blocking filesystem work runs on one of them, plus one thread
+    # per stream slot. Without it (or with --dev) the Flask development
+    # server runs with a thread per request.
+    if not dev:
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            log.warning("waitress not installed (pip install waitress); using the development server")
+        else:
+            log.info("Serving on http://%s:%s with waitress, %d threads plus %d for streams",
+                     host, port, threads, streams.slots)
+            waitress_serve(app, host=host, port=port, threads=threads + streams.slots)
+            return
+    app.run(host=host, port=port, debug=False, threaded=True)
 
-def start_server(allowed_dir=None):
+def start_server(allowed_dir=None, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS,
+                 dev=False, browser=True, stream_slots=STREAM_SLOTS):
     app.template_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
     app.static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
     
-    global blocker
+    global blocker, streams
     blocker = Investigator(allowed_dir)
+    streams = StreamSlots(stream_slots)
     
-    threading.Timer(1.5, open_browser).start()
-    app.run(host='0.0.0.0', debug=False)
+    if browser:
+        threading.Timer(1.5, open_browser, args=(port,)).start()
+    serve(host, port, threads, dev)
 
 if __name__ == "__main__":
-    allowed_directory = None
-    if len(sys.argv) > 1:
-        allowed_directory = sys.argv[1]
+    import argparse
+    parser = argparse.ArgumentParser(description="Investigator v1 - read-only evidence browser")
+    parser.add_argument('allowed_dir', nargs='?', help="restrict browsing to this directory")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help="worker threads (waitress)")
+    parser.add_argument('--streams', type=int, default=STREAM_SLOTS,
+                        help="streamed responses that may run at once, each on its own extra thread")
+    parser.add_argument('--dev', action='store_true', help="use the Flask development server")
+    parser.add_argument('--no-browser', action='store_true', help="do not open a browser window")
+    parser.add_argument('--log-level', default=os.environ.get('INVESTIGATOR_LOG_LEVEL', 'info'),
+                        choices=('debug', 'info', 'warning', 'error'), help="debug shows per-request detail")
+    args = parser.parse_args()
+    allowed_directory = args.allowed_dir
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
         
-    print(f"Starting Investigator v1{' for directory: ' + allowed_directory if allowed_directory else ''}")
-    print("Opening web interface...")
-    start_server(allowed_directory) 
\ No newline at end of file
+    log.info("Starting Investigator v1%s", f" for directory: {allowed_directory}" if allowed_directory else "")
+    if not args.no_browser:
+        log.info("Opening web interface...")
+    start_server(allowed_directory, args.host, args.port, args.threads, args.dev, not args.no_browser,
+                 max(args.streams, 1))
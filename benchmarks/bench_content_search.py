@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import ContentSearchEngine, grep_file
+
+PATTERNS = [
+    "confidential",
+    "wallet.dat",
+    {"pattern": "email", "type": "preset"},
+    {"pattern": "bitcoin", "type": "preset"},
+]
+
+
+def make_corpus(directory, file_count, size_mb, seed=1):
+    # Log-like text with a keyword planted every few hundred KB
+    rng = random.Random(seed)
+    words = [b"alpha", b"bravo", b"charlie", b"delta", b"echo", b"foxtrot", b"golf", b"hotel"]
+    line_pool = [b" ".join(rng.choice(words) for _ in range(12)) + b"\n" for _ in range(1000)]
+    planted = [b"CONFIDENTIAL memo\n", b"contact jane.doe@example.org\n",
+               b"pay to 1BoatSLRHtKNngkdXEeobR76b53LETtpyT\n"]
+    paths = []
+    for i in range(file_count):
+        path = os.path.join(directory, f"corpus_{i:03d}.log")
+        with open(path, 'wb') as f:
+            written = 0
+            while written < size_mb * 1024 * 1024:
+                block = b"".join(rng.choice(line_pool) for _ in range(4000))
+                block += rng.choice(planted)
+                f.write(block)
+                written += len(block)
+        paths.append(path)
+    return paths
+
+
+def run(file_count=8, size_mb=64):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_corpus(directory, file_count, size_mb)
+        total = sum(os.path.getsize(path) for path in paths)
+
+        start = time.perf_counter()
+        result = grep_file(paths[0], PATTERNS, max_hits=10 ** 9)
+        single = time.perf_counter() - start
+        print(f"patterns:  {len(PATTERNS)} ({file_count} files of {size_mb} MB)")
+        print(f"one core:  {result['scanned'] / 1e9 / single:.3f} GB/s ({len(result['hits'])} hits)")
+
+        engine = ContentSearchEngine()
+        engine.get_pool().submit(len, []).result()
+
+        start = time.perf_counter()
+        job_id = engine.start_job([(path, os.path.getsize(path)) for path in paths], PATTERNS, 10 ** 9)
+        while engine.get_job(job_id)["running"]:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        job = engine.get_job(job_id)
+        print(f"pool:      {total / 1e9 / elapsed:.3f} GB/s with {engine.workers} workers "
+              f"({job['hits']} hits in {total / 1e6:.0f} MB)")
+        engine.pool.shutdown()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    run(count, size)
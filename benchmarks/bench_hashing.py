@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import HASH_ALGORITHMS, HashEngine, hash_file
+
+
+def make_files(directory, count, size_mb):
+    block = os.urandom(1024 * 1024)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"evidence_{i:03d}.bin")
+        with open(path, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(block)
+        paths.append(path)
+    return paths
+
+
+def run(file_count=8, size_mb=64):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_files(directory, file_count, size_mb)
+        total_mb = file_count * size_mb
+
+        start = time.perf_counter()
+        hash_file(paths[0], HASH_ALGORITHMS)
+        single = time.perf_counter() - start
+        print(f"algorithms: {', '.join(HASH_ALGORITHMS)} (single pass)")
+        print(f"one core:   {size_mb / single:.1f} MB/s")
+
+        engine = HashEngine()
+        # Warm the pool up so process start-up is not counted
+        engine.get_pool().submit(len, []).result()
+
+        start = time.perf_counter()
+        job_id = engine.start_job([(path, os.path.getsize(path)) for path in paths], HASH_ALGORITHMS)
+        while engine.get_job(job_id)["running"]:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        print(f"pool:       {total_mb / elapsed:.1f} MB/s with {engine.workers} workers "
+              f"({total_mb / elapsed / engine.workers:.1f} MB/s per core)")
+        engine.pool.shutdown()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    run(count, size)
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import RecentOperations
+
+
+class FakeClock:
+    # Advances a fixed step per event, simulating a given event rate
+    def __init__(self, rate):
+        self.now = 0.0
+        self.step = 1.0 / rate
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def legacy_dedupe(events, clock):
+    # The dict-rebuilding dedupe add_log_entry used before RecentOperations
+    recent_operations = {}
+    for key in events:
+        current_time = clock()
+        if key in recent_operations:
+            if current_time - recent_operations[key] < 2:
+                continue
+        recent_operations[key] = current_time
+        recent_operations = {k: v for k, v in recent_operations.items() if current_time - v < 5}
+
+
+def compiled_dedupe(events, clock):
+    recent = RecentOperations(clock=clock)
+    for key in events:
+        recent.is_duplicate(key)
+
+
+def time_per_call(function, rate, count):
+    # Distinct keys, as a recursive scan logging every file would produce
+    events = [("READ", f"/evidence/file_{i}", "SUCCESS") for i in range(count)]
+    start = time.perf_counter()
+    function(events, FakeClock(rate))
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run(count=20000, legacy_max_rate=2000):
+    # The legacy dict only reaches its steady-state size (5 s of events)
+    # after 5 * rate calls, so it is measured over at least that many; above
+    # legacy_max_rate that takes too long to be worth waiting for
+    print(f"{'events/s':>10} {'legacy us/call':>15} {'new us/call':>12}")
+    for rate in (10, 100, 1000, 2000, 5000, 20000, 100000):
+        compiled = time_per_call(compiled_dedupe, rate, max(count, 5 * rate))
+        if rate <= legacy_max_rate:
+            legacy = f"{time_per_call(legacy_dedupe, rate, 5 * rate + 2000):.2f}"
+        else:
+            legacy = "-"
+        print(f"{rate:>10} {legacy:>15} {compiled:>12.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
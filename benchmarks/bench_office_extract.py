@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import extract_docx_text, extract_pptx_text, extract_xlsx_text
+
+try:
+    from docx import Document
+    from pptx import Presentation
+except ImportError:
+    print("python-docx and python-pptx are needed to build the corpus and run the legacy extractors "
+          "(pip install -r benchmarks/requirements.txt)")
+    sys.exit(1)
+
+LOREM = "The quick brown fox jumps over the lazy dog while the investigator takes notes. "
+
+
+def legacy_docx(filepath):
+    # The python-docx implementation of Investigator.extract_text_from_docx
+    doc = Document(filepath)
+    full_text = [para.text for para in doc.paragraphs if para.text]
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = [cell.text for cell in row.cells if cell.text]
+            if row_text:
+                full_text.append(" | ".join(row_text))
+    return "\n\n".join(full_text)
+
+
+def legacy_pptx(filepath):
+    # The python-pptx implementation of Investigator.extract_text_from_pptx
+    prs = Presentation(filepath)
+    full_text = ["=== PRESENTATION OVERVIEW ===\n"]
+    for i, slide in enumerate(prs.slides):
+        slide_text = [f"\n=== SLIDE {i+1} ==="]
+        if slide.shapes.title:
+            slide_text.append(f"Title: {slide.shapes.title.text}")
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text:
+                if shape != slide.shapes.title:
+                    slide_text.append(shape.text)
+        full_text.append("\n".join(slide_text))
+    return "\n\n".join(full_text)
+
+
+def make_docx(path, paragraphs):
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"{i} {LOREM * 3}")
+    table = doc.add_table(rows=50, cols=4)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"r{r}c{c}"
+    doc.save(path)
+
+
+def make_pptx(path, slides):
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        slide.placeholders[1].text = LOREM * 5
+    prs.save(path)
+
+
+def make_xlsx(path, rows, cols=8):
+    # Written by hand so the benchmark does not need openpyxl
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    rel_ns = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        package.writestr('xl/workbook.xml', f'<workbook {ns} {rel_ns}><sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        package.writestr('xl/_rels/workbook.xml.rels', '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         '<Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/></Relationships>')
+        package.writestr('xl/sharedStrings.xml', f'<sst {ns}>' + ''.join(f'<si><t>label {i}</t></si>' for i in range(100)) + '</sst>')
+        with package.open('xl/worksheets/sheet1.xml', 'w') as part:
+            part.write(f'<worksheet {ns}><sheetData>'.encode())
+            for r in range(rows):
+                cells = ''.join(f'<c t="s"><v>{(r + c) % 100}</v></c>' if c % 2 else f'<c><v>{r * c}</v></c>' for c in range(cols))
+                part.write(f'<row r="{r + 1}">{cells}</row>'.encode())
+            part.write(b'</sheetData></worksheet>')
+
+
+def measure(function, path):
+    # Timed without tracemalloc, which slows allocation-heavy code several
+    # times over; peak memory comes from a second, traced run
+    start = time.perf_counter()
+    text = function(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return text, elapsed, peak
+
+
+def report(label, path, native, legacy=None):
+    text, elapsed, peak = measure(native, path)
+    size = os.path.getsize(path) / 1e6
+    line = f"{label:5} {size:6.2f} MB  native {elapsed * 1000:8.1f} ms, peak {peak / 1e6:6.1f} MB"
+    if legacy:
+        legacy_text, legacy_elapsed, legacy_peak = measure(legacy, path)
+        line += (f" | legacy {legacy_elapsed * 1000:8.1f} ms, peak {legacy_peak / 1e6:6.1f} MB"
+                 f" | {legacy_elapsed / elapsed:4.1f}x faster, same text: {text == legacy_text}")
+    print(line)
+
+
+def run(scale=1):
+    with tempfile.TemporaryDirectory() as directory:
+        docx_path = os.path.join(directory, "bench.docx")
+        pptx_path = os.path.join(directory, "bench.pptx")
+        xlsx_path = os.path.join(directory, "bench.xlsx")
+        make_docx(docx_path, 2000 * scale)
+        make_pptx(pptx_path, 300 * scale)
+        make_xlsx(xlsx_path, 50000 * scale)
+        report("docx", docx_path, extract_docx_text, legacy_docx)
+        report("pptx", pptx_path, extract_pptx_text, legacy_pptx)
+        report("xlsx", xlsx_path, extract_xlsx_text)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
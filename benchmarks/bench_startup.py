@@ -0,0 +1,119 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Medians over --repeat cold starts; exceeding either budget fails the run
+IMPORT_BUDGET_MS = 300
+FIRST_REQUEST_BUDGET_MS = 1000
+
+
+def parse_importtime(output):
+    # {module: (self_us, cumulative_us, depth)} from `python -X importtime`
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def measure_import(data_dir):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            env=dict(os.environ, INVESTIGATOR_DATA_DIR=data_dir),
+                            capture_output=True, text=True, timeout=60)
+    modules = parse_importtime(result.stderr)
+    if "app" not in modules:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+    return modules
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(data_dir, directory):
+    # Process start to the first successful /api/list, the way an analyst
+    # experiences it: interpreter start, imports, Investigator setup, bind.
+    # -m rather than app.py so the bytecode cache is used, as the README advises
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'app', '--no-browser', '--host', '127.0.0.1',
+                               '--port', str(port), '--log-level', 'warning'], cwd=ROOT,
+                              env=dict(os.environ, INVESTIGATOR_DATA_DIR=data_dir),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + 30
+        while time.perf_counter() < deadline:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                connection.request('POST', '/api/list', json.dumps({'directory': directory}),
+                                   {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("server did not answer within 30s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run(repeat, import_budget, first_request_budget, top):
+    import_times = []
+    first_requests = []
+    with tempfile.TemporaryDirectory(prefix='investigator-startup-') as data_dir:
+        for _ in range(repeat):
+            modules = measure_import(data_dir)
+            import_times.append(modules["app"][1] / 1000)
+        for _ in range(repeat):
+            first_requests.append(measure_first_request(data_dir, ROOT) * 1000)
+
+    # Heaviest modules imported directly by app, from the last run
+    direct = sorted(((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth == 1),
+                    reverse=True)
+    print(f"import app:     {median(import_times):7.1f} ms median (budget {import_budget} ms, "
+          f"self {modules['app'][0] / 1000:.1f} ms)")
+    for cumulative, name in direct[:top]:
+        print(f"  {name:28} {cumulative / 1000:7.1f} ms")
+    print(f"first request:  {median(first_requests):7.1f} ms median (budget {first_request_budget} ms)")
+
+    over = []
+    if median(import_times) > import_budget:
+        over.append("import")
+    if median(first_requests) > first_request_budget:
+        over.append("first request")
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time and time to first request")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--first-request-budget-ms', type=float, default=FIRST_REQUEST_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help="how many of the heaviest imports to list")
+    args = parser.parse_args()
+    over = run(args.repeat, args.import_budget_ms, args.first_request_budget_ms, args.top)
+    if over:
+        print(f"Over budget: {', '.join(over)}")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import TargetMatcher
+
+
+def legacy_is_target(target_files, filename):
+    # The pre-compiled-matcher implementation of Investigator.is_target_file
+    filename_lower = filename.lower()
+    if filename_lower in target_files:
+        return True
+    for pattern in target_files:
+        if '*' in pattern:
+            if pattern.startswith('*') and pattern.count('*') == 1:
+                if filename_lower.endswith(pattern[1:]):
+                    return True
+            elif pattern.endswith('*') and pattern.count('*') == 1:
+                if filename_lower.startswith(pattern[:-1]):
+                    return True
+        elif len(pattern) > 3:
+            if pattern in filename_lower:
+                return True
+    return False
+
+
+def random_word(rng, low=4, high=12):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def make_patterns(rng, count):
+    patterns = set()
+    while len(patterns) < count:
+        kind = rng.random()
+        word = random_word(rng)
+        if kind < 0.6:
+            patterns.add(f"{word}.{rng.choice(['txt', 'docx', 'pdf', 'xlsx', 'dat'])}")
+        elif kind < 0.75:
+            patterns.add(f"{word}*")
+        elif kind < 0.9:
+            patterns.add(f"*{word}")
+        else:
+            patterns.add(f"*{word}*")
+    return patterns
+
+
+def make_filenames(rng, count):
+    return [f"{random_word(rng, 3, 20)}.{rng.choice(['txt', 'log', 'jpg', 'dat'])}" for _ in range(count)]
+
+
+def run(pattern_count=10000, file_count=5000, seed=1):
+    rng = random.Random(seed)
+    patterns = make_patterns(rng, pattern_count)
+    filenames = make_filenames(rng, file_count)
+
+    start = time.perf_counter()
+    matcher = TargetMatcher(patterns)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_hits = sum(1 for name in filenames if matcher.match(name))
+    compiled_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_hits = sum(1 for name in filenames if legacy_is_target(patterns, name))
+    legacy_time = time.perf_counter() - start
+
+    print(f"patterns={pattern_count} files={file_count}")
+    print(f"compile:  {compile_time * 1000:.1f} ms")
+    print(f"compiled: {compiled_time * 1000:.1f} ms ({compiled_time / file_count * 1e6:.2f} us/file, {compiled_hits} hits)")
+    print(f"legacy:   {legacy_time * 1000:.1f} ms ({legacy_time / file_count * 1e6:.2f} us/file, {legacy_hits} hits)")
+    print(f"speedup:  {legacy_time / compiled_time:.0f}x")
+
+
+if __name__ == "__main__":
+    patterns = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    run(patterns, files)
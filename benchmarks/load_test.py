@@ -0,0 +1,115 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+
+def make_tree(directory, files=2000, text_bytes=20000):
+    for i in range(files):
+        with open(os.path.join(directory, f"file_{i:05d}.txt"), 'w') as f:
+            f.write(f"line {i}\n" * (text_bytes // 10))
+    return os.path.join(directory, "file_00000.txt")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(directory, threads, dev):
+    # Runs the app in this process on a free port, the same way start_server does
+    app.blocker = app.Investigator(directory)
+    port = free_port()
+    threading.Thread(target=app.serve, args=('127.0.0.1', port, threads, dev), daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return port
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def client(host, port, requests, deadline, latencies, errors):
+    # One keep-alive connection, cycling through the request list
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    i = 0
+    while time.perf_counter() < deadline:
+        path, body = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run_level(host, port, requests, clients, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    workers = [threading.Thread(target=client, args=(host, port, requests, deadline, latencies, errors))
+               for _ in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    latencies.sort()
+    count = len(latencies)
+    if not count:
+        return f"{clients:>8} {'-':>10} {'-':>9} {'-':>9} {len(errors):>7}"
+    p50 = latencies[count // 2] * 1000
+    p95 = latencies[min(int(count * 0.95), count - 1)] * 1000
+    return f"{clients:>8} {count / duration:>10.1f} {p50:>9.1f} {p95:>9.1f} {len(errors):>7}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /api/list and /api/read load test")
+    parser.add_argument('--host', help="test a running server instead of starting one")
+    parser.add_argument('--port', type=int, default=app.SERVER_PORT)
+    parser.add_argument('--directory', help="directory to list (default: a generated tree)")
+    parser.add_argument('--file', help="file to read (default: one from the generated tree)")
+    parser.add_argument('--clients', default="1,4,16,32")
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=app.SERVER_THREADS)
+    parser.add_argument('--dev', action='store_true', help="start the development server instead of waitress")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory or scratch
+        filepath = args.file or (make_tree(scratch) if not args.directory else None)
+        if args.host:
+            host, port = args.host, args.port
+        else:
+            host, port = '127.0.0.1', start_local_server(directory, args.threads, args.dev)
+
+        requests = [('/api/list', {'directory': directory})]
+        if filepath:
+            requests.append(('/api/read', {'filepath': filepath}))
+
+        print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for clients in (int(value) for value in args.clients.split(',')):
+            print(run_level(host, port, requests, clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Caches and indexes go to a scratch DATA_DIR so runs start cold and never
+# touch the analyst's own ~/.investigator
+os.environ.setdefault('INVESTIGATOR_DATA_DIR', tempfile.mkdtemp(prefix='investigator-bench-'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from synthetic_tree import PROFILES, generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A benchmark regresses when its p50 latency grows by more than this fraction
+# of the baseline and by more than DEFAULT_MIN_DELTA_MS; the floor keeps
+# scheduler noise on sub-millisecond calls from being reported
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def measure(function, repeat, items=1, units=None):
+    # Runs function repeat times; items is how much work one call does (files
+    # listed, names matched, bytes parsed) for the throughput figure
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    latencies.sort()
+    result = {
+        "runs": repeat,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.9) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput": round(items * repeat / total, 1) if total else None,
+        "units": units or "calls/s",
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return result
+
+
+def find_samples(root):
+    # The widest directory plus one file of each kind the suite reads
+    widest, widest_count = root, -1
+    samples = {}
+    names = []
+    for directory, subdirs, files in os.walk(root):
+        names.extend(files)
+        if len(files) + len(subdirs) > widest_count:
+            widest, widest_count = directory, len(files) + len(subdirs)
+        for name in files:
+            path = os.path.join(directory, name)
+            extension = os.path.splitext(name)[1].lower()
+            kind = {".docx": "docx", ".pptx": "pptx", ".xlsx": "xlsx", ".jpg": "image", ".png": "image"}.get(extension)
+            if name.startswith("syslog_"):
+                kind = "log"
+            elif kind is None and extension == ".txt" and os.path.getsize(path) > 0:
+                kind = "text"
+            if kind and kind not in samples:
+                samples[kind] = path
+    return widest, widest_count, samples, names
+
+
+def run_methods(investigator, root, repeat):
+    widest, count, samples, names = find_samples(root)
+    results = {}
+    results["is_target_file"] = measure(lambda: [investigator.is_target_file(name) for name in names],
+                                        max(repeat // 5, 1), len(names), "names/s")
+    results["list_directory"] = measure(lambda: investigator.list_directory(widest), repeat, count, "entries/s")
+    results["list_directory_page"] = measure(lambda: investigator.list_directory_page(widest, 0, app.LIST_PAGE_SIZE),
+                                             repeat, min(count, app.LIST_PAGE_SIZE), "entries/s")
+    for kind in ("text", "log", "docx", "pptx", "xlsx", "image"):
+        if kind in samples:
+            path = samples[kind]
+            results[f"read_file.{kind}"] = measure(lambda: investigator.read_file(path), repeat,
+                                                   os.path.getsize(path) / 1e6, "MB/s")
+    for kind, extractor in (("docx", app.extract_docx_text), ("pptx", app.extract_pptx_text), ("xlsx", app.extract_xlsx_text)):
+        if kind in samples:
+            path = samples[kind]
+            # Straight to the extractor, bypassing the text cache
+            results[f"extract.{kind}"] = measure(lambda: extractor(path), repeat, os.path.getsize(path) / 1e6, "MB/s")
+    if "image" in samples:
+        path = samples["image"]
+        results["get_file_metadata.image"] = measure(
+            lambda: investigator.get_file_metadata(path, ["basic", "timestamps", "exif"]), repeat)
+    if "log" in samples:
+        path = samples["log"]
+        results["read_text_page.log"] = measure(lambda: investigator.read_text_page(path, 50000, 1000), repeat)
+
+    start = time.perf_counter()
+    investigator.start_index(root)
+    while investigator.get_index_status().get("running"):
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    indexed = investigator.get_index_status().get("files", 0)
+    results["index.crawl"] = {"runs": 1, "p50_ms": round(elapsed * 1000, 3), "throughput": round(indexed / elapsed, 1),
+                              "units": "files/s", "peak_rss_mb": peak_rss_mb()}
+    results["search_index.name"] = measure(lambda: investigator.search_index({"name": "*report*"}), repeat)
+    return results
+
+
+def run_endpoints(root, repeat):
+    widest, count, samples, _ = find_samples(root)
+    client = app.app.test_client()
+    results = {}
+
+    def post(path, body):
+        response = client.post(path, json=body)
+        assert response.status_code == 200, (path, response.status_code)
+        return response
+
+    results["POST /api/list"] = measure(lambda: post('/api/list', {'directory': widest}), repeat, count, "entries/s")
+    results["POST /api/list (stream)"] = measure(lambda: post('/api/list', {'directory': widest, 'stream': True}).get_data(),
+                                                 repeat, count, "entries/s")
+    for kind in ("text", "docx"):
+        if kind in samples:
+            results[f"POST /api/read {kind}"] = measure(lambda: post('/api/read', {'filepath': samples[kind]}), repeat)
+    if "image" in samples:
+        results["POST /api/metadata image"] = measure(lambda: post('/api/metadata', {'filepath': samples["image"]}), repeat)
+    if "log" in samples:
+        path = samples["log"]
+        results["GET /api/media log range"] = measure(
+            lambda: client.get('/api/media' + path, headers={'Range': 'bytes=1000000-2048575'},
+                               follow_redirects=True).get_data(), repeat, 1.0, "MB/s")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, tolerance, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    # Returns the names of benchmarks that regressed and prints a table
+    regressions = []
+    print(f"{'benchmark':34} {'p50 ms':>10} {'base':>10} {'change':>8}  {'throughput':>12} {'base':>12}")
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:34} {result['p50_ms']:>10.2f} {'-':>10} {'new':>8}")
+            continue
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0.0
+        slower = change > tolerance and result["p50_ms"] - base["p50_ms"] > min_delta_ms
+        if slower:
+            regressions.append(name)
+        print(f"{name:34} {result['p50_ms']:>10.2f} {base['p50_ms']:>10.2f} {change:>+8.0%}  "
+              f"{result.get('throughput') or 0:>12.1f} {base.get('throughput') or 0:>12.1f}{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Investigator benchmark suite")
+    parser.add_argument('--tree', help="existing evidence tree to use (default: generate one)")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default="small", help="size of the generated tree")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default="benchmark_results.json", help="where to write results")
+    parser.add_argument('--baseline', help="results file to compare against; exits 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="allowed relative p50 slowdown")
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS, help="ignore smaller p50 slowdowns")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='investigator-tree-') as scratch:
+        root = args.tree
+        manifest = None
+        if not root:
+            root = os.path.join(scratch, "evidence")
+            print(f"Generating '{args.profile}' tree in {root} ...")
+            manifest = generate(root, args.profile, args.seed)
+            print(f"  {manifest['counts']['files']} files in {manifest['counts']['directories']} directories "
+                  f"({manifest['generated_in']}s)")
+
+        investigator = app.Investigator(root)
+        app.blocker = investigator
+        results = run_methods(investigator, root, args.repeat)
+        results.update(run_endpoints(root, args.repeat))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "profile": None if args.tree else args.profile,
+            "seed": args.seed,
+            "tree": args.tree,
+            "tree_counts": manifest["counts"] if manifest else None,
+            "repeat": args.repeat,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output} (peak RSS {report['peak_rss_mb']} MB)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("profile") != report["meta"]["profile"] or baseline["meta"].get("cpus") != report["meta"]["cpus"]:
+            print("Note: baseline was recorded with a different tree profile or CPU count")
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+    else:
+        compare(results, {}, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
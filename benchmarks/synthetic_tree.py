@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import random
+import struct
+import time
+import zipfile
+import zlib
+
+# Deterministic synthetic evidence trees: the same seed and profile always
+# produce the same names, contents, sizes and timestamps, so benchmark runs on
+# different machines or commits work on identical input.
+
+PROFILES = {
+    # depth, fan-out, files per directory, large logs, log size, documents, images
+    "small": dict(depth=2, fanout=5, files=40, logs=2, log_bytes=8 * 1024 * 1024, documents=6, images=6),
+    "medium": dict(depth=3, fanout=8, files=100, logs=4, log_bytes=64 * 1024 * 1024, documents=30, images=30),
+    "large": dict(depth=4, fanout=10, files=100, logs=8, log_bytes=512 * 1024 * 1024, documents=100, images=100),
+    # About 1.1M files: depth 4 x fan-out 10 gives 11,111 directories
+    "huge": dict(depth=4, fanout=10, files=1000, logs=8, log_bytes=1024 * 1024 * 1024, documents=100, images=100),
+}
+
+WORDS = ("invoice", "report", "backup", "notes", "draft", "final", "scan", "photo", "budget", "contract",
+         "minutes", "export", "archive", "summary", "letter", "memo", "ledger", "statement", "plan", "todo")
+EXTENSIONS = (".txt", ".log", ".csv", ".dat", ".bin", ".json", ".xml", ".cfg", ".md", ".tmp")
+# Names that match common target.txt patterns, so highlighting has hits
+TARGET_NAMES = ("passwords.txt", "wallet.dat", "credentials.csv", "id_rsa", "accounts.xlsx")
+BASE_TIME = 1577836800  # 2020-01-01, keeps generated mtimes stable
+LOREM = ("the quick brown fox jumps over the lazy dog while the investigator takes careful notes about "
+         "every artefact found on the seized device ").split()
+
+W_MAIN = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+P_MAIN = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+A_MAIN = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+S_MAIN = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+R_MAIN = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+RELS = 'xmlns="http://schemas.openxmlformats.org/package/2006/relationships"'
+CONTENT_TYPES = '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>'
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(LOREM) for _ in range(words))
+
+
+def make_docx(path, rng, paragraphs=200):
+    # Written by hand (no python-docx needed): body paragraphs and one table
+    body = "".join(f'<w:p><w:r><w:t>{i} {sentence(rng, 30)}</w:t></w:r></w:p>' for i in range(paragraphs))
+    rows = "".join('<w:tr>' + "".join(f'<w:tc><w:p><w:r><w:t>r{r}c{c}</w:t></w:r></w:p></w:tc>' for c in range(4))
+                   + '</w:tr>' for r in range(20))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', CONTENT_TYPES)
+        package.writestr('word/document.xml', f'<w:document {W_MAIN}><w:body>{body}<w:tbl>{rows}</w:tbl></w:body></w:document>')
+
+
+def make_pptx(path, rng, slides=40):
+    slide_list = "".join(f'<p:sldId id="{256 + i}" r:id="rId{i + 1}"/>' for i in range(slides))
+    rels = "".join(f'<Relationship Id="rId{i + 1}" Type="slide" Target="slides/slide{i + 1}.xml"/>' for i in range(slides))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', CONTENT_TYPES)
+        package.writestr('ppt/presentation.xml', f'<p:presentation {P_MAIN} {R_MAIN}><p:sldIdLst>{slide_list}</p:sldIdLst></p:presentation>')
+        package.writestr('ppt/_rels/presentation.xml.rels', f'<Relationships {RELS}>{rels}</Relationships>')
+        for i in range(slides):
+            shapes = "".join(f'<p:sp><p:txBody><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:txBody></p:sp>'
+                             for text in (f"Slide {i}", sentence(rng, 40)))
+            package.writestr(f'ppt/slides/slide{i + 1}.xml', f'<p:sld {P_MAIN} {A_MAIN}><p:cSld><p:spTree>{shapes}</p:spTree></p:cSld></p:sld>')
+
+
+def make_xlsx(path, rng, rows=2000, cols=8):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', CONTENT_TYPES)
+        package.writestr('xl/workbook.xml', f'<workbook {S_MAIN} {R_MAIN}><sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        package.writestr('xl/_rels/workbook.xml.rels', f'<Relationships {RELS}><Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/></Relationships>')
+        package.writestr('xl/sharedStrings.xml', f'<sst {S_MAIN}>' + "".join(f'<si><t>{word}</t></si>' for word in WORDS) + '</sst>')
+        with package.open('xl/worksheets/sheet1.xml', 'w') as part:
+            part.write(f'<worksheet {S_MAIN}><sheetData>'.encode())
+            for r in range(rows):
+                cells = "".join(f'<c t="s"><v>{rng.randrange(len(WORDS))}</v></c>' if c % 2 else f'<c><v>{rng.randrange(100000)}</v></c>'
+                                for c in range(cols))
+                part.write(f'<row r="{r + 1}">{cells}</row>'.encode())
+            part.write(b'</sheetData></worksheet>')
+
+
+def make_image(path, rng, width=1600, height=1200):
+    # A JPEG when Pillow is available (what thumbnails and EXIF expect),
+    # otherwise a PNG written by hand
+    try:
+        from PIL import Image
+    except ImportError:
+        rows = (b"\x00" + bytes(rng.randrange(256) for _ in range(3)) * width) * height
+        chunk = lambda kind, data: struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+        with open(os.path.splitext(path)[0] + ".png", 'wb') as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0))
+                    + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+        return
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    image.paste(tuple(rng.randrange(256) for _ in range(3)), (width // 4, height // 4, width * 3 // 4, height * 3 // 4))
+    exif = image.getexif()
+    exif[0x010F] = "SyntheticCam"
+    exif[0x0132] = "2020:01:01 12:00:00"
+    image.save(path, "JPEG", quality=85, exif=exif)
+
+
+def make_log(path, rng, size):
+    # Syslog-style lines; blocks are reused so multi-GB logs write at disk speed
+    lines = [f"2020-01-01T00:00:{i % 60:02d} host{rng.randrange(50)} sshd[{rng.randrange(99999)}]: "
+             f"{sentence(rng, 10)} user={rng.choice(WORDS)} ip=10.0.{rng.randrange(256)}.{rng.randrange(256)}\n"
+             for i in range(2000)]
+    block = "".join(lines).encode()
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            data = block[:size - written]
+            f.write(data)
+            written += len(data)
+
+
+def small_file_content(rng, index):
+    kind = index % 10
+    if kind < 6:
+        return (sentence(rng, rng.randrange(4, 60)) + "\n").encode() * rng.randrange(1, 20)
+    if kind < 8:
+        return rng.randbytes(rng.randrange(64, 16384))
+    if kind == 8:
+        return b""
+    # Exact copies of a small shared set, for duplicate detection
+    return (f"shared content {index % 17}\n" * 50).encode()
+
+
+def generate(root, profile="small", seed=1, **overrides):
+    settings = dict(PROFILES[profile], **overrides)
+    rng = random.Random(seed)
+    started = time.time()
+    counts = {"directories": 0, "files": 0, "bytes": 0, "logs": 0, "documents": 0, "images": 0}
+
+    directories = [root]
+    frontier = [root]
+    for level in range(settings["depth"]):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(settings["fanout"]):
+                path = os.path.join(parent, f"{rng.choice(WORDS)}_{level}_{i}")
+                next_frontier.append(path)
+        directories.extend(next_frontier)
+        frontier = next_frontier
+
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+        counts["directories"] += 1
+        for i in range(settings["files"]):
+            if i < len(TARGET_NAMES) and rng.random() < 0.05:
+                name = TARGET_NAMES[i]
+            else:
+                name = f"{rng.choice(WORDS)}_{i:05d}{rng.choice(EXTENSIONS)}"
+            path = os.path.join(directory, name)
+            data = small_file_content(rng, i)
+            with open(path, 'wb') as f:
+                f.write(data)
+            stamp = BASE_TIME + rng.randrange(3 * 365 * 86400)
+            os.utime(path, (stamp, stamp))
+            counts["files"] += 1
+            counts["bytes"] += len(data)
+
+    special = os.path.join(root, "special")
+    os.makedirs(special, exist_ok=True)
+    for i in range(settings["logs"]):
+        path = os.path.join(special, f"syslog_{i}.log")
+        make_log(path, rng, settings["log_bytes"])
+        counts["logs"] += 1
+        counts["bytes"] += settings["log_bytes"]
+    makers = ((".docx", make_docx), (".pptx", make_pptx), (".xlsx", make_xlsx))
+    for i in range(settings["documents"]):
+        extension, maker = makers[i % len(makers)]
+        path = os.path.join(special, f"document_{i:04d}{extension}")
+        maker(path, rng)
+        counts["documents"] += 1
+        counts["bytes"] += os.path.getsize(path)
+    for i in range(settings["images"]):
+        path = os.path.join(special, f"photo_{i:04d}.jpg")
+        make_image(path, rng)
+        counts["images"] += 1
+
+    manifest = {"profile": profile, "seed": seed, "settings": settings, "counts": counts,
+                "generated_in": round(time.time() - started, 1)}
+    with open(os.path.join(root, "MANIFEST.json"), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic evidence tree")
+    parser.add_argument('root', help="directory to create the tree in")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default="small")
+    parser.add_argument('--seed', type=int, default=1)
+    for name in PROFILES["small"]:
+        parser.add_argument(f'--{name.replace("_", "-")}', type=int, dest=name, help=f"override the profile's {name}")
+    args = parser.parse_args()
+    overrides = {name: getattr(args, name) for name in PROFILES["small"] if getattr(args, name) is not None}
+    manifest = generate(args.root, args.profile, args.seed, **overrides)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,21 @@ document.addEventListener('DOMContentLoaded', function() {
     const metadataViewer = document.getElementById('metadata-viewer');
     const metadataContent = document.getElementById('metadata-content');
     
+    // Pager for large text files
+    const textPager = document.getElementById('text-pager');
+    const pagePrevButton = document.getElementById('btn-page-prev');
+    const pageNextButton = document.getElementById('btn-page-next');
+    const pageGotoButton = document.getElementById('btn-page-goto');
+    const pageLineInput = document.getElementById('page-line-input');
+    const pageInfo = document.getElementById('page-info');
+    
     // Buttons
     const downloadButton = document.getElementById('btn-download');
     const metadataButton = document.getElementById('btn-metadata');
+    const hexButton = document.getElementById('btn-hex');
     const closeMetadataButton = document.getElementById('btn-close-metadata');
     const reloadTargetsBtn = document.getElementById('btn-reload-targets');
+    const inspectContents = document.getElementById('inspect-contents');
     
     // All viewers array (for clearing)
     const allViewers = [textContent, unifiedMediaViewer, metadataViewer];
@@ -29,6 +39,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentFile = null;
     let logExpanded = true;
     let currentFileMetadata = null;
+    let textPage = null;
     
     // Initialize activity log collapsed state
     activityLog.classList.add('collapsed');
@@ -39,10 +50,23 @@ document.addEventListener('DOMContentLoaded', function() {
     // Button event listeners
     downloadButton.addEventListener('click', downloadCurrentFile);
     metadataButton.addEventListener('click', viewMetadata);
+    hexButton.addEventListener('click', () => showHexView(0));
     closeMetadataButton.addEventListener('click', closeMetadata);
+    pagePrevButton.addEventListener('click', () => {
+        if (textPage) loadTextPage(Math.max(textPage.start_line - textPage.page_lines, 0));
+    });
+    pageNextButton.addEventListener('click', () => {
+        if (textPage && !textPage.eof) loadTextPage(textPage.next_line);
+    });
+    pageGotoButton.addEventListener('click', () => {
+        const line = parseInt(pageLineInput.value, 10);
+        if (textPage && line > 0) loadTextPage(line - 1);
+    });
     if (reloadTargetsBtn) {
         reloadTargetsBtn.addEventListener('click', reloadTargetFiles);
     }
+    // Reads of the evidence are opt-in; re-list so the choice applies at once
+    inspectContents.addEventListener('change', () => loadDirectory(currentDirectory));
     
     function toggleActivityLog() {
         logExpanded = !logExpanded;
@@ -106,7 +130,12 @@ document.addEventListener('DOMContentLoaded', function() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ filepath: currentFile }),
+            // Hashes are not a default section; the metadata view asks for
+            // them for the one file it shows
+            body: JSON.stringify({
+                filepath: currentFile,
+                sections: ['basic', 'timestamps', 'permissions', 'system', 'exif', 'hashes']
+            }),
         })
         .then(response => response.json())
         .then(data => {
@@ -211,6 +240,23 @@ document.addEventListener('DOMContentLoaded', function() {
             html += '</table></div>';
         }
         
+        // File hashes (chain of custody)
+        if (metadata.hashes || metadata.hash_note || metadata.hash_error) {
+            html += '<div class="metadata-section">';
+            html += '<h4 class="metadata-section-title">Hashes</h4>';
+            html += '<table>';
+
+            for (const [key, value] of Object.entries(metadata.hashes || {})) {
+                html += `<tr><th>${key.toUpperCase()}</th><td><code>${value}</code></td></tr>`;
+            }
+
+            if (metadata.hash_note || metadata.hash_error) {
+                html += `<tr><th>Note</th><td>${metadata.hash_note || metadata.hash_error}</td></tr>`;
+            }
+
+            html += '</table></div>';
+        }
+
         // System information
         if (metadata.system) {
             html += '<div class="metadata-section">';
@@ -262,6 +308,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Hide all content viewers
     function hideAllViewers() {
         textContent.style.display = 'none';
+        textPager.style.display = 'none';
         unifiedMediaViewer.style.display = 'none';
         metadataViewer.style.display = 'none';
         // Clear any previous content
@@ -322,6 +369,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 50);
     }
     
+    // Number of entries requested per /api/list page
+    const LIST_PAGE_SIZE = 500;
+    // Thumbnail edge in pixels for images and videos in the listing
+    const THUMBNAIL_SIZE = 64;
+    let listRequestId = 0;
+    
     // Function to load directory contents
     function loadDirectory(directory) {
         currentDirectory = directory;
@@ -330,120 +383,203 @@ document.addEventListener('DOMContentLoaded', function() {
         // Disable buttons when changing directories
         downloadButton.disabled = true;
         metadataButton.disabled = true;
+        hexButton.disabled = true;
         
         fileList.innerHTML = '<div class="loading">Loading files...</div>';
         updateStatus(`Loading directory: ${directory || 'Drives'}`, 'info');
         
+        // Pages from a previous directory are dropped once navigation moves on
+        const requestId = ++listRequestId;
+        loadDirectoryPage(directory, null, requestId, 0, null);
+    }
+    
+    // Fetch one page of a directory listing and render it. The server sorts
+    // the whole directory, so pages are appended as they come; the next one
+    // is only requested when the list is scrolled near its end.
+    function loadDirectoryPage(directory, cursor, requestId, renderedCount, sentinel) {
         fetch('/api/list', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ directory: directory }),
+            body: JSON.stringify({ directory: directory, cursor: cursor, limit: LIST_PAGE_SIZE, inspect: inspectContents.checked }),
         })
         .then(response => response.json())
         .then(data => {
-            fileList.innerHTML = '';
-            updateStatus(data.message, data.message.includes('SUCCESS') ? 'success' : 'error');
+            if (requestId !== listRequestId) return;
             
-            // Debug output for API response
-            console.log("API response:", data);
+            if (cursor === null) {
+                fileList.innerHTML = '';
+            }
+            if (sentinel) {
+                sentinel.remove();
+            }
+            
+            const total = renderedCount + data.items.length;
+            const hasMore = data.next_cursor !== null && data.next_cursor !== undefined;
+            
+            if (hasMore) {
+                updateStatus(`Listed ${total} items of ${directory || 'Drives'}; scroll for more`, 'info');
+            } else {
+                updateStatus(data.message, data.message.includes('SUCCESS') ? 'success' : 'error');
+            }
             
-            if (data.items.length === 0) {
+            if (total === 0) {
                 fileList.innerHTML = '<div class="loading">No files found</div>';
                 return;
             }
             
-            // Sort items: drives first, then directories, then files
-            const sortedItems = data.items.sort((a, b) => {
-                if (a.type === b.type) {
-                    return a.name.localeCompare(b.name);
-                }
-                if (a.type === 'drive') return -1;
-                if (b.type === 'drive') return 1;
-                return a.type === 'directory' ? -1 : 1;
-            });
+            renderFileItems(data.items);
             
-            // Add items with staggered animation
-            sortedItems.forEach((item, index) => {
-                const fileItem = document.createElement('div');
-                fileItem.className = `file-item ${item.type}`;
-                
-                // Check if this is a target file and add class
-                if (item.is_target === true) {
-                    fileItem.classList.add('target-file');
-                    console.log(`Target file found: ${item.name}`);
-                }
+            if (hasMore) {
+                watchForMore(directory, data.next_cursor, requestId, total);
+            }
+        })
+        .catch(error => {
+            if (requestId !== listRequestId) return;
+            console.error('Error:', error);
+            if (cursor === null) {
+                fileList.innerHTML = `<div class="loading">Error loading files: ${error.message}</div>`;
+            } else if (sentinel) {
+                sentinel.textContent = `Error loading more files: ${error.message}`;
+            }
+            updateStatus('Error: Failed to load directory', 'error');
+        });
+    }
+    
+    // Put a placeholder row after the last item and fetch the next page once
+    // it comes within a few screens of view
+    function watchForMore(directory, cursor, requestId, renderedCount) {
+        const sentinel = document.createElement('div');
+        sentinel.className = 'loading';
+        sentinel.textContent = 'Loading more files...';
+        fileList.appendChild(sentinel);
+        
+        const observer = new IntersectionObserver(entries => {
+            if (requestId !== listRequestId) {
+                observer.disconnect();
+                return;
+            }
+            if (!entries.some(entry => entry.isIntersecting)) return;
+            observer.disconnect();
+            loadDirectoryPage(directory, cursor, requestId, renderedCount, sentinel);
+        }, { root: fileList, rootMargin: '800px 0px' });
+        observer.observe(sentinel);
+    }
+    
+    // Append a page of listing items to the file list. Items arrive in
+    // display order: directories first, then by name.
+    function renderFileItems(items) {
+        // Add items with staggered animation
+        items.forEach((item, index) => {
+            const fileItem = document.createElement('div');
+            fileItem.className = `file-item ${item.type}`;
+            
+            // Check if this is a target file and add class
+            if (item.is_target === true) {
+                fileItem.classList.add('target-file');
+                console.log(`Target file found: ${item.name}`);
+            }
+            
+            // Content does not match what the file name claims
+            if (item.type_mismatch === true) {
+                fileItem.classList.add('type-mismatch');
+                fileItem.title = `Name suggests a different type; content looks like ${item.content_type}`;
+            }
+            
+            // Files whose hash is on a known-bad or known-good list
+            if (item.known === 'known_bad') {
+                fileItem.classList.add('known-bad');
+            } else if (item.known === 'known_good') {
+                fileItem.classList.add('known-good');
+            }
+            
+            // Create main content area for file info
+            const fileInfo = document.createElement('div');
+            fileInfo.className = 'file-info';
+            
+            // Use icon if provided
+            if (item.icon && item.type === 'file') {
+                fileInfo.innerHTML = `<span class="file-icon">${item.icon}</span> ${item.name}`;
+            } else {
+                fileInfo.textContent = item.name;
+            }
+            
+            // With "Inspect contents" on, images and videos show a small
+            // server-side thumbnail instead of the icon; if none can be made
+            // the icon stays. content_type is only sent for inspected
+            // listings, and archive members are not thumbnailed.
+            const contentType = item.content_type || '';
+            if (item.type === 'file' && !item.in_archive && (contentType.startsWith('image/') || contentType.startsWith('video/'))) {
+                const thumb = document.createElement('img');
+                thumb.className = 'file-thumb';
+                thumb.loading = 'lazy';
+                thumb.alt = '';
+                thumb.src = `/api/thumbnail?path=${encodeURIComponent(item.path)}&size=${THUMBNAIL_SIZE}`;
+                thumb.onload = () => {
+                    const icon = fileInfo.querySelector('.file-icon');
+                    if (icon) icon.style.display = 'none';
+                };
+                thumb.onerror = () => thumb.remove();
+                fileInfo.prepend(thumb);
+            }
+            
+            fileItem.appendChild(fileInfo);
+            
+            // Add file size for files (not for directories or drives)
+            if (item.type === 'file' && item.size !== undefined) {
+                const sizeSpan = document.createElement('span');
+                sizeSpan.className = 'file-size';
+                sizeSpan.textContent = formatFileSize(item.size);
                 
-                // Create main content area for file info
-                const fileInfo = document.createElement('div');
-                fileInfo.className = 'file-info';
+                // Check if it's a large exe file
+                const isExe = item.name.toLowerCase().endsWith('.exe');
+                const isLarge = item.size > 629145600; // 600MB in bytes
                 
-                // Use icon if provided
-                if (item.icon && item.type === 'file') {
-                    fileInfo.innerHTML = `<span class="file-icon">${item.icon}</span> ${item.name}`;
-                } else {
-                    fileInfo.textContent = item.name;
+                if (isExe && isLarge) {
+                    sizeSpan.classList.add('large-exe');
                 }
                 
-                fileItem.appendChild(fileInfo);
+                fileItem.appendChild(sizeSpan);
+            }
+            
+            fileItem.dataset.path = item.path;
+            fileItem.dataset.type = item.type;
+            if (item.is_archive) {
+                fileItem.dataset.archive = 'true';
+            }
+            
+            // Add staggered fade-in animation
+            fileItem.style.opacity = '0';
+            fileItem.style.transform = 'translateY(10px)';
+            
+            fileItem.addEventListener('click', function() {
+                const path = this.dataset.path;
+                const type = this.dataset.type;
                 
-                // Add file size for files (not for directories or drives)
-                if (item.type === 'file' && item.size !== undefined) {
-                    const sizeSpan = document.createElement('span');
-                    sizeSpan.className = 'file-size';
-                    sizeSpan.textContent = formatFileSize(item.size);
-                    
-                    // Check if it's a large exe file
-                    const isExe = item.name.toLowerCase().endsWith('.exe');
-                    const isLarge = item.size > 629145600; // 600MB in bytes
-                    
-                    if (isExe && isLarge) {
-                        sizeSpan.classList.add('large-exe');
+                if (type === 'drive') {
+                    // For drives, ask if the user wants to set this as the protected directory
+                    const setAsProtected = confirm(`Do you want to enable write protection for "${item.name}"?\n\nIf you select "OK", the drive will be protected from write operations.`);
+                    if (setAsProtected) {
+                        setAllowedDirectory(path);
                     }
-                    
-                    fileItem.appendChild(sizeSpan);
+                    loadDirectory(path);
+                } else if (type === 'directory' || this.dataset.archive) {
+                    // Zip and tar files open as read-only virtual folders
+                    loadDirectory(path);
+                } else {
+                    selectFile(path);
                 }
-                
-                fileItem.dataset.path = item.path;
-                fileItem.dataset.type = item.type;
-                
-                // Add staggered fade-in animation
-                fileItem.style.opacity = '0';
-                fileItem.style.transform = 'translateY(10px)';
-                
-                fileItem.addEventListener('click', function() {
-                    const path = this.dataset.path;
-                    const type = this.dataset.type;
-                    
-                    if (type === 'drive') {
-                        // For drives, ask if the user wants to set this as the protected directory
-                        const setAsProtected = confirm(`Do you want to enable write protection for "${item.name}"?\n\nIf you select "OK", the drive will be protected from write operations.`);
-                        if (setAsProtected) {
-                            setAllowedDirectory(path);
-                        }
-                        loadDirectory(path);
-                    } else if (type === 'directory') {
-                        loadDirectory(path);
-                    } else {
-                        selectFile(path);
-                    }
-                });
-                
-                fileList.appendChild(fileItem);
-                
-                // Trigger animation after a short delay based on index
-                setTimeout(() => {
-                    fileItem.style.transition = 'opacity 0.3s ease-out, transform 0.3s ease-out';
-                    fileItem.style.opacity = '1';
-                    fileItem.style.transform = 'translateY(0)';
-                }, 50 + (index * 30));
             });
-        })
-        .catch(error => {
-            console.error('Error:', error);
-            fileList.innerHTML = `<div class="loading">Error loading files: ${error.message}</div>`;
-            updateStatus('Error: Failed to load directory', 'error');
+            
+            fileList.appendChild(fileItem);
+            
+            // Trigger animation after a short delay based on index
+            setTimeout(() => {
+                fileItem.style.transition = 'opacity 0.3s ease-out, transform 0.3s ease-out';
+                fileItem.style.opacity = '1';
+                fileItem.style.transform = 'translateY(0)';
+            }, 50 + (Math.min(index, 20) * 30));
         });
     }
     
@@ -550,6 +686,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Enable action buttons
         downloadButton.disabled = false;
         metadataButton.disabled = false;
+        hexButton.disabled = false;
         
         // Add highlight animation
         selectedFile.style.backgroundColor = 'var(--primary-color)';
@@ -599,16 +736,24 @@ document.addEventListener('DOMContentLoaded', function() {
                     textContent.value = data.content || '';
                     textContent.classList.remove('office-document');
                 }
+                
+                // Large files arrive one page at a time
+                if (data.paged) {
+                    textPage = Object.assign({ path: currentFile }, data);
+                    delete textPage.content;
+                    textPager.style.display = 'flex';
+                    updatePageInfo();
+                } else {
+                    textPage = null;
+                }
                 break;
                 
             case 'pdf':
                 unifiedMediaViewer.style.display = 'block';
                 
-                // Create a unique URL with a query parameter to avoid duplicates
-                const uniqueId = new Date().getTime();
                 const pdfHtml = `
-                    <object data="/api/media/${encodeURIComponent(currentFile)}?_t=${uniqueId}" type="application/pdf" width="100%" height="100%" class="pdf-object">
-                        <p>Unable to display PDF. <a href="/api/media/${encodeURIComponent(currentFile)}?_t=${uniqueId}" target="_blank">Download</a> instead.</p>
+                    <object data="/api/media/${encodeURIComponent(currentFile)}" type="application/pdf" width="100%" height="100%" class="pdf-object">
+                        <p>Unable to display PDF. <a href="/api/media/${encodeURIComponent(currentFile)}" target="_blank">Download</a> instead.</p>
                     </object>
                 `;
                 unifiedMediaViewer.innerHTML = pdfHtml;
@@ -617,11 +762,9 @@ document.addEventListener('DOMContentLoaded', function() {
             case 'image':
                 unifiedMediaViewer.style.display = 'block';
                 
-                // Create a unique URL with a query parameter to avoid duplicates
-                const uniqueImageId = new Date().getTime();
                 const imgHtml = `
                     <div class="image-container">
-                        <img src="/api/media/${encodeURIComponent(currentFile)}?_t=${uniqueImageId}" alt="Image preview" class="image-object" />
+                        <img src="/api/media/${encodeURIComponent(currentFile)}" alt="Image preview" class="image-object" />
                     </div>
                 `;
                 unifiedMediaViewer.innerHTML = imgHtml;
@@ -630,8 +773,6 @@ document.addEventListener('DOMContentLoaded', function() {
             case 'video':
                 unifiedMediaViewer.style.display = 'block';
                 
-                // Create a unique URL with a query parameter to avoid duplicates
-                const uniqueVideoId = new Date().getTime();
                 const videoHtml = `
                     <div class="video-container">
                         <video controls class="video-object">
@@ -668,6 +809,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 if (data) {
                     metadataHtml += `<div>File type: ${data.mimetype || 'Unknown'}</div>`;
+                    if (data.content_type) {
+                        metadataHtml += `<div>Detected content: ${data.content_type}</div>`;
+                    }
                     metadataHtml += `<div>File size: ${formatFileSize(data.size || 0)}</div>`;
                     if (data.last_modified) {
                         metadataHtml += `<div>Modified: ${data.last_modified}</div>`;
@@ -683,6 +827,159 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Hex viewer: fixed-size windows of the current file served from /api/hex
+    const HEX_PAGE_BYTES = 4096;
+    let hexView = null;
+    
+    function showHexView(offset) {
+        if (!currentFile) return;
+        hideAllViewers();
+        unifiedMediaViewer.style.display = 'block';
+        unifiedMediaViewer.innerHTML = `
+            <div class="hex-toolbar">
+                <button class="small-button" id="hex-prev">◀ Prev</button>
+                <button class="small-button" id="hex-next">Next ▶</button>
+                <input id="hex-offset" type="text" placeholder="Offset (e.g. 0x1F00)">
+                <button class="small-button" id="hex-goto">Go</button>
+                <input id="hex-pattern" type="text" placeholder="Search bytes or text">
+                <select id="hex-pattern-type">
+                    <option value="hex">Hex</option>
+                    <option value="text">Text</option>
+                    <option value="utf16">UTF-16</option>
+                </select>
+                <button class="small-button" id="hex-find">Find next</button>
+                <span id="hex-info" class="page-info"></span>
+            </div>
+            <pre id="hex-dump" class="hex-dump"></pre>
+        `;
+        hexView = { path: currentFile, offset: 0, size: 0, eof: true };
+        
+        document.getElementById('hex-prev').addEventListener('click', () => {
+            loadHexWindow(Math.max(hexView.offset - HEX_PAGE_BYTES, 0));
+        });
+        document.getElementById('hex-next').addEventListener('click', () => {
+            if (!hexView.eof) loadHexWindow(hexView.offset + HEX_PAGE_BYTES);
+        });
+        document.getElementById('hex-goto').addEventListener('click', () => {
+            const value = document.getElementById('hex-offset').value.trim();
+            const target = value.toLowerCase().startsWith('0x') ? parseInt(value, 16) : parseInt(value, 10);
+            if (!isNaN(target)) loadHexWindow(target);
+        });
+        document.getElementById('hex-find').addEventListener('click', findHexPattern);
+        
+        loadHexWindow(offset);
+    }
+    
+    function loadHexWindow(offset) {
+        const view = hexView;
+        fetch('/api/hex', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ filepath: view.path, offset: offset, length: HEX_PAGE_BYTES }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (hexView !== view || !data.data || data.data.error !== undefined) {
+                if (data.message) updateStatus(data.message, 'error');
+                return;
+            }
+            Object.assign(view, { offset: data.data.offset, size: data.data.size, eof: data.data.eof });
+            
+            const highlight = view.match;
+            const lines = data.data.rows.map(row => {
+                const marker = (highlight !== undefined && highlight >= row.offset && highlight < row.offset + 16) ? '▶' : ' ';
+                return `${marker}${row.offset.toString(16).padStart(10, '0')}  ${row.hex.padEnd(47, ' ')}  ${row.ascii}`;
+            });
+            document.getElementById('hex-dump').textContent = lines.join('\n');
+            document.getElementById('hex-info').textContent =
+                `0x${view.offset.toString(16)} / 0x${view.size.toString(16)} (${formatFileSize(view.size)})`;
+            document.getElementById('hex-prev').disabled = view.offset === 0;
+            document.getElementById('hex-next').disabled = view.eof;
+            updateStatus(data.message, 'success');
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            updateStatus('Error: Failed to load hex view', 'error');
+        });
+    }
+    
+    function findHexPattern() {
+        const view = hexView;
+        const pattern = document.getElementById('hex-pattern').value;
+        if (!pattern) return;
+        const start = view.match !== undefined ? view.match + 1 : view.offset;
+        
+        updateStatus(`Searching for "${pattern}"...`, 'info');
+        fetch('/api/hex/search', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                filepath: view.path,
+                pattern: pattern,
+                type: document.getElementById('hex-pattern-type').value,
+                start: start
+            }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (hexView !== view) return;
+            if (data.data && data.data.matches && data.data.matches.length) {
+                view.match = data.data.matches[0];
+                updateStatus(`Match at offset 0x${view.match.toString(16)}`, 'success');
+                loadHexWindow(view.match - (view.match % HEX_PAGE_BYTES));
+            } else {
+                updateStatus(data.message.includes('ERROR') ? data.message : 'No further matches', 'warning');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            updateStatus('Error: Search failed', 'error');
+        });
+    }
+    
+    // Fetch a window of lines of the current large text file
+    function loadTextPage(line) {
+        const page = textPage;
+        updateStatus(`Loading line ${line + 1} of ${page.path}`, 'info');
+        
+        fetch('/api/text', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ filepath: page.path, line: line, lines: page.page_lines }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (textPage !== page || currentFile !== page.path) return;
+            if (data.data && data.data.error === undefined) {
+                Object.assign(textPage, data.data);
+                delete textPage.content;
+                textContent.value = data.data.content;
+                textContent.scrollTop = 0;
+                updatePageInfo();
+                updateStatus(data.message, 'success');
+            } else {
+                updateStatus(data.message, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            updateStatus('Error: Failed to load text page', 'error');
+        });
+    }
+    
+    function updatePageInfo() {
+        const total = textPage.total_lines ? ` of ${textPage.total_lines}` : '';
+        pageInfo.textContent = `Lines ${textPage.start_line + 1}-${textPage.next_line}${total} (${formatFileSize(textPage.size)})`;
+        pagePrevButton.disabled = textPage.start_line === 0;
+        pageNextButton.disabled = textPage.eof;
+    }
+    
     // Format file size in human-readable format
     function formatFileSize(bytes) {
         if (bytes === 0) return '0 Bytes';
@@ -742,7 +1039,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (fileData.type === 'text') {
                     showViewer('text', fileData);
                 } else if (fileData.type === 'binary') {
-                    const mimetype = fileData.mimetype || '';
+                    // Prefer the type detected from the file content over the name
+                    const detected = fileData.content_type;
+                    const mimetype = (detected && detected !== 'application/octet-stream' && detected !== 'inode/x-empty')
+                        ? detected : (fileData.mimetype || '');
                     
                     if (mimetype.startsWith('image/')) {
                         showViewer('image', fileData);
@@ -772,65 +1072,104 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Highest log sequence number shown so far; each poll only asks the
+    // server for entries after it
+    let lastLogSeq = 0;
+    let logsLoaded = false;
+    let logsFetching = false;
+    let logsFetchAgain = false;
+    const MAX_LOG_ENTRIES = 1000;
+    
+    function createLogElement(log) {
+        const logEntry = document.createElement('div');
+        logEntry.className = 'log-entry';
+        
+        const timestamp = document.createElement('span');
+        timestamp.className = 'timestamp';
+        timestamp.textContent = log.timestamp;
+        
+        const action = document.createElement('span');
+        action.className = `log-action ${log.action}`;
+        action.textContent = log.action;
+        
+        const status = document.createElement('span');
+        status.className = `log-action ${log.status}`;
+        status.textContent = `[${log.status}]`;
+        
+        const path = document.createElement('span');
+        path.className = 'log-path';
+        path.textContent = log.path;
+        
+        logEntry.appendChild(timestamp);
+        logEntry.appendChild(action);
+        logEntry.appendChild(status);
+        logEntry.appendChild(path);
+        return logEntry;
+    }
+    
     // Function to fetch activity logs
     function fetchLogs() {
+        // One request at a time, so pages are applied in order; a call made
+        // meanwhile fetches again once the current one is done
+        if (logsFetching) {
+            logsFetchAgain = true;
+            return;
+        }
+        logsFetching = true;
+        
         // Store current scroll position
         const scrollPos = logEntries.scrollTop;
         const wasAtTop = scrollPos === 0;
         
-        fetch('/api/logs')
+        fetch(`/api/logs?since=${lastLogSeq}`)
         .then(response => response.json())
         .then(data => {
-            // Keep track of how many logs we had before
-            const previousLogCount = logEntries.querySelectorAll('.log-entry').length;
+            const firstLoad = !logsLoaded;
             
-            logEntries.innerHTML = '';
+            // Entries were missed (server restarted or they left its memory),
+            // so start over from what the server sent
+            if (data.truncated || data.last_seq < lastLogSeq) {
+                logEntries.innerHTML = '';
+            }
+            // The server returns the oldest entries first, a page at a time;
+            // keep asking until the newest one has arrived
+            lastLogSeq = data.next_since;
+            if (lastLogSeq < data.last_seq) {
+                logsFetchAgain = true;
+            } else {
+                logsLoaded = true;
+            }
             
             if (data.logs.length === 0) {
-                const logEntry = document.createElement('div');
-                logEntry.className = 'log-entry';
-                logEntry.innerHTML = '<span class="timestamp">No activity yet</span>';
-                logEntries.appendChild(logEntry);
+                if (!logEntries.querySelector('.log-entry')) {
+                    const logEntry = document.createElement('div');
+                    logEntry.className = 'log-entry empty';
+                    logEntry.innerHTML = '<span class="timestamp">No activity yet</span>';
+                    logEntries.appendChild(logEntry);
+                }
                 return;
             }
             
-            // Display logs in reverse chronological order (newest first)
-            data.logs.slice().reverse().forEach((log, index) => {
-                const logEntry = document.createElement('div');
-                logEntry.className = 'log-entry';
-                
-                // Add animation class for new logs
-                if (index < data.logs.length - previousLogCount && previousLogCount > 0) {
+            const placeholder = logEntries.querySelector('.log-entry.empty');
+            if (placeholder) {
+                placeholder.remove();
+            }
+            
+            // Entries arrive oldest first; newest is shown at the top
+            data.logs.forEach(log => {
+                const logEntry = createLogElement(log);
+                if (!firstLoad) {
                     logEntry.classList.add('new-entry');
                 }
-                
-                const timestamp = document.createElement('span');
-                timestamp.className = 'timestamp';
-                timestamp.textContent = log.timestamp;
-                
-                const action = document.createElement('span');
-                action.className = `log-action ${log.action}`;
-                action.textContent = log.action;
-                
-                const status = document.createElement('span');
-                status.className = `log-action ${log.status}`;
-                status.textContent = `[${log.status}]`;
-                
-                const path = document.createElement('span');
-                path.className = 'log-path';
-                path.textContent = log.path;
-                
-                logEntry.appendChild(timestamp);
-                logEntry.appendChild(action);
-                logEntry.appendChild(status);
-                logEntry.appendChild(path);
-                
-                logEntries.appendChild(logEntry);
+                logEntries.insertBefore(logEntry, logEntries.firstChild);
             });
             
-            // If we were at the top or there are new logs, scroll to top
-            // Otherwise maintain previous scroll position
-            if (wasAtTop || data.logs.length > previousLogCount) {
+            while (logEntries.children.length > MAX_LOG_ENTRIES) {
+                logEntries.removeChild(logEntries.lastChild);
+            }
+            
+            // New entries scroll the log back to the top
+            if (wasAtTop || data.logs.length > 0) {
                 logEntries.scrollTop = 0;
             } else {
                 logEntries.scrollTop = scrollPos;
@@ -838,6 +1177,14 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .catch(error => {
             console.error('Error fetching logs:', error);
+            logsFetchAgain = false;
+        })
+        .finally(() => {
+            logsFetching = false;
+            if (logsFetchAgain) {
+                logsFetchAgain = false;
+                fetchLogs();
+            }
         });
     }
     
@@ -848,29 +1195,8 @@ document.addEventListener('DOMContentLoaded', function() {
             toggleActivityLog();
         }
         
-        const logEntry = document.createElement('div');
-        logEntry.className = 'log-entry new-entry';
-        
-        const timestamp = document.createElement('span');
-        timestamp.className = 'timestamp';
-        timestamp.textContent = logData.timestamp;
-        
-        const action = document.createElement('span');
-        action.className = `log-action ${logData.action}`;
-        action.textContent = logData.action;
-        
-        const status = document.createElement('span');
-        status.className = `log-action ${logData.status}`;
-        status.textContent = `[${logData.status}]`;
-        
-        const path = document.createElement('span');
-        path.className = 'log-path';
-        path.textContent = logData.path;
-        
-        logEntry.appendChild(timestamp);
-        logEntry.appendChild(action);
-        logEntry.appendChild(status);
-        logEntry.appendChild(path);
+        const logEntry = createLogElement(logData);
+        logEntry.classList.add('new-entry');
         
         // Add to the top of the log entries
         logEntries.insertBefore(logEntry, logEntries.firstChild);
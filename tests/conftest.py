@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# app reads INVESTIGATOR_DATA_DIR at import time; keep the tests' indexes,
+# caches and audit journal out of the real ~/.investigator
+os.environ.setdefault('INVESTIGATOR_DATA_DIR', tempfile.mkdtemp(prefix='investigator-tests-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def case_dirs(tmp_path):
+    allowed = tmp_path / "case1"
+    sibling = tmp_path / "case10"
+    (allowed / "sub").mkdir(parents=True)
+    sibling.mkdir()
+    (allowed / "sub" / "note.txt").write_text("inside")
+    (sibling / "secret.txt").write_text("outside")
+    return allowed, sibling
+
+
+def test_paths_inside_are_allowed(case_dirs):
+    allowed, sibling = case_dirs
+    investigator = app.Investigator(str(allowed))
+    assert investigator.is_within_allowed_dir(str(allowed))
+    assert investigator.is_within_allowed_dir(str(allowed / "sub" / "note.txt"))
+    assert investigator.is_within_allowed_dir(str(allowed / "sub" / ".." / "sub"))
+    assert investigator.is_within_allowed_dir(str(allowed / "not-created-yet.txt"))
+
+
+def test_sibling_with_same_prefix_is_refused(case_dirs):
+    allowed, sibling = case_dirs
+    investigator = app.Investigator(str(allowed))
+    assert not investigator.is_within_allowed_dir(str(sibling / "secret.txt"))
+    assert not investigator.is_within_allowed_dir(str(sibling))
+
+
+def test_dot_dot_and_parent_are_refused(case_dirs):
+    allowed, sibling = case_dirs
+    investigator = app.Investigator(str(allowed))
+    assert not investigator.is_within_allowed_dir(str(allowed / ".." / "case10" / "secret.txt"))
+    assert not investigator.is_within_allowed_dir(str(allowed.parent))
+    assert not investigator.is_within_allowed_dir(os.sep)
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_symlink_out_of_the_directory_is_refused(case_dirs):
+    allowed, sibling = case_dirs
+    (allowed / "escape").symlink_to(sibling, target_is_directory=True)
+    (allowed / "link.txt").symlink_to(sibling / "secret.txt")
+    investigator = app.Investigator(str(allowed))
+    assert not investigator.is_within_allowed_dir(str(allowed / "escape" / "secret.txt"))
+    assert not investigator.is_within_allowed_dir(str(allowed / "link.txt"))
+
+
+def test_allowed_dir_reached_through_a_symlink(case_dirs, tmp_path):
+    allowed, sibling = case_dirs
+    alias = tmp_path / "alias"
+    alias.symlink_to(allowed, target_is_directory=True)
+    investigator = app.Investigator(str(alias))
+    assert investigator.is_within_allowed_dir(str(allowed / "sub" / "note.txt"))
+    assert not investigator.is_within_allowed_dir(str(sibling / "secret.txt"))
+
+
+def test_no_allowed_dir_allows_everything(case_dirs):
+    allowed, sibling = case_dirs
+    investigator = app.Investigator(None)
+    assert investigator.is_within_allowed_dir(str(sibling / "secret.txt"))
+
+
+def test_read_file_refuses_paths_outside(case_dirs):
+    allowed, sibling = case_dirs
+    investigator = app.Investigator(str(allowed))
+    result, message = investigator.read_file(str(sibling / "secret.txt"))
+    assert message == "[ERROR] Access denied"
+    assert result["content"] is None
+    result, message = investigator.read_file(str(allowed / "sub" / "note.txt"))
+    assert message.startswith("[READ]")
+    assert "inside" in str(result["content"])
@@ -0,0 +1,118 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import app
+
+
+def make_zip(path, prefix=b''):
+    # Deflated and stored members, a non-ASCII name, an explicit directory,
+    # members in undeclared directories and one written with zip64 extras
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('docs/', b'')
+        zf.writestr('docs/report.txt', b'quarterly report\n' * 100, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr('docs/stored.bin', bytes(range(256)), compress_type=zipfile.ZIP_STORED)
+        zf.writestr('deep/a/b/c.txt', b'nested', compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr('naïve résumé.txt', b'unicode name', compress_type=zipfile.ZIP_DEFLATED)
+        with zf.open('big/zip64.dat', 'w', force_zip64=True) as member:
+            member.write(b'z' * 5000)
+    with open(path, 'wb') as f:
+        f.write(prefix + buffer.getvalue())
+    return path
+
+
+def test_zip_central_directory_matches_zipfile(tmp_path):
+    path = make_zip(str(tmp_path / 'evidence.zip'))
+    with zipfile.ZipFile(path) as zf:
+        expected = {info.filename: info for info in zf.infolist()}
+    members = {name: rest for name, *rest in app.iter_zip_members(path)}
+    assert set(members) == set(expected)
+    for name, (is_dir, size, mtime, offset, csize, method, flags, crc) in members.items():
+        info = expected[name]
+        assert is_dir == info.is_dir()
+        assert size == info.file_size
+        assert csize == info.compress_size
+        assert method == info.compress_type
+        assert crc == info.CRC
+        assert offset == info.header_offset
+
+
+def test_zip_with_prepended_data_keeps_offsets(tmp_path):
+    # Self-extracting archives carry a stub in front of the zip
+    path = make_zip(str(tmp_path / 'sfx.zip'), prefix=b'MZ' + bytes(1000))
+    browser = app.ArchiveBrowser(str(tmp_path / 'index'))
+    with browser.open(path, 'docs/report.txt') as stream:
+        assert stream.read() == b'quarterly report\n' * 100
+
+
+def test_zip_without_end_record_is_rejected(tmp_path):
+    path = tmp_path / 'broken.zip'
+    path.write_bytes(b'PK\x03\x04 not really a zip')
+    with pytest.raises(zipfile.BadZipFile):
+        list(app.iter_zip_members(str(path)))
+
+
+def test_zip_members_read_back_identically(tmp_path):
+    path = make_zip(str(tmp_path / 'evidence.zip'))
+    browser = app.ArchiveBrowser(str(tmp_path / 'index'))
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            with browser.open(path, info.filename) as stream:
+                assert stream.read() == zf.read(info.filename)
+
+
+def test_zip_listing_adds_missing_directories(tmp_path):
+    path = make_zip(str(tmp_path / 'evidence.zip'))
+    browser = app.ArchiveBrowser(str(tmp_path / 'index'))
+    root = [(member["name"], member["type"]) for _, member in browser.iter_members(path)]
+    assert root == [("big", "directory"), ("deep", "directory"), ("docs", "directory"),
+                    ("naïve résumé.txt", "file")]
+    nested = [member["path"] for _, member in browser.iter_members(path, "deep/a/b")]
+    assert nested == ["deep/a/b/c.txt"]
+    with pytest.raises(FileNotFoundError):
+        list(browser.iter_members(path, "missing"))
+
+
+@pytest.mark.parametrize("mode, suffix", [("w", ".tar"), ("w:gz", ".tar.gz"), ("w:bz2", ".tar.bz2"),
+                                          ("w:xz", ".tar.xz")])
+def test_tar_members_match_tarfile(tmp_path, mode, suffix):
+    path = str(tmp_path / ('evidence' + suffix))
+    contents = {'logs/auth.log': b'login ok\n' * 50, 'logs/empty.log': b'', 'top.txt': b'x' * 1234}
+    with tarfile.open(path, mode) as tf:
+        directory = tarfile.TarInfo('logs')
+        directory.type = tarfile.DIRTYPE
+        tf.addfile(directory)
+        for name, data in contents.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1700000000
+            tf.addfile(info, io.BytesIO(data))
+
+    members = {name: (is_dir, size, mtime)
+               for name, is_dir, size, mtime, *_ in app.iter_tar_members(path, app.tar_compression(path))}
+    with tarfile.open(path) as tf:
+        expected = {info.name: (info.isdir(), None if info.isdir() else info.size, info.mtime)
+                    for info in tf.getmembers()}
+    assert members == expected
+
+    browser = app.ArchiveBrowser(str(tmp_path / 'index'))
+    for name, data in contents.items():
+        with browser.open(path, name) as stream:
+            assert stream.read() == data
+    with browser.open(path, 'top.txt') as stream:
+        stream.seek(1000)
+        assert stream.read() == b'x' * 234
+        stream.seek(10)
+        assert stream.read(5) == b'x' * 5
+
+
+def test_member_names_cannot_escape_the_archive():
+    assert app.clean_member_name('../../etc/passwd') == 'etc/passwd'
+    assert app.clean_member_name('/abs/./path//file') == 'abs/path/file'
+    assert app.clean_member_name('dir\\sub\\file.txt') == 'dir/sub/file.txt'
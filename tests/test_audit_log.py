@@ -0,0 +1,61 @@
+import app
+
+
+def fill(audit_log, count):
+    for n in range(count):
+        audit_log.append({"operation": "read", "n": n})
+
+
+def read_all(audit_log, since, limit):
+    seqs = []
+    while True:
+        entries, since, last, truncated = audit_log.entries_since(since, limit)
+        seqs.extend(entry["seq"] for entry in entries)
+        if since >= last:
+            return seqs
+
+
+def test_paging_returns_every_entry_in_order(tmp_path):
+    audit_log = app.AuditLog(str(tmp_path / "audit.jsonl"), ring_size=100)
+    fill(audit_log, 37)
+    for limit in (1, 5, 36, 37, 100):
+        assert read_all(audit_log, 0, limit) == list(range(1, 38))
+    assert read_all(audit_log, 30, 4) == list(range(31, 38))
+
+
+def test_pages_are_oldest_first(tmp_path):
+    audit_log = app.AuditLog(str(tmp_path / "audit.jsonl"), ring_size=100)
+    fill(audit_log, 10)
+    entries, next_since, last, truncated = audit_log.entries_since(2, 3)
+    assert [entry["seq"] for entry in entries] == [3, 4, 5]
+    assert (next_since, last, truncated) == (5, 10, False)
+
+
+def test_caught_up_poll_is_empty(tmp_path):
+    audit_log = app.AuditLog(str(tmp_path / "audit.jsonl"), ring_size=100)
+    fill(audit_log, 3)
+    assert audit_log.entries_since(3, 10) == ([], 3, 3, False)
+    # A client ahead of the log (it was cleared) is brought back to its end
+    assert audit_log.entries_since(50, 10) == ([], 3, 3, False)
+
+
+def test_truncated_only_when_entries_were_dropped(tmp_path):
+    audit_log = app.AuditLog(str(tmp_path / "audit.jsonl"), ring_size=10)
+    fill(audit_log, 25)  # seq 16..25 are held
+    assert audit_log.entries_since(0, 100)[3] is False
+    assert audit_log.entries_since(15, 100)[3] is False
+    entries, next_since, last, truncated = audit_log.entries_since(5, 100)
+    assert truncated is True
+    assert [entry["seq"] for entry in entries] == list(range(16, 26))
+
+
+def test_sequence_continues_after_reopening(tmp_path):
+    path = str(tmp_path / "audit.jsonl")
+    audit_log = app.AuditLog(path, ring_size=5)
+    fill(audit_log, 8)
+    audit_log.journal.close()
+
+    reopened = app.AuditLog(path, ring_size=5)
+    assert [entry["seq"] for entry in reopened.ring] == [4, 5, 6, 7, 8]
+    assert reopened.append({"operation": "list"})["seq"] == 9
+    reopened.journal.close()
